@@ -1,25 +1,114 @@
 import json
-from collections import namedtuple
-from typing import Callable, List, Tuple
+import logging
+import math
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 from flair.data import Sentence
+from flair.datasets import SentenceDataset
 from flair.trainers import ModelTrainer
 
+from seqal.checkpoint import Checkpoint
 from seqal.datasets import Corpus
+from seqal.embedding_cache import EmbeddingCache
+from seqal.instrumentation import timed
+from seqal.performance_recorder import PerformanceRecorder
+from seqal.pool import Pool
 from seqal.tagger import SequenceTagger
+from seqal.trainer import InMemoryModelTrainer
 
-LabelInfo = namedtuple("LabelInfo", "idx text label")
+log = logging.getLogger(__name__)
+
+
+def is_converged(
+    train_loss_history: List[float], max_epochs: int, tolerance: float = 1e-2
+) -> bool:
+    """Check training is converged by train loss history.
+
+    Args:
+        train_loss_history (List[float]): Train loss of each epoch.
+        max_epochs (int): Maximum epoch number of training.
+        tolerance (float, optional): Tolerance of relative loss change. Defaults to 1e-2.
+
+    Returns:
+        bool: True if training stops before max_epochs by learning rate annealing,
+              or the relative change of train loss in the last epoch is smaller than tolerance.
+    """
+    if not train_loss_history:
+        return False
+    if len(train_loss_history) < max_epochs:
+        return True
+    if len(train_loss_history) < 2:
+        return False
+    previous_loss, last_loss = train_loss_history[-2:]
+    return abs(previous_loss - last_loss) <= tolerance * max(abs(previous_loss), 1e-12)
+
+
+def get_main_label(sent: Sentence, tag_type: str) -> str:
+    """Get the most frequent entity label in a sentence.
+
+    Args:
+        sent (Sentence): Labeled sentence.
+        tag_type (str): Tag type.
+
+    Returns:
+        str: The most frequent entity label, or "O" if the sentence has no entity.
+    """
+    labels = Counter(span.tag for span in sent.get_spans(tag_type))
+    if not labels:
+        return "O"
+    return labels.most_common(1)[0][0]
+
+
+def stratified_sample_ids(
+    strata: Dict[str, List[int]], sample_size: int, rng: np.random.Generator
+) -> List[int]:
+    """Sample ids from strata in proportion to stratum size.
+
+    The quota of each stratum is rounded by the largest remainder method,
+    so the total sample size is exactly sample_size.
+
+    Args:
+        strata (Dict[str, List[int]]): Ids in each stratum.
+        sample_size (int): Number of ids to sample. Must not be bigger than total id number.
+        rng (np.random.Generator): Random generator.
+
+    Returns:
+        List[int]: Sampled ids.
+    """
+    total = sum(len(ids) for ids in strata.values())
+    if sample_size <= 0 or total == 0:
+        return []
+
+    strata_ids = [ids for _, ids in sorted(strata.items())]
+    exact_quotas = np.array([len(ids) for ids in strata_ids]) * sample_size / total
+    quotas = np.floor(exact_quotas).astype(int)
+    remainder = sample_size - quotas.sum()
+    quotas[np.argsort(quotas - exact_quotas, kind="stable")[:remainder]] += 1
+
+    sampled_ids = []
+    for ids, quota in zip(strata_ids, quotas):
+        sampled_ids.extend(rng.choice(ids, quota, replace=False).tolist())
+    return sampled_ids
 
 
 def get_label_names(corpus: Corpus, label_type: str) -> List[str]:
     """Get all label names from corpus
 
+    seqal Corpus keeps tag counts, so only the sentences added since the last call are counted.
+    Other corpora are scanned by obtain_statistics.
+
     Args:
         corpus (Corpus): Corpus contains train, valid, test data.
 
     Returns:
         List: label name list.
     """
+    if isinstance(corpus, Corpus):
+        return corpus.get_label_names(label_type)
+
     data = corpus.obtain_statistics(label_type=label_type)
     data = json.loads(data)
     label_names = []
@@ -30,63 +119,49 @@ def get_label_names(corpus: Corpus, label_type: str) -> List[str]:
     return label_names
 
 
-def remove_queried_samples(sents: List[Sentence], queried_idx: List[int]) -> None:
-    """Remove queried data from data pool.
+def get_predicted_tag_type(tag_type: str) -> str:
+    """Get the label type that predicted tags are written to in research mode.
 
     Args:
-        sents (List[Sentence]): Sentences in data pool.
-        queried_idx (List[int]): Index list of queried data.
+        tag_type (str): Tag type of real tags, e.g. "ner".
+
+    Returns:
+        str: Label type of predicted tags, e.g. "predicted_ner".
     """
-    new_sents = []
-    query_sents = []
-    for i, sent in enumerate(sents):
-        if i in queried_idx:
-            query_sents.append(sent)
-        else:
-            new_sents.append(sent)
-    return new_sents, query_sents
+    return f"predicted_{tag_type}"
 
 
-def save_label_info(sents: List[Sentence]) -> List[List[LabelInfo]]:
-    """Save label information before prediction in case of overwriting.
+def remove_predicted_tags(sents: List[Sentence], predicted_tag_type: str) -> None:
+    """Remove predicted tags from sentences.
 
     Args:
-        sents (List[Sentence]): Sentences in data pool.
-
-    Returns:
-        List[List[LabelInfo]]: Labels information in each sentence.
+        sents (List[Sentence]): Sentences after prediction.
+        predicted_tag_type (str): Label type of predicted tags.
     """
-    labels_info = []
-
     for sent in sents:
-        sent_label_info = []
-        if len(sent.get_spans("ner")) != 0:
-            for token in sent:
-                tag = token.get_tag("ner")
-                sent_label_info.append(LabelInfo(token.idx, token.text, tag.value))
-        labels_info.append(sent_label_info)
-
-    return labels_info
+        for token in sent:
+            token.remove_labels(predicted_tag_type)
 
 
-def load_label_info(
-    sents: List[Sentence], labels_info: List[List[LabelInfo]]
-) -> List[Sentence]:
-    """Load label information after prediction.
+def remove_queried_samples(
+    sents: List[Sentence], queried_idx: List[int]
+) -> Tuple[List[Sentence], List[Sentence]]:
+    """Remove queried data from data pool.
 
     Args:
         sents (List[Sentence]): Sentences in data pool.
-        labels_info (List[List[LabelInfo]]): Labels information in each sentence.
+        queried_idx (List[int]): Index list of queried data.
 
     Returns:
-        List[Sentence]: Sentences in data pool.
+        Tuple[List[Sentence], List[Sentence]]:
+            new_sents: The data pool after removing queried data, in pool order.
+            query_sents: Queried data in the order of queried_idx, which is the query order of samplers.
+                         It was the pool order before.
     """
-    for idx_sent, sent_label_info in enumerate(labels_info):
-        if len(sent_label_info) != 0:
-            for idx_token, token_label_info in enumerate(sent_label_info):
-                sents[idx_sent][idx_token].add_tag("ner", token_label_info.label)
-
-    return sents
+    queried_idx_set = set(queried_idx)
+    new_sents = [sent for i, sent in enumerate(sents) if i not in queried_idx_set]
+    query_sents = [sents[i] for i in queried_idx]
+    return new_sents, query_sents
 
 
 class ActiveLearner:
@@ -98,6 +173,14 @@ class ActiveLearner:
             for instance, seqal.uncertainty.uncertainty_sampling.
         tagger_params: Parameters for model.
         trainer_params: Parameters for training process.
+        in_memory: If true, keep the best model in memory instead of writing model files and logs
+            in each training. Only a compact metrics record of each training is appended to metrics_path.
+        metrics_path: JSON lines file of training metrics in in_memory mode.
+        save_every: Save the trained model to dir_path every save_every trainings in in_memory mode.
+            0 means never, call save_model to save the model at the end.
+        feature_cache: Cache of embedding layer output of data pool. If set, the tagger embeds each
+            sentence in data pool once and reuses the output in later query rounds.
+            The embeddings must not be fine-tuned.
     Attributes:
         corpus: The corpus to be used in active learning loop.
         query_strategy: Sampler providing the query strategy for the active learning loop.
@@ -105,6 +188,10 @@ class ActiveLearner:
         trainer_params: Parameters for training process.
         trained_tagger: The tagger to be used in the active learning loop.
         label_names: Labels
+        queried_history: Queried sentence ids of each query round.
+        taught_samples: Labeled data added to corpus by teach.
+        list_pool: Pool of the data pool list returned by the last query.
+        list_pool_sentences: Data pool list returned by the last query.
 
     """
 
@@ -114,6 +201,10 @@ class ActiveLearner:
         query_strategy: Callable,
         tagger_params: dict,
         trainer_params: dict,
+        in_memory: bool = False,
+        metrics_path: str = "output/metrics.jsonl",
+        save_every: int = 0,
+        feature_cache: Optional[EmbeddingCache] = None,
     ) -> None:
         assert callable(query_strategy), "query_strategy must be callable"
         self.corpus = corpus
@@ -122,7 +213,20 @@ class ActiveLearner:
         self.trainer_params = trainer_params
         self.trained_tagger = None
         self.label_names = None
-
+        self.replay_strata = None
+        self.replay_strata_sentences = None
+        self.replay_strata_size = 0
+        self.queried_history = []
+        self.taught_samples = []
+        self.list_pool = None
+        self.list_pool_sentences = None
+        self.in_memory = in_memory
+        self.metrics_path = metrics_path
+        self.save_every = save_every
+        self.train_count = 0
+        self.feature_cache = feature_cache
+
+    @timed("initialize", items=lambda self, *args, **kwargs: self.corpus.train)
     def initialize(self, dir_path: str = "output/init_train") -> None:
         """Train model on labeled data.
 
@@ -138,67 +242,109 @@ class ActiveLearner:
 
         tagger = SequenceTagger(**self.tagger_params)
 
-        trainer = ModelTrainer(tagger, self.corpus)
-        trainer.train(dir_path, **self.trainer_params)
+        self.train_tagger(tagger, self.corpus, dir_path)
         self.trained_tagger = tagger
 
+    @timed("query")
     def query(
         self,
-        sents: List[Sentence],
+        sents: Union[List[Sentence], Pool],
         query_number: int,
         token_based: bool = False,
         research_mode: bool = False,
-    ) -> Tuple[List[Sentence], List[Sentence]]:
+        tagger: Optional[SequenceTagger] = None,
+    ) -> Tuple[List[Sentence], Union[List[Sentence], Pool]]:
         """Query data from pool (sents).
 
         Args:
-            sents (List[Sentence]): Data pool that consist of sentences.
+            sents (Union[List[Sentence], Pool]): Data pool that consist of sentences.
+                If it is a Pool, queried sentences are removed from it in place by their stable ids,
+                and the cost of removing is O(k) for k queried sentences.
+                If it is the list returned by the previous query, the Pool of the previous query is reused,
+                but the returned list is still created in O(N). Do not modify the list in place.
+                Other lists are wrapped in a new Pool.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                           If false, using query number as sentence number to query data.
             research_mode (bool, optional): If true, sents contains real NER tags.
+                                            Predicted tags are written to "predicted_{tag_type}" label type
+                                            and the real NER tags are not touched.
                                             If false, sents do not contains NER tags.
+            tagger (Optional[SequenceTagger], optional): Tagger to score data pool.
+                                                         Defaults to None, which means trained_tagger.
 
         Returns:
-            Tuple[List[Sentence], List[Sentence]]:
-                sents: The data pool after removing query samples.
-                queried_samples: Query samples.
+            Tuple[List[Sentence], Union[List[Sentence], Pool]]:
+                queried_samples: Query samples in the query order of sampler.
+                sents: The data pool after removing query samples. Same type as input sents.
         """
         tag_type = self.tagger_params["tag_type"]
         embeddings = self.tagger_params["embeddings"]
+        pool = self.get_pool(sents)
 
-        if research_mode is True:
-            # Save labels information before prediction in case of overwriting real NER tags.
-            # This is because Flair will assign NER tags to token after prediction
-            labels_info = save_label_info(sents)
+        # Flair assigns predicted tags to tokens. In research mode, predict into a separate
+        # label type, so the real NER tags in data pool are never overwritten.
+        predicted_tag_type = (
+            get_predicted_tag_type(tag_type) if research_mode else tag_type
+        )
+
+        tagger = self.trained_tagger if tagger is None else tagger
+        if self.feature_cache is not None:
+            tagger.set_feature_cache(self.feature_cache)
 
         queried_sent_ids = self.query_strategy(
-            sents,
-            tag_type,
+            pool,
+            predicted_tag_type,
             query_number,
             token_based,
-            tagger=self.trained_tagger,
+            tagger=tagger,
             label_names=self.label_names,
             embeddings=embeddings,
         )
 
+        # Remove queried data from pool by stable sentence ids
+        queried_samples = pool.remove(queried_sent_ids)
+        self.queried_history.append([int(i) for i in queried_sent_ids])
+
         if research_mode is True:
-            # Reload the real NER labels
-            sents = load_label_info(sents, labels_info)
+            # Queried samples are added to labeled data, drop their predicted tags
+            remove_predicted_tags(queried_samples, predicted_tag_type)
 
-        # Remove queried data from sents and create a new list to store queried data
-        sents_after_remove, queried_samples = remove_queried_samples(
-            sents, queried_sent_ids
-        )
+        if isinstance(sents, Pool):
+            return queried_samples, pool
+        self.list_pool_sentences = pool.to_list()
+        return queried_samples, self.list_pool_sentences
 
-        return queried_samples, sents_after_remove
+    def get_pool(self, sents: Union[List[Sentence], Pool]) -> Pool:
+        """Get Pool of data pool
 
+        The list returned by the previous query is backed by the same Pool, so the Pool is not created
+        again and sentence ids stay the ids in the first list. Other lists create a new Pool.
+
+        Args:
+            sents (Union[List[Sentence], Pool]): Data pool.
+
+        Returns:
+            Pool: Pool of sents.
+        """
+        if isinstance(sents, Pool):
+            return sents
+        if sents is self.list_pool_sentences and len(sents) == len(self.list_pool):
+            return self.list_pool
+        self.list_pool = Pool(sents)
+        self.list_pool_sentences = None
+        return self.list_pool
+
+    @timed("teach")
     def teach(
         self,
         queried_samples: List[Sentence],
         resume: bool = False,
         dir_path: str = "output/retrain",
-    ) -> None:
+        warm_start: bool = False,
+        replay: bool = False,
+        **kwargs,
+    ) -> Optional[dict]:
         """Retrain model on new labeled dataset.
 
         Args:
@@ -206,12 +352,32 @@ class ActiveLearner:
             resume (bool, optional): If true, train model on new labeled data.
                                      If false, train a new model on all labeled data.
             dir_path (str, optional): Directory path to save log and model. Defaults to "output/retrain".
+            warm_start (bool, optional): If true, train model of previous iteration on all labeled data
+                                         with a reduced epoch schedule. Defaults to False.
+            replay (bool, optional): If true, train model of previous iteration on new labeled data
+                                     mixed with a bounded replay sample of previous labeled data.
+                                     Defaults to False.
+
+        kwargs:
+            Parameters of the training mode, see warm_start and replay.
+
+        Returns:
+            Optional[dict]: Training report of warm start, None for other modes.
         """
+        if [resume, warm_start, replay].count(True) > 1:
+            raise ValueError(
+                "Only one of 'resume', 'warm_start' and 'replay' can be True"
+            )
+        self.taught_samples.extend(queried_samples)
+
         if resume is True:
             self.resume(queried_samples, dir_path)
+        elif warm_start is True:
+            return self.warm_start(queried_samples, dir_path, **kwargs)
+        elif replay is True:
+            self.replay(queried_samples, dir_path, **kwargs)
         else:
-            for sample in queried_samples:
-                self.corpus.train.sentences.append(sample)
+            self.corpus.add_queried_samples(queried_samples)
             self.initialize(dir_path)
 
     def resume(
@@ -219,5 +385,260 @@ class ActiveLearner:
     ) -> None:
         """Train model on the new labeled data"""
         self.corpus.train.sentences = queried_samples
-        trainer = ModelTrainer(self.trained_tagger, self.corpus)
-        trainer.train(dir_path, **self.trainer_params)
+        self.train_tagger(self.trained_tagger, self.corpus, dir_path)
+
+    def warm_start(
+        self,
+        queried_samples: List[Sentence],
+        dir_path: str = "output/retrain",
+        epoch_ratio: float = 0.2,
+        tolerance: float = 1e-2,
+    ) -> dict:
+        """Train model of previous iteration on all labeled data.
+
+        The tagger keeps the weights of previous iteration, so it needs fewer epochs than training
+        from random weights. The epoch number is max_epochs in trainer_params scaled by the ratio
+        of new labeled data, and it is at least epoch_ratio * max_epochs.
+        If queried samples contain new tags, the output layer can not be reused,
+        so a new model is trained by initialize.
+
+        Args:
+            queried_samples (List[Sentence]): new labeled data.
+            dir_path (str, optional): Directory path to save log and model. Defaults to "output/retrain".
+            epoch_ratio (float, optional): Minimum ratio of max_epochs to train. Defaults to 0.2.
+            tolerance (float, optional): The model is converged if the relative change of train loss
+                                         in the last epoch is smaller than tolerance. Defaults to 1e-2.
+
+        Returns:
+            dict: Training report.
+                epochs: Epoch number of the schedule.
+                train_loss_history: Train loss of each epoch.
+                converged: Whether the model is converged.
+                warm_started: False if a new model is trained because of new tags.
+        """
+        self.corpus.add_queried_samples(queried_samples)
+
+        if self.trained_tagger is None or self.is_tag_dictionary_changed():
+            log.info("Tag dictionary changed, train a new model on all labeled data")
+            self.initialize(dir_path)
+            return {
+                "epochs": self.trainer_params.get("max_epochs", 100),
+                "train_loss_history": [],
+                "converged": False,
+                "warm_started": False,
+            }
+
+        max_epochs = self.trainer_params.get("max_epochs", 100)
+        new_data_ratio = len(queried_samples) / len(self.corpus.train)
+        epochs = min(
+            max_epochs, max(1, math.ceil(max_epochs * max(epoch_ratio, new_data_ratio)))
+        )
+        trainer_params = {**self.trainer_params, "max_epochs": epochs}
+
+        result = self.train_tagger(
+            self.trained_tagger, self.corpus, dir_path, trainer_params
+        )
+
+        train_loss_history = result.get("train_loss_history", [])
+        report = {
+            "epochs": epochs,
+            "train_loss_history": train_loss_history,
+            "converged": is_converged(train_loss_history, epochs, tolerance),
+            "warm_started": True,
+        }
+        log.info(
+            f"Warm start trained {len(train_loss_history)}/{epochs} epochs, converged: {report['converged']}"
+        )
+        return report
+
+    def replay(
+        self,
+        queried_samples: List[Sentence],
+        dir_path: str = "output/retrain",
+        replay_ratio: float = 1.0,
+        buffer_size: int = 1000,
+        random_state: Optional[int] = 0,
+    ) -> None:
+        """Train model of previous iteration on new labeled data mixed with replayed labeled data.
+
+        All labeled data is kept in corpus.train, but the model is only trained on the new labeled data
+        and a replay sample of previous labeled data. The replay sample is stratified by the main entity
+        label of each sentence and its size is bounded by buffer_size,
+        so the training cost of each iteration does not grow with the labeled data.
+        If queried samples contain new tags, a new model is trained by initialize.
+
+        Args:
+            queried_samples (List[Sentence]): new labeled data.
+            dir_path (str, optional): Directory path to save log and model. Defaults to "output/retrain".
+            replay_ratio (float, optional): Replayed sentence number per new sentence. Defaults to 1.0.
+            buffer_size (int, optional): Maximum replayed sentence number. Defaults to 1000.
+            random_state (Optional[int], optional): Seed to sample replayed sentences. Defaults to 0.
+        """
+        # Index previous labeled data before adding queried samples
+        self.update_replay_strata()
+        labeled_count = len(self.corpus.train)
+        self.corpus.add_queried_samples(queried_samples)
+
+        if self.trained_tagger is None or self.is_tag_dictionary_changed():
+            log.info("Tag dictionary changed, train a new model on all labeled data")
+            self.initialize(dir_path)
+            return
+
+        replay_size = min(
+            buffer_size, math.ceil(replay_ratio * len(queried_samples)), labeled_count
+        )
+        rng = np.random.default_rng(random_state)
+        replay_ids = stratified_sample_ids(self.replay_strata, replay_size, rng)
+        replay_samples = [self.corpus.train.sentences[i] for i in replay_ids]
+        log.info(
+            f"Replay {len(replay_samples)} of {labeled_count} labeled sentences "
+            f"with {len(queried_samples)} new sentences"
+        )
+
+        replay_corpus = Corpus(
+            train=SentenceDataset(list(queried_samples) + replay_samples),
+            dev=self.corpus.dev,
+            test=self.corpus.test,
+            name=self.corpus.name,
+            sample_missing_splits=False,
+        )
+        self.train_tagger(self.trained_tagger, replay_corpus, dir_path)
+
+    def train_tagger(
+        self,
+        tagger: SequenceTagger,
+        corpus: Corpus,
+        dir_path: str,
+        trainer_params: Optional[dict] = None,
+    ) -> dict:
+        """Train tagger on corpus by flair ModelTrainer, or InMemoryModelTrainer in in_memory mode.
+
+        Args:
+            tagger (SequenceTagger): Tagger to train.
+            corpus (Corpus): Corpus to train on.
+            dir_path (str): Directory path to save log and model.
+            trainer_params (Optional[dict], optional): Parameters for training process.
+                                                       Defaults to None, which means self.trainer_params.
+
+        Returns:
+            dict: Training result of flair ModelTrainer.
+        """
+        if trainer_params is None:
+            trainer_params = self.trainer_params
+        if self.in_memory is False:
+            trainer = ModelTrainer(tagger, corpus)
+            return trainer.train(dir_path, **trainer_params)
+
+        trainer = InMemoryModelTrainer(tagger, corpus)
+        result = trainer.train(dir_path, **trainer_params)
+        self.train_count += 1
+
+        record = {
+            "round": self.train_count,
+            "dir_path": str(dir_path),
+            "labeled_size": len(corpus.train),
+            "test_score": float(result["test_score"]),
+            "train_loss_history": [
+                float(loss) for loss in result["train_loss_history"]
+            ],
+            "dev_score_history": [
+                float(score) for score in result["dev_score_history"]
+            ],
+        }
+        Path(self.metrics_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.metrics_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+
+        if self.save_every > 0 and self.train_count % self.save_every == 0:
+            self.save_model(Path(dir_path) / "final-model.pt", tagger)
+        return result
+
+    def save_model(
+        self,
+        file_path: Union[str, Path] = "output/final-model.pt",
+        tagger: Optional[SequenceTagger] = None,
+    ) -> None:
+        """Save tagger to file.
+
+        Args:
+            file_path (Union[str, Path], optional): Model file path. Defaults to "output/final-model.pt".
+            tagger (Optional[SequenceTagger], optional): Tagger to save. Defaults to None, which means trained_tagger.
+        """
+        tagger = self.trained_tagger if tagger is None else tagger
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        tagger.save(file_path)
+        log.info(f"Saved model to {file_path}")
+
+    def update_replay_strata(self) -> None:
+        """Index labeled sentences that are not in replay strata yet by their main entity label"""
+        tag_type = self.tagger_params["tag_type"]
+        train_sents = self.corpus.train.sentences
+        if (
+            self.replay_strata is None
+            or self.replay_strata_sentences is not train_sents
+            or self.replay_strata_size > len(train_sents)
+        ):
+            # Labeled data was replaced (e.g. by resume), index it again
+            self.replay_strata = defaultdict(list)
+            self.replay_strata_sentences = train_sents
+            self.replay_strata_size = 0
+
+        for sent_id in range(self.replay_strata_size, len(train_sents)):
+            label = get_main_label(train_sents[sent_id], tag_type)
+            self.replay_strata[label].append(sent_id)
+        self.replay_strata_size = len(train_sents)
+
+    def is_tag_dictionary_changed(self) -> bool:
+        """Check tags in labeled data are different from tags of trained tagger"""
+        tag_type = self.tagger_params["tag_type"]
+        tag_dictionary = self.corpus.make_tag_dictionary(tag_type=tag_type)
+        return set(tag_dictionary.get_items()) != set(
+            self.trained_tagger.tag_dictionary.get_items()
+        )
+
+    def save_checkpoint(
+        self,
+        path: str = "output/checkpoint",
+        pool: Optional[Pool] = None,
+        recorder: Optional[PerformanceRecorder] = None,
+    ) -> None:
+        """Save active learning loop state to a crash-safe checkpoint.
+
+        The checkpoint keeps queried sentence ids of each round, labeled data added by teach,
+        label names, the state_dict of trained tagger, sampler state, the membership of pool,
+        recorder state and the training count. Call it after teach in each iteration.
+        Labeled data is appended, so only the new labeled data of each round is written.
+
+        Args:
+            path (str, optional): Checkpoint directory. Defaults to "output/checkpoint".
+            pool (Optional[Pool], optional): Data pool. Defaults to None.
+            recorder (Optional[PerformanceRecorder], optional): Performance recorder. Defaults to None.
+        """
+        Checkpoint(path).save(self, pool, recorder)
+        log.info(
+            f"Saved checkpoint of query round {len(self.queried_history)} to {path}"
+        )
+
+    def resume_from(
+        self,
+        path: str = "output/checkpoint",
+        pool: Optional[Pool] = None,
+        recorder: Optional[PerformanceRecorder] = None,
+    ) -> None:
+        """Restore active learning loop state from checkpoint instead of calling initialize.
+
+        The learner should be created with the same seed corpus, sampler and parameters as the
+        saved one, and pool should be created with the same sentences.
+        Labeled data in checkpoint is added to corpus.train and the trained tagger is rebuilt
+        from its state_dict, so the next query is the same as the one without interruption.
+
+        Args:
+            path (str, optional): Checkpoint directory. Defaults to "output/checkpoint".
+            pool (Optional[Pool], optional): Data pool to restore membership. Defaults to None.
+            recorder (Optional[PerformanceRecorder], optional): Performance recorder to restore.
+                                                                Defaults to None.
+        """
+        Checkpoint(path).load(self, pool, recorder)
+        log.info(
+            f"Resumed from checkpoint of query round {len(self.queried_history)} in {path}"
+        )
@@ -1,14 +1,138 @@
+import re
 import string
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-from flair.data import Sentence
+from flair.data import Label, Sentence, Token
 from spacy.language import Language
-
-from seqal import utils
+from spacy.tokens import Doc
+
+from seqal.tag_scheme import TagSchemeConverter, convert_tags
+from seqal.transformer import TokenizationCache, pipe_texts
+from seqal.utils import paused_gc
+
+PUNCTUATION = re.escape(string.punctuation)
+
+# A word with the space at the end of sentence, a punctuation or the space at the end of sentence
+SPACED_TOKEN_PATTERN = re.compile(rf"[^{PUNCTUATION} ]+(?: \Z)?|[{PUNCTUATION}]| \Z")
+
+# A punctuation or a space that is not the end of sentence, without a word before it
+SPACED_EMPTY_TOKEN_PATTERN = re.compile(
+    rf"(?<![^{PUNCTUATION} ])(?:[{PUNCTUATION}]| (?!\Z))"
+)
+
+
+# Characters that flair Sentence replaces or removes in token texts
+SPECIAL_CHARACTER_PATTERN = re.compile("[\u0080-\u0099\u200b\u200c\ufe0f\ufeff]")
+
+
+def build_sentence(
+    texts: Sequence[str],
+    tags: Sequence[str],
+    tag_type: str = "ner",
+    labels: Optional[Dict[str, Label]] = None,
+) -> Sentence:
+    """Create a sentence with a tag on each token in one pass
+
+    Tokens are created with their labels, instead of Sentence(texts) and add_tag on each token.
+    Tokens with the same tag share one Label from labels. Texts that flair Sentence changes,
+    e.g. empty texts or zero-width characters, and tags of a different length are created
+    by Sentence and add_tag, so the result is the same.
+
+    Args:
+        texts (Sequence[str]): Token texts.
+        tags (Sequence[str]): Tag of each token.
+        tag_type (str, optional): Tag type. Defaults to "ner".
+        labels (Optional[Dict[str, Label]], optional): Labels by tag, new labels are added to it.
+                                                       Defaults to None.
+
+    Returns:
+        Sentence: Sentence with tags.
+    """
+    if (
+        len(texts) != len(tags)
+        or not all(texts)
+        or SPECIAL_CHARACTER_PATTERN.search("".join(texts))
+    ):
+        sentence = Sentence(list(texts))
+        for i, tag in enumerate(tags):
+            sentence[i].add_tag(tag_type, tag)
+        return sentence
+
+    if labels is None:
+        labels = {}
+    sentence = Sentence()
+    tokens = sentence.tokens
+    for idx, (text, tag) in enumerate(zip(texts, tags), 1):
+        label = labels.get(tag)
+        if label is None:
+            label = labels[tag] = Label(tag)
+        token = Token(text, idx=idx)
+        token.sentence = sentence
+        token.annotation_layers[tag_type] = [label]
+        tokens.append(token)
+    return sentence
+
+
+def build_sentence_chunk(
+    samples: List[Tuple[Sequence[str], Sequence[str]]], tag_type: str
+) -> List[Sentence]:
+    """Create sentences of (texts, tags) samples with shared labels"""
+    labels: Dict[str, Label] = {}
+    with paused_gc():
+        return [
+            build_sentence(texts, tags, tag_type, labels) for texts, tags in samples
+        ]
+
+
+def build_sentences(
+    token_lists: Iterable[Sequence[str]],
+    tag_lists: Iterable[Sequence[str]],
+    tag_type: str = "ner",
+    workers: int = 1,
+    chunk_size: int = 1000,
+) -> List[Sentence]:
+    """Create sentences with tags by build_sentence
+
+    Args:
+        token_lists (Iterable[Sequence[str]]): Token texts of each sentence.
+        tag_lists (Iterable[Sequence[str]]): Tags of each sentence.
+        tag_type (str, optional): Tag type. Defaults to "ner".
+        workers (int, optional): Number of processes. Defaults to 1, sentences are created
+                                 in this process. Sentences are pickled back from other processes,
+                                 so it only helps large batches.
+        chunk_size (int, optional): Sentence number sent to a process at a time. Defaults to 1000.
+
+    Returns:
+        List[Sentence]: Sentences in the same order as token_lists.
+    """
+    samples = list(zip(token_lists, tag_lists))
+    if workers <= 1 or len(samples) <= chunk_size:
+        return build_sentence_chunk(samples, tag_type)
+
+    chunks = [
+        samples[start:end]
+        for start, end in zip(
+            range(0, len(samples), chunk_size),
+            range(chunk_size, len(samples) + chunk_size, chunk_size),
+        )
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor, paused_gc():
+        results = executor.map(build_sentence_chunk, chunks, repeat(tag_type))
+        return [sentence for sentences in results for sentence in sentences]
 
 
 class Aligner:
-    """Align tokens and tags."""
+    """Align tokens and tags.
+
+    Args:
+        cache (Optional[TokenizationCache], optional): Cache of spacy tokenization for non-spaced language,
+                                                       can be shared with Transformer. Defaults to None.
+    """
+
+    def __init__(self, cache: Optional[TokenizationCache] = None) -> None:
+        self.cache = cache
 
     def concat_tags(self, tags: List[str]) -> str:
         """Concat tags together
@@ -39,6 +163,66 @@ class Aligner:
     ) -> Tuple[List[str], List[str]]:
         """Align token and tags for spaced language.
 
+        Token boundaries are found by a regular expression over the joined characters,
+        and each token takes the tags at its offsets. Sentences that align_spaced_language_by_char
+        can not align, e.g. a punctuation after a space, go to it, so the result and errors are the same.
+
+        Args:
+            sentence (List[str]): A list of character.
+            tags (List[str]): A list of tags
+
+        Returns:
+            sentence (List[str]): A list of token.
+            tags (List[str]): A list of tags.
+        """
+        text = "".join(sentence)
+        if (
+            len(text) != len(sentence)
+            or len(tags) < len(sentence)
+            or SPACED_EMPTY_TOKEN_PATTERN.search(text)
+        ):
+            return self.align_spaced_language_by_char(sentence, tags)
+
+        matches = list(SPACED_TOKEN_PATTERN.finditer(text))
+        final_sentence = [match.group() for match in matches]
+        if type(self).concat_tags is Aligner.concat_tags:
+            # concat_tags takes the first tag, which is the tag at the token start
+            final_tags = [tags[match.start()] for match in matches]
+            return final_sentence, final_tags
+
+        final_tags = []
+        for token, match in zip(final_sentence, matches):
+            start, end = match.span()
+            if len(token) == 1 and token in string.punctuation:
+                final_tags.append(tags[start])
+            else:
+                final_tags.append(self.concat_tags(tags[start:end]))
+
+        return final_sentence, final_tags
+
+    def align_spaced_language_many(
+        self, sentences: Iterable[List[str]], tags: Iterable[List[str]]
+    ) -> List[Tuple[List[str], List[str]]]:
+        """Align token and tags of many sentences for spaced language.
+
+        Args:
+            sentences (Iterable[List[str]]): Lists of character.
+            tags (Iterable[List[str]]): Lists of tags
+
+        Returns:
+            List[Tuple[List[str], List[str]]]: Tokens and tags of each sentence.
+        """
+        align = self.align_spaced_language
+        return [
+            align(sentence, sentence_tags)
+            for sentence, sentence_tags in zip(sentences, tags)
+        ]
+
+    def align_spaced_language_by_char(
+        self, sentence: List[str], tags: List[str]
+    ) -> Tuple[List[str], List[str]]:
+        """Align token and tags for spaced language character by character.
+
         Args:
             sentence (List[str]): A list of character.
             tags (List[str]): A list of tags
@@ -93,15 +277,48 @@ class Aligner:
             sentence (List[str]): A list of token
             tags (List[str]): A list of tags
         """
+        if self.cache is not None:
+            texts, starts = self.cache.tokenize(spacy_model, "".join(sentence))
+            return self.align_tokens(texts, starts, tags)
+
         doc = spacy_model("".join(sentence))
+        return self.align_doc(doc, tags)
 
+    def align_doc(self, doc: Doc, tags: List[str]) -> Tuple[List[str], List[str]]:
+        """Align tokens of a tokenized doc and character tags.
+
+        Args:
+            doc (Doc): Spacy doc of the joined characters
+            tags (List[str]): A list of tags of characters
+
+        Returns:
+            sentence (List[str]): A list of token
+            tags (List[str]): A list of tags
+        """
+        return self.align_tokens(
+            [token.text for token in doc], [token.idx for token in doc], tags
+        )
+
+    def align_tokens(
+        self, texts: Sequence[str], starts: Sequence[int], tags: List[str]
+    ) -> Tuple[List[str], List[str]]:
+        """Align tokens and character tags.
+
+        Args:
+            texts (Sequence[str]): Token texts
+            starts (Sequence[int]): Start character position of each token
+            tags (List[str]): A list of tags of characters
+
+        Returns:
+            sentence (List[str]): A list of token
+            tags (List[str]): A list of tags
+        """
         final_sentence = []
         final_tags = []
 
-        for token in doc:
-            final_sentence.append(token.text)
-            token_start = token.idx
-            token_end = token.idx + len(token.text)
+        for text, token_start in zip(texts, starts):
+            final_sentence.append(text)
+            token_end = token_start + len(text)
 
             token_tags = tags[token_start:token_end]
             final_tags.append(self.concat_tags(token_tags))
@@ -132,17 +349,13 @@ class Aligner:
             tags (List[str]): A list of tags.
                 Example of spaced language: ["B-LOC", "O", "O", "O"]
         """
-        if input_schema == "BILOU":
-            tags = utils.bilou2bio(tags)
-        elif input_schema == "BIOES":
-            tags = utils.bioes2bio(tags)
+        tags = convert_tags(tags, input_schema, "BIO")
 
         final_sentence, final_tags = self.align_spaced_language(
             sentence=sentence, tags=tags
         )
 
-        if output_schema == "BIOES":
-            tags = utils.bio2bioes(tags)
+        final_tags = convert_tags(final_tags, "BIO", output_schema)
 
         return final_sentence, final_tags
 
@@ -172,17 +385,13 @@ class Aligner:
             tags (List[str]): A list of tags.
                 Example of non-spaced language: ["B-LOC", "O", "O", "O"]
         """
-        if input_schema == "BILOU":
-            tags = utils.bilou2bio(tags)
-        elif input_schema == "BIOES":
-            tags = utils.bioes2bio(tags)
+        tags = convert_tags(tags, input_schema, "BIO")
 
         final_sentence, final_tags = self.align_non_spaced_language(
             sentence=sentence, tags=tags, spacy_model=spacy_model
         )
 
-        if output_schema == "BIOES":
-            tags = utils.bio2bioes(tags)
+        final_tags = convert_tags(final_tags, "BIO", output_schema)
 
         return final_sentence, final_tags
 
@@ -192,6 +401,7 @@ class Aligner:
         input_schema: str = "BIO",
         output_schema: str = "BIO",
         tag_type: str = "ner",
+        workers: int = 1,
     ) -> List[Sentence]:
         """Add tags to sentence on character based
 
@@ -208,28 +418,26 @@ class Aligner:
             output_schema (str, optional): Output tag shema. Defaults to "BIO". Support "BIO", "BIOES"
                                            Flair don't support "BILOU", so we don't output this schema.
             tag_type (str, optional): Tag type. Defaults to "ner".
+            workers (int, optional): Number of processes to create sentences. Defaults to 1.
 
         Returns:
             annotated_sentence (List[Sentence]): A list of sentence.
         """
-        annotated_sentence = []
-        for sample in labled_data:
-            sentence = sample["text"]
-            tags = sample["labels"]
-
-            subword_sentence, subword_tags = self.to_subword_spaced_language(
-                sentence=sentence,
-                tags=tags,
-                input_schema=input_schema,
-                output_schema=output_schema,
-            )
-
-            sentence = Sentence(subword_sentence)
-            for i, tag in enumerate(subword_tags):
-                sentence[i].add_tag(tag_type, tag)
-            annotated_sentence.append(sentence)
+        # Convert tags of all samples at once, then align in BIO
+        bio_tags = TagSchemeConverter(input_schema, "BIO").convert(
+            sample["labels"] for sample in labled_data
+        )
+        aligned = self.align_spaced_language_many(
+            (sample["text"] for sample in labled_data), bio_tags
+        )
+        subword_sentences = [subword_sentence for subword_sentence, _ in aligned]
+        subword_tags = TagSchemeConverter("BIO", output_schema).convert(
+            tags for _, tags in aligned
+        )
 
-        return annotated_sentence
+        return build_sentences(
+            subword_sentences, subword_tags, tag_type=tag_type, workers=workers
+        )
 
     def add_tags_on_char_non_spaced_language(
         self,
@@ -238,6 +446,9 @@ class Aligner:
         output_schema: str = "BIO",
         tag_type: str = "ner",
         spacy_model: Language = None,
+        batch_size: int = 1000,
+        n_process: int = 1,
+        workers: int = 1,
     ) -> List[Sentence]:
         """Add tags to sentence on character based
 
@@ -255,32 +466,44 @@ class Aligner:
                                         Flair don't support "BILOU", so we don't output this schema.
             tag_type (str, optional): Tag type. Defaults to "ner".
             spacy_model (Language): Spacy language model
+            batch_size (int, optional): Sample number of a batch for spacy_model.pipe. Defaults to 1000.
+            n_process (int, optional): Process number of spacy_model.pipe. Defaults to 1.
+            workers (int, optional): Number of processes to create sentences. Defaults to 1.
 
         Returns:
             annotated_sentence (List[Sentence]): A list of sentence.
         """
-        annotated_sentence = []
-        for sample in labled_data:
-            sentence = sample["text"]
-            tags = sample["labels"]
-
-            subword_sentence, subword_tags = self.to_subword_non_spaced_language(
-                sentence=sentence,
-                tags=tags,
-                spacy_model=spacy_model,
-                input_schema=input_schema,
-                output_schema=output_schema,
+        # Convert tags of all samples at once, then align in BIO
+        bio_tags = TagSchemeConverter(input_schema, "BIO").convert(
+            sample["labels"] for sample in labled_data
+        )
+        # Tokenize all samples in batches with the tokenizer only
+        texts = ["".join(sample["text"]) for sample in labled_data]
+        if self.cache is not None:
+            tokens = self.cache.tokenize_many(
+                spacy_model, texts, batch_size=batch_size, n_process=n_process
             )
-
-            sentence = Sentence(subword_sentence)
-            for i, tag in enumerate(subword_tags):
-                sentence[i].add_tag(tag_type, tag)
-            annotated_sentence.append(sentence)
-
-        return annotated_sentence
+        else:
+            tokens = (
+                ([token.text for token in doc], [token.idx for token in doc])
+                for doc in pipe_texts(
+                    spacy_model, texts, batch_size=batch_size, n_process=n_process
+                )
+            )
+        subword_sentences = []
+        subword_tags = []
+        for (token_texts, starts), tags in zip(tokens, bio_tags):
+            subword_sentence, tags = self.align_tokens(token_texts, starts, tags)
+            subword_sentences.append(subword_sentence)
+            subword_tags.append(tags)
+        subword_tags = TagSchemeConverter("BIO", output_schema).convert(subword_tags)
+
+        return build_sentences(
+            subword_sentences, subword_tags, tag_type=tag_type, workers=workers
+        )
 
     def add_tags_on_token(
-        self, labled_data: List[dict], tag_type: str = "ner"
+        self, labled_data: List[dict], tag_type: str = "ner", workers: int = 1
     ) -> List[Sentence]:
         """Add tags to sentence on token based
 
@@ -301,15 +524,14 @@ class Aligner:
                         }
                     ]
             tag_type (str, optional): Tag type. Defaults to "ner".
+            workers (int, optional): Number of processes to create sentences. Defaults to 1.
 
         Returns:
             annotated_sentence (List[Sentence]): A list of sentence.
         """
-        annotated_sentence = []
-        for sample in labled_data:
-            sentence = Sentence(sample["text"])
-            for i, tag in enumerate(sample["labels"]):
-                sentence[i].add_tag(tag_type, tag)
-            annotated_sentence.append(sentence)
-
-        return annotated_sentence
+        return build_sentences(
+            (sample["text"] for sample in labled_data),
+            (sample["labels"] for sample in labled_data),
+            tag_type=tag_type,
+            workers=workers,
+        )
@@ -0,0 +1,202 @@
+import asyncio
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from flair.data import Sentence
+
+from seqal.active_learner import ActiveLearner
+from seqal.pool import Pool
+
+log = logging.getLogger(__name__)
+
+# Modes of ActiveLearner.teach that train the existing tagger in place
+IN_PLACE_MODES = ("resume", "warm_start", "replay")
+
+
+@dataclass
+class QueriedBatch:
+    """Queried samples of one query round
+
+    Attributes:
+        batch_id (int): Query round of the batch, starts from 0.
+        generation (int): Generation of the model that scored the batch.
+        sent_ids (List[int]): Stable sentence ids in Pool.
+        sentences (List[Sentence]): Queried samples.
+    """
+
+    batch_id: int
+    generation: int
+    sent_ids: List[int]
+    sentences: List[Sentence]
+
+
+class AsyncActiveLearner:
+    """Asynchronous driver of ActiveLearner for annotation mode.
+
+    Annotators label the current batch while the model is retrained in a background worker,
+    and the next batch is prefetched by scoring with the current model at the same time.
+    The model trained on the new labeled data is swapped in when training finishes.
+
+    Consistency rules:
+        - Model generation 0 is the trained tagger of learner when the driver is created.
+          Each finished training increments the generation by 1.
+        - Each batch is scored by one model snapshot and records its generation.
+          Batch k is prefetched when annotators start labeling batch k - 1, with the newest model
+          at that time, and it is not scored again after a swap. So batch k is never scored by
+          a model trained on batch k - 1.
+        - Only one training runs at a time. Annotated samples submitted during training are queued
+          and all of them are trained in the next training, so generation g + 1 is trained
+          on all samples submitted before it starts.
+        - Sentences are removed from pool when they are queried, so a sentence is never
+          queried twice even if batches are scored by different generations.
+
+    Args:
+        learner (ActiveLearner): Initialized active learner.
+        pool (Pool): Data pool.
+        query_number (int): Batch query number.
+        token_based (bool, optional): If true, using query number as token number to query data.
+                                      If false, using query number as sentence number to query data.
+        dir_path (str, optional): Directory path to save log and model of each training.
+                                  Defaults to "output/retrain".
+        teach_kwargs: Parameters of ActiveLearner.teach, e.g. warm_start=True.
+
+    Attributes:
+        generation (int): Generation of the current model.
+        tagger: The current model snapshot used to score data pool.
+    """
+
+    def __init__(
+        self,
+        learner: ActiveLearner,
+        pool: Pool,
+        query_number: int,
+        token_based: bool = False,
+        dir_path: str = "output/retrain",
+        **teach_kwargs,
+    ) -> None:
+        self.learner = learner
+        self.pool = pool
+        self.query_number = query_number
+        self.token_based = token_based
+        self.dir_path = dir_path
+        self.teach_kwargs = teach_kwargs
+        self.generation = 0
+        self.tagger = learner.trained_tagger
+        self.batch_count = 0
+        self.pending_samples = []
+        self.training_task = None
+        self.query_lock = None
+        # One worker for scoring and one for training, so they can overlap
+        self.executor = ThreadPoolExecutor(max_workers=2)
+
+    async def query(self, query_number: Optional[int] = None) -> QueriedBatch:
+        """Query a batch from pool with the current model snapshot.
+
+        Args:
+            query_number (Optional[int], optional): Batch query number.
+                                                    Defaults to None, which means query_number of driver.
+
+        Returns:
+            QueriedBatch: Queried samples and the generation of the model that scored them.
+        """
+        loop = asyncio.get_running_loop()
+        if self.query_lock is None:
+            # Create the lock in the running event loop
+            self.query_lock = asyncio.Lock()
+        async with self.query_lock:
+            generation, tagger = self.generation, self.tagger
+            batch_id = self.batch_count
+            self.batch_count += 1
+            queried_samples, sent_ids = await loop.run_in_executor(
+                self.executor, self.score, tagger, query_number or self.query_number
+            )
+        log.info(
+            f"Queried batch {batch_id} of {len(queried_samples)} sentences "
+            f"with model generation {generation}"
+        )
+        return QueriedBatch(batch_id, generation, sent_ids, queried_samples)
+
+    def score(self, tagger, query_number: int) -> Tuple[List[Sentence], List[int]]:
+        """Query data pool with a model snapshot, run in background worker"""
+        queried_samples, _ = self.learner.query(
+            self.pool, query_number, self.token_based, tagger=tagger
+        )
+        return queried_samples, self.learner.queried_history[-1]
+
+    def submit(self, annotated_samples: List[Sentence]) -> None:
+        """Submit annotated samples and start training in background if no training is running.
+
+        Args:
+            annotated_samples (List[Sentence]): Annotated samples of a batch.
+        """
+        self.pending_samples.extend(annotated_samples)
+        if self.training_task is None or self.training_task.done():
+            self.training_task = asyncio.create_task(self.train())
+
+    async def train(self) -> None:
+        """Train new models until there is no pending annotated sample, and swap them in."""
+        loop = asyncio.get_running_loop()
+        while self.pending_samples:
+            samples, self.pending_samples = self.pending_samples, []
+            generation = self.generation + 1
+            await loop.run_in_executor(self.executor, self.teach, samples, generation)
+            self.generation = generation
+            self.tagger = self.learner.trained_tagger
+            log.info(
+                f"Swapped in model generation {generation} trained with {len(samples)} new sentences"
+            )
+
+    def teach(self, samples: List[Sentence], generation: int) -> None:
+        """Train model of the next generation, run in background worker"""
+        if any(self.teach_kwargs.get(mode) for mode in IN_PLACE_MODES):
+            # These modes train the tagger in place, keep the snapshot for scoring untouched.
+            # The copy shares the feature cache, only the model is copied.
+            self.learner.trained_tagger = copy.deepcopy(self.tagger)
+        self.learner.teach(
+            samples, dir_path=f"{self.dir_path}_{generation}", **self.teach_kwargs
+        )
+
+    async def wait_training(self) -> None:
+        """Wait until background training finishes"""
+        if self.training_task is not None:
+            await self.training_task
+
+    async def run(
+        self,
+        annotate: Callable[[List[Sentence]], Awaitable[List[Sentence]]],
+        iterations: int,
+    ) -> List[QueriedBatch]:
+        """Run active learning cycle in annotation mode.
+
+        Args:
+            annotate (Callable[[List[Sentence]], Awaitable[List[Sentence]]]): Coroutine function
+                that sends queried samples to annotators and returns annotated samples.
+            iterations (int): Number of query rounds.
+
+        Returns:
+            List[QueriedBatch]: Queried batches in query order.
+        """
+        batches = []
+        try:
+            batch = await self.query()
+            for i in range(iterations):
+                batches.append(batch)
+                # Prefetch the next batch while annotators label the current batch
+                prefetch_task = (
+                    asyncio.create_task(self.query()) if i < iterations - 1 else None
+                )
+                annotated_samples = await annotate(batch.sentences)
+                self.submit(annotated_samples)
+                if prefetch_task is not None:
+                    batch = await prefetch_task
+            await self.wait_training()
+        finally:
+            self.close()
+        return batches
+
+    def close(self) -> None:
+        """Shut down background workers"""
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,317 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+from flair.data import FlairDataset, Sentence, Token
+from flair.datasets.base import find_train_dev_test_files
+
+from seqal.datasets import Corpus, LazyColumnDataset
+from seqal.utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+
+def tag_file_name(tag_type: str) -> str:
+    """File of tag ids of a tag type"""
+    return f"tags.{tag_type}.npy"
+
+
+def convert_column_file(
+    path_to_column_file: Union[str, Path],
+    output_dir: Union[str, Path],
+    column_name_map: Dict[int, str],
+    **dataset_kwargs,
+) -> "BinaryColumnDataset":
+    """Convert a column-formatted file to the seqal binary format
+
+    The file is parsed once by LazyColumnDataset, so comments, label_name_map and tag_to_bioes
+    are handled like ColumnCorpus. Token texts are interned in a vocabulary, and token ids,
+    tag ids and sentence offsets are written to arrays whose sizes are known from the index,
+    so the conversion uses constant memory.
+
+    The output directory contains:
+        meta.json: Format version, sentence and token numbers, tags of each tag type.
+        vocab.bin, vocab_offsets.npy: UTF-8 token texts and their offsets.
+        tokens.npy: Token id of each token.
+        spaces.npy: Whether each token is followed by whitespace.
+        offsets.npy: First token position of each sentence, with token number at the end.
+        tags.{tag_type}.npy: Tag id of each token, -1 if the token has no tag.
+
+    meta.json is written last, so a directory without it is an unfinished conversion.
+
+    Args:
+        path_to_column_file (Union[str, Path]): The column-formatted file.
+        output_dir (Union[str, Path]): Directory to write the binary dataset.
+        column_name_map (Dict[int, str]): A map specifying the column format.
+        **dataset_kwargs: Other parameters of LazyColumnDataset, e.g. tag_to_bioes, comment_symbol.
+
+    Returns:
+        BinaryColumnDataset: The converted dataset.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    dataset = LazyColumnDataset(path_to_column_file, column_name_map, **dataset_kwargs)
+    tag_types = [
+        name
+        for column, name in column_name_map.items()
+        if column != dataset.text_column and name != dataset.SPACE_AFTER_KEY
+    ]
+
+    token_count = int(dataset.lengths.sum())
+    offsets = np.zeros(len(dataset) + 1, dtype=np.int64)
+    np.cumsum(dataset.lengths, out=offsets[1:])
+
+    def open_array(name: str, dtype: type) -> np.memmap:
+        return np.lib.format.open_memmap(
+            output_dir / name, mode="w+", dtype=dtype, shape=(token_count,)
+        )
+
+    token_ids = open_array("tokens.npy", np.int32)
+    spaces = open_array("spaces.npy", np.bool_)
+    tag_ids = {
+        tag_type: open_array(tag_file_name(tag_type), np.int32)
+        for tag_type in tag_types
+    }
+    vocab: Dict[str, int] = {}
+    tags: Dict[str, Dict[str, int]] = {tag_type: {} for tag_type in tag_types}
+
+    position = 0
+    for sentence in dataset:
+        for token in sentence:
+            token_ids[position] = vocab.setdefault(token.text, len(vocab))
+            spaces[position] = token.whitespace_after
+            for tag_type in tag_types:
+                label = token.get_labels(tag_type)
+                tag_ids[tag_type][position] = (
+                    tags[tag_type].setdefault(label[0].value, len(tags[tag_type]))
+                    if label
+                    else -1
+                )
+            position += 1
+
+    for array in [token_ids, spaces, *tag_ids.values()]:
+        array.flush()
+    np.save(output_dir / "offsets.npy", offsets)
+
+    encoded_vocab = [text.encode("utf-8") for text in vocab]
+    vocab_offsets = np.zeros(len(encoded_vocab) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded_vocab], out=vocab_offsets[1:])
+    with open(output_dir / "vocab.bin", "wb") as file:
+        file.write(b"".join(encoded_vocab))
+    np.save(output_dir / "vocab_offsets.npy", vocab_offsets)
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "sentence_count": len(dataset),
+        "token_count": token_count,
+        "tags": {tag_type: list(tags[tag_type]) for tag_type in tag_types},
+    }
+    atomic_write(output_dir / META_FILE, lambda file: json.dump(meta, file))
+    log.info(
+        f"Converted {len(dataset)} sentences with {token_count} tokens "
+        f"and {len(vocab)} token types to {output_dir}"
+    )
+    return BinaryColumnDataset(output_dir)
+
+
+def convert_column_corpus(
+    data_folder: Union[str, Path],
+    column_format: Dict[int, str],
+    output_folder: Union[str, Path],
+    train_file: str = None,
+    test_file: str = None,
+    dev_file: str = None,
+    autofind_splits: bool = True,
+    **dataset_kwargs,
+) -> "BinaryCorpus":
+    """Convert the files that ColumnCorpus reads to the seqal binary format
+
+    Each split is written to a subdirectory of output_folder ("train", "dev", "test").
+
+    Args:
+        data_folder (Union[str, Path]): Base folder with the task data.
+        column_format (Dict[int, str]): A map specifying the column format.
+        output_folder (Union[str, Path]): Folder to write the binary corpus.
+        train_file (str, optional): The name of the train file.
+        test_file (str, optional): The name of the test file.
+        dev_file (str, optional): The name of the dev file.
+        autofind_splits (bool, optional): Find split files in data_folder. Defaults to True.
+        **dataset_kwargs: Other parameters of LazyColumnDataset, e.g. tag_to_bioes, comment_symbol.
+
+    Returns:
+        BinaryCorpus: The converted corpus.
+    """
+    dev_file, test_file, train_file = find_train_dev_test_files(
+        data_folder, dev_file, test_file, train_file, autofind_splits
+    )
+    output_folder = Path(output_folder)
+    for split, split_file in [
+        ("train", train_file),
+        ("dev", dev_file),
+        ("test", test_file),
+    ]:
+        if split_file is not None:
+            convert_column_file(
+                split_file, output_folder / split, column_format, **dataset_kwargs
+            )
+    return BinaryCorpus(output_folder, name=str(data_folder))
+
+
+class BinaryColumnDataset(FlairDataset):
+    """Dataset in the seqal binary format
+
+    All arrays are memory-mapped, so loading takes milliseconds and only the pages that are read
+    use memory. Sentences are created on demand. Sentences added by append or extend
+    are kept in memory after the mapped sentences, so the dataset can be used as labeled data.
+
+    Args:
+        path (Union[str, Path]): Directory written by convert_column_file.
+
+    Raises:
+        FileNotFoundError: if the directory has no finished conversion.
+        ValueError: if the format version is not supported.
+
+    Attributes:
+        tags (Dict[str, List[str]]): Tags of each tag type, indexed by tag id.
+        added_sentences (List[Sentence]): Sentences added after conversion.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        meta_path = self.path / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No binary dataset in {self.path}")
+        with open(meta_path, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary dataset version {meta['version']}")
+
+        self.tags: Dict[str, List[str]] = meta["tags"]
+        self.token_ids = self.load_array("tokens.npy")
+        self.spaces = self.load_array("spaces.npy")
+        self.offsets = self.load_array("offsets.npy")
+        self.tag_ids = {
+            tag_type: self.load_array(tag_file_name(tag_type)) for tag_type in self.tags
+        }
+        self.vocab = np.memmap(self.path / "vocab.bin", dtype=np.uint8, mode="r")
+        self.vocab_offsets = self.load_array("vocab_offsets.npy")
+        self.mapped_count = meta["sentence_count"]
+        self.added_sentences: List[Sentence] = []
+
+    def load_array(self, name: str) -> np.ndarray:
+        """Memory-map an array file"""
+        return np.load(self.path / name, mmap_mode="r")
+
+    def is_in_memory(self) -> bool:
+        return False
+
+    @property
+    def sentences(self) -> "BinaryColumnDataset":
+        """The dataset itself, for code that appends to corpus.train.sentences"""
+        return self
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Token number of each sentence, indexed by sentence id"""
+        lengths = np.diff(self.offsets)
+        if not self.added_sentences:
+            return lengths
+        added_lengths = [len(sentence) for sentence in self.added_sentences]
+        return np.concatenate([lengths, np.array(added_lengths, dtype=np.int64)])
+
+    def __len__(self) -> int:
+        return self.mapped_count + len(self.added_sentences)
+
+    def token_text(self, token_id: int) -> str:
+        """Get token text by token id"""
+        start = self.vocab_offsets[token_id]
+        end = self.vocab_offsets[token_id + 1]
+        return self.vocab[start:end].tobytes().decode("utf-8")
+
+    def __getitem__(self, index: int = 0) -> Sentence:
+        """Create sentence by sentence id"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Sentence id {index} is out of range")
+        if index >= self.mapped_count:
+            return self.added_sentences[index - self.mapped_count]
+
+        start = self.offsets[index]
+        end = self.offsets[index + 1]
+        tag_ids = {
+            tag_type: self.tag_ids[tag_type][start:end].tolist()
+            for tag_type in self.tags
+        }
+        sentence = Sentence()
+        token_ids = self.token_ids[start:end].tolist()
+        spaces = self.spaces[start:end].tolist()
+        for position, (token_id, space) in enumerate(zip(token_ids, spaces)):
+            token = Token(self.token_text(token_id), whitespace_after=space)
+            for tag_type, ids in tag_ids.items():
+                if ids[position] >= 0:
+                    token.add_label(tag_type, self.tags[tag_type][ids[position]])
+            sentence.add_token(token)
+        return sentence
+
+    def __iter__(self) -> Iterator[Sentence]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def get(self, sent_ids: Iterable[int]) -> List[Sentence]:
+        """Create sentences by sentence ids
+
+        Args:
+            sent_ids (Iterable[int]): Sentence ids.
+
+        Returns:
+            List[Sentence]: Sentences in the same order as sent_ids.
+        """
+        return [self[int(sent_id)] for sent_id in sent_ids]
+
+    def batches(self, batch_size: int = 1024) -> Iterator[List[Sentence]]:
+        """Create all sentences in batches, only one batch is kept in memory
+
+        Args:
+            batch_size (int, optional): Sentence number of a batch. Defaults to 1024.
+
+        Yields:
+            Iterator[List[Sentence]]: Batches of sentences in order.
+        """
+        for start in range(0, len(self), batch_size):
+            end = min(start + batch_size, len(self))
+            yield self.get(range(start, end))
+
+    def append(self, sentence: Sentence) -> None:
+        """Add a sentence after the mapped sentences"""
+        self.added_sentences.append(sentence)
+
+    def extend(self, sentences: Iterable[Sentence]) -> None:
+        """Add sentences after the mapped sentences"""
+        self.added_sentences.extend(sentences)
+
+
+class BinaryCorpus(Corpus):
+    """Corpus of binary datasets written by convert_column_corpus
+
+    Args:
+        data_folder (Union[str, Path]): Folder with "train", "dev" and "test" binary datasets.
+                                        Missing splits are None.
+        **corpusargs: Other parameters of Corpus, e.g. sample_missing_splits.
+    """
+
+    def __init__(self, data_folder: Union[str, Path], **corpusargs) -> None:
+        data_folder = Path(data_folder)
+        splits = {
+            split: BinaryColumnDataset(data_folder / split)
+            if (data_folder / split / META_FILE).exists()
+            else None
+            for split in ["train", "dev", "test"]
+        }
+        corpusargs.setdefault("name", str(data_folder))
+        super().__init__(splits["train"], splits["dev"], splits["test"], **corpusargs)
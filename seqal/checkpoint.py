@@ -0,0 +1,230 @@
+import json
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Union
+
+import flair
+import numpy as np
+import torch
+from flair.data import Dictionary, Sentence
+
+from seqal.performance_recorder import IterationPerformance, PerformanceRecorder
+from seqal.pool import Pool
+from seqal.tagger import SequenceTagger
+from seqal.utils import atomic_write
+
+STATE_FILE = "state.json"
+LABELED_FILE = "labeled.jsonl"
+
+
+def sentence_to_dict(sent: Sentence, tag_type: str) -> dict:
+    """Convert a labeled sentence to a JSON serializable dict"""
+    return {
+        "tokens": [token.text for token in sent],
+        "tags": [token.get_tag(tag_type).value for token in sent],
+    }
+
+
+def dict_to_sentence(data: dict, tag_type: str) -> Sentence:
+    """Convert a dict created by sentence_to_dict to a labeled sentence"""
+    sent = Sentence(data["tokens"])
+    for token, tag in zip(sent, data["tags"]):
+        if tag:
+            token.add_tag(tag_type, tag)
+    return sent
+
+
+class Checkpoint:
+    """Crash-safe checkpoint of the active learning loop state
+
+    A checkpoint is a directory with below files:
+        state.json: Queried sentence ids of each round, label names, tag dictionary,
+                    sampler state, recorder state and the names of the files below.
+                    It is replaced atomically at the end of save, so it is the commit point.
+        labeled.jsonl: Labeled sentences taught to the learner, one sentence per line.
+                       New sentences are appended, so saving does not rewrite previous rounds.
+        model-{round}.pt: state_dict of the trained tagger.
+        pool-{round}.npy: Membership bitmap of Pool.
+
+    Files of a round are written before state.json refers to them,
+    and files of older rounds are removed after state.json is replaced.
+    If the process crashes during save, the checkpoint of the previous round is still valid.
+
+    Args:
+        path (Union[str, Path]): Checkpoint directory.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+
+    def load_state(self) -> dict:
+        """Load state.json, an empty dict if there is no checkpoint yet"""
+        state_path = self.path / STATE_FILE
+        if not state_path.exists():
+            return {}
+        with open(state_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def save(
+        self,
+        learner,
+        pool: Pool = None,
+        recorder: PerformanceRecorder = None,
+    ) -> None:
+        """Save the state of active learner, data pool and recorder
+
+        Args:
+            learner (ActiveLearner): Active learner.
+            pool (Pool, optional): Data pool. Defaults to None.
+            recorder (PerformanceRecorder, optional): Performance recorder. Defaults to None.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        previous_state = self.load_state()
+        tag_type = learner.tagger_params["tag_type"]
+        round_number = len(learner.queried_history)
+
+        # Append labeled sentences that are not in checkpoint yet.
+        # Bytes after the last committed offset belong to an interrupted save.
+        labeled_count = previous_state.get("labeled_count", 0)
+        labeled_offset = previous_state.get("labeled_offset", 0)
+        with open(self.path / LABELED_FILE, "ab") as file:
+            file.truncate(labeled_offset)
+            file.seek(0, os.SEEK_END)
+            for sent in learner.taught_samples[labeled_count:]:
+                line = json.dumps(sentence_to_dict(sent, tag_type), ensure_ascii=False)
+                file.write((line + "\n").encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+            labeled_offset = file.tell()
+
+        state = {
+            "round": round_number,
+            "queried_history": learner.queried_history,
+            "label_names": learner.label_names,
+            "labeled_count": len(learner.taught_samples),
+            "labeled_offset": labeled_offset,
+            "train_count": learner.train_count,
+            "model_file": None,
+            "tag_dictionary": None,
+            "pool_file": None,
+            "sampler": None,
+            "recorder": None,
+        }
+
+        if learner.trained_tagger is not None:
+            state["model_file"] = f"model-{round_number}.pt"
+            state["tag_dictionary"] = learner.trained_tagger.tag_dictionary.get_items()
+            atomic_write(
+                self.path / state["model_file"],
+                lambda file: torch.save(learner.trained_tagger.state_dict(), file),
+                mode="wb",
+            )
+
+        if pool is not None:
+            state["pool_file"] = f"pool-{round_number}.npy"
+            atomic_write(
+                self.path / state["pool_file"],
+                lambda file: np.save(file, pool.active),
+                mode="wb",
+            )
+
+        sampler = learner.query_strategy
+        if hasattr(sampler, "rng") and hasattr(sampler, "subpool_history"):
+            state["sampler"] = {
+                "rng": sampler.rng.bit_generator.state,
+                "subpool_history": sampler.subpool_history,
+            }
+
+        if recorder is not None:
+            state["recorder"] = [asdict(p) for p in recorder.performance_list]
+
+        atomic_write(
+            self.path / STATE_FILE,
+            lambda file: json.dump(state, file, ensure_ascii=False),
+        )
+        previous_files = {
+            previous_state.get("model_file"),
+            previous_state.get("pool_file"),
+        }
+        for file_name in previous_files - {
+            state["model_file"],
+            state["pool_file"],
+            None,
+        }:
+            (self.path / file_name).unlink(missing_ok=True)
+
+    def load(
+        self,
+        learner,
+        pool: Pool = None,
+        recorder: PerformanceRecorder = None,
+    ) -> None:
+        """Restore the state of active learner, data pool and recorder
+
+        Args:
+            learner (ActiveLearner): Active learner created with the same corpus and parameters.
+            pool (Pool, optional): Data pool created with the same sentences. Defaults to None.
+            recorder (PerformanceRecorder, optional): Performance recorder. Defaults to None.
+
+        Raises:
+            FileNotFoundError: if there is no checkpoint in path.
+            ValueError: if pool size is different from the checkpoint.
+        """
+        state = self.load_state()
+        if not state:
+            raise FileNotFoundError(f"No checkpoint in {self.path}")
+        tag_type = learner.tagger_params["tag_type"]
+
+        taught_samples = self.load_labeled(tag_type, state["labeled_count"])
+        learner.corpus.add_queried_samples(taught_samples)
+        learner.taught_samples = taught_samples
+        learner.queried_history = state["queried_history"]
+        learner.label_names = state["label_names"]
+        # The training count numbers metrics records and sets the save_every cadence of in_memory mode
+        learner.train_count = state.get("train_count", 0)
+
+        if state["model_file"] is not None:
+            tag_dictionary = Dictionary(add_unk=False)
+            for item in state["tag_dictionary"]:
+                tag_dictionary.add_item(item)
+            learner.tagger_params["tag_dictionary"] = tag_dictionary
+            tagger = SequenceTagger(**learner.tagger_params)
+            tagger.load_state_dict(
+                torch.load(self.path / state["model_file"], map_location=flair.device)
+            )
+            # Tagger is in eval mode after training, keep dropout off in query as well
+            tagger.eval()
+            learner.trained_tagger = tagger
+
+        if pool is not None and state["pool_file"] is not None:
+            active = np.load(self.path / state["pool_file"])
+            if len(active) != len(pool.active):
+                raise ValueError(
+                    f"Pool has {len(pool.active)} sentences, "
+                    f"but checkpoint pool has {len(active)} sentences"
+                )
+            pool.active = active
+            pool.active_count = int(active.sum())
+
+        sampler = learner.query_strategy
+        if state["sampler"] is not None and hasattr(sampler, "rng"):
+            sampler.rng.bit_generator.state = state["sampler"]["rng"]
+            sampler.subpool_history = state["sampler"]["subpool_history"]
+
+        if recorder is not None and state["recorder"] is not None:
+            recorder.performance_list = [
+                IterationPerformance(**p) for p in state["recorder"]
+            ]
+
+    def load_labeled(self, tag_type: str, count: int) -> List[Sentence]:
+        """Load the first count labeled sentences in labeled.jsonl"""
+        sentences = []
+        if count == 0:
+            return sentences
+        with open(self.path / LABELED_FILE, "r", encoding="utf-8") as file:
+            for line in file:
+                sentences.append(dict_to_sentence(json.loads(line), tag_type))
+                if len(sentences) == count:
+                    break
+        return sentences
@@ -1,21 +1,155 @@
+import io
+import itertools
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 from flair.data import Corpus as ParentCorpus
-from flair.data import Sentence
+from flair.data import Dictionary, Sentence
 from flair.datasets import ColumnDataset as ParentColumnDataset
 from flair.datasets.base import find_train_dev_test_files
 from torch.utils.data import Dataset
 from torch.utils.data.dataset import ConcatDataset
 
+from seqal.utils import atomic_write, paused_gc
+
+log = logging.getLogger(__name__)
+
+
+def count_tags(
+    sentences: Iterable[Sentence], tag_type: str, counts: Counter
+) -> Counter:
+    """Count tokens of each tag in sentences
+
+    Args:
+        sentences (Iterable[Sentence]): Sentences to count.
+        tag_type (str): Tag type to count.
+        counts (Counter): Counts to update. Tokens without tag_type are counted as None.
+
+    Returns:
+        Counter: The updated counts, keys are in the order of first appearance.
+    """
+    for sentence in sentences:
+        for token in sentence:
+            labels = token.get_labels(tag_type)
+            counts[labels[0].value if labels else None] += 1
+    return counts
+
+
+@dataclass
+class TagCounts:
+    """Tag counts of a corpus for one tag type
+
+    Attributes:
+        train (Counter): Tag counts of counted train sentences.
+        other (Counter): Tag counts of dev and test sentences.
+        train_sentences (Optional[Sequence[Sentence]]): The train sentences that are counted.
+        train_size (int): Number of counted train sentences.
+    """
+
+    train: Counter = field(default_factory=Counter)
+    other: Counter = field(default_factory=Counter)
+    train_sentences: Optional[Sequence[Sentence]] = None
+    train_size: int = 0
+
 
 class Corpus(ParentCorpus):
     """The modified Corpus class.
 
+    Tag counts of each tag type are kept after the first count. Only train sentences added
+    since the last count are counted, so tag dictionary and label names do not need
+    a full corpus scan in each iteration.
+
     Args:
         ParentCorpus: The original Corpus class.
     """
 
+    def update_tag_counts(self, tag_type: str) -> TagCounts:
+        """Count tags of train sentences that are not counted yet
+
+        Dev and test data are counted once. If train sentences are replaced,
+        e.g. by ActiveLearner.resume, train data is counted again.
+
+        Args:
+            tag_type (str): Tag type to count.
+
+        Returns:
+            TagCounts: Tag counts of the corpus.
+        """
+        all_tag_counts = self.__dict__.setdefault("tag_counts", {})
+        train_sentences = self.train.sentences if self.train else []
+        tag_counts = all_tag_counts.get(tag_type)
+        if tag_counts is None:
+            tag_counts = TagCounts()
+            for part in [self.dev, self.test]:
+                if part:
+                    count_tags(part.sentences, tag_type, tag_counts.other)
+            all_tag_counts[tag_type] = tag_counts
+        if (
+            tag_counts.train_sentences is not train_sentences
+            or tag_counts.train_size > len(train_sentences)
+        ):
+            tag_counts.train = Counter()
+            tag_counts.train_sentences = train_sentences
+            tag_counts.train_size = 0
+
+        new_sentences = [
+            train_sentences[i]
+            for i in range(tag_counts.train_size, len(train_sentences))
+        ]
+        count_tags(new_sentences, tag_type, tag_counts.train)
+        tag_counts.train_size = len(train_sentences)
+        return tag_counts
+
+    def get_tag_counts(self, tag_type: str) -> Counter:
+        """Number of tokens of each tag in train, dev and test data
+
+        Args:
+            tag_type (str): Tag type to count.
+
+        Returns:
+            Counter: Token number of each tag. Tokens without tag_type are not counted.
+        """
+        tag_counts = self.update_tag_counts(tag_type)
+        counts = tag_counts.train + tag_counts.other
+        counts.pop(None, None)
+        return counts
+
+    def get_label_names(self, tag_type: str) -> List[str]:
+        """Get all tags in train, dev and test data
+
+        Args:
+            tag_type (str): Tag type.
+
+        Returns:
+            List[str]: Tags in the order of first appearance.
+        """
+        return list(self.get_tag_counts(tag_type))
+
+    def make_tag_dictionary(self, tag_type: str) -> Dictionary:
+        """Make tag dictionary from tag counts, same as flair Corpus.make_tag_dictionary
+
+        Args:
+            tag_type (str): Tag type.
+
+        Returns:
+            Dictionary: Tag dictionary with "O", tags in the order of first appearance,
+                        "<START>" and "<STOP>".
+        """
+        tag_counts = self.update_tag_counts(tag_type)
+        tag_dictionary = Dictionary(add_unk=False)
+        tag_dictionary.add_item("O")
+        for tag in itertools.chain(tag_counts.train, tag_counts.other):
+            # flair adds an empty tag for tokens without tag_type
+            tag_dictionary.add_item("" if tag is None else tag)
+        tag_dictionary.add_item("<START>")
+        tag_dictionary.add_item("<STOP>")
+        return tag_dictionary
+
     def get_all_sentences(self) -> Dataset:
         """Refactor method of flair.data.corpus
 
@@ -59,6 +193,7 @@ class ColumnCorpus(Corpus):
         label_name_map: Dict[str, str] = None,
         banned_sentences: List[str] = None,
         autofind_splits: bool = True,
+        workers: int = 1,
         **corpusargs,
     ):
         """Instantiates a Corpus from CoNLL column-formatted task data such as CoNLL03 or CoNLL2000.
@@ -83,6 +218,8 @@ class ColumnCorpus(Corpus):
             banned_sentences (List[str], optional): Optionally remove sentences from the corpus.
                                                     Works only if `in_memory` is true
             autofind_splits (bool, optional): Defaults to True.
+            workers (int, optional): Number of processes to parse each file if in_memory is True.
+                                     Defaults to 1 (serial).
 
         Returns:
             Dataset: a Corpus with annotated train, dev and test data
@@ -104,6 +241,7 @@ class ColumnCorpus(Corpus):
                 column_delimiter=column_delimiter,
                 # banned_sentences=banned_sentences,
                 in_memory=in_memory,
+                workers=workers,
                 document_separator_token=document_separator_token,
                 skip_first_line=skip_first_line,
                 label_name_map=label_name_map,
@@ -123,6 +261,7 @@ class ColumnCorpus(Corpus):
                 column_delimiter=column_delimiter,
                 # banned_sentences=banned_sentences,
                 in_memory=in_memory,
+                workers=workers,
                 document_separator_token=document_separator_token,
                 skip_first_line=skip_first_line,
                 label_name_map=label_name_map,
@@ -142,6 +281,7 @@ class ColumnCorpus(Corpus):
                 # banned_sentences=banned_sentences,
                 column_delimiter=column_delimiter,
                 in_memory=in_memory,
+                workers=workers,
                 document_separator_token=document_separator_token,
                 skip_first_line=skip_first_line,
                 label_name_map=label_name_map,
@@ -156,11 +296,398 @@ class ColumnCorpus(Corpus):
 
 
 class ColumnDataset(ParentColumnDataset):
+    """flair ColumnDataset that can parse the file in parallel
+
+    If workers is bigger than 1 and in_memory is True, the file is split at blank lines
+    into byte ranges, the ranges are parsed in a process pool, and the sentences are joined
+    in file order. The sentences and tags are the same as the serial parser of flair.
+    Other parameters are the same as flair ColumnDataset.
+
+    Args:
+        workers (int, optional): Number of processes to parse the file. Defaults to 1 (serial).
+    """
+
+    def __init__(
+        self,
+        path_to_column_file: Union[str, Path],
+        column_name_map: Dict[int, str],
+        tag_to_bioes: str = None,
+        column_delimiter: str = r"\s+",
+        comment_symbol: str = None,
+        banned_sentences: List[str] = None,
+        in_memory: bool = True,
+        document_separator_token: str = None,
+        encoding: str = "utf-8",
+        skip_first_line: bool = False,
+        label_name_map: Dict[str, str] = None,
+        workers: int = 1,
+    ) -> None:
+        # Splitting at byte ranges needs an encoding whose newline is the byte "\n"
+        if workers <= 1 or not in_memory or "\n".encode(encoding) != b"\n":
+            with paused_gc():
+                super().__init__(
+                    path_to_column_file,
+                    column_name_map,
+                    tag_to_bioes=tag_to_bioes,
+                    column_delimiter=column_delimiter,
+                    comment_symbol=comment_symbol,
+                    banned_sentences=banned_sentences,
+                    in_memory=in_memory,
+                    document_separator_token=document_separator_token,
+                    encoding=encoding,
+                    skip_first_line=skip_first_line,
+                    label_name_map=label_name_map,
+                )
+            return
+
+        self.init_parser(
+            path_to_column_file,
+            column_name_map,
+            tag_to_bioes=tag_to_bioes,
+            column_delimiter=column_delimiter,
+            comment_symbol=comment_symbol,
+            banned_sentences=banned_sentences,
+            document_separator_token=document_separator_token,
+            encoding=encoding,
+            label_name_map=label_name_map,
+        )
+        self.in_memory = True
+        self.sentences = self.parse_parallel(skip_first_line, workers)
+        self.total_sentence_count = len(self.sentences)
+
+    def init_parser(
+        self,
+        path_to_column_file: Union[str, Path],
+        column_name_map: Dict[int, str],
+        tag_to_bioes: str = None,
+        column_delimiter: str = r"\s+",
+        comment_symbol: str = None,
+        banned_sentences: List[str] = None,
+        document_separator_token: str = None,
+        encoding: str = "utf-8",
+        label_name_map: Dict[str, str] = None,
+    ) -> None:
+        """Set the attributes that flair uses to parse lines, without reading the file"""
+        self.path_to_column_file = Path(path_to_column_file)
+        if not self.path_to_column_file.exists():
+            raise FileNotFoundError(f"{self.path_to_column_file} does not exist")
+        self.tag_to_bioes = tag_to_bioes
+        self.column_name_map = column_name_map
+        self.column_delimiter = column_delimiter
+        self.comment_symbol = comment_symbol
+        self.banned_sentences = banned_sentences
+        self.document_separator_token = document_separator_token
+        self.encoding = encoding
+        self.label_name_map = label_name_map
+
+        # most data sets have the token text in the first column
+        self.text_column: int = 0
+        for column in self.column_name_map:
+            if column_name_map[column] == "text":
+                self.text_column = column
+
+    def split_ranges(
+        self, range_count: int, skip_first_line: bool = False
+    ) -> List[Tuple[int, int]]:
+        """Split file into byte ranges that start after a blank line
+
+        Args:
+            range_count (int): Maximum number of ranges.
+            skip_first_line (bool, optional): Exclude the header line. Defaults to False.
+
+        Returns:
+            List[Tuple[int, int]]: Start and end byte offsets of ranges in file order.
+        """
+        file_size = self.path_to_column_file.stat().st_size
+        with open(self.path_to_column_file, "rb") as file:
+            start = len(file.readline()) if skip_first_line else 0
+            boundaries = [start]
+            for i in range(1, range_count):
+                target = start + (file_size - start) * i // range_count
+                if target <= boundaries[-1]:
+                    continue
+                # Move to the end of the next blank line
+                file.seek(target - 1)
+                file.readline()
+                for line in iter(file.readline, b""):
+                    if line.isspace():
+                        break
+                boundary = file.tell()
+                if boundaries[-1] < boundary < file_size:
+                    boundaries.append(boundary)
+        boundaries.append(file_size)
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def parse_range(self, byte_range: Tuple[int, int]) -> List[Optional[Sentence]]:
+        """Parse sentences in a byte range with the serial parser of flair
+
+        Returns:
+            List[Optional[Sentence]]: Parsed sentences. None for a block of comment lines,
+                                      where the serial parser stops.
+        """
+        start, end = byte_range
+        with open(self.path_to_column_file, "rb") as file:
+            file.seek(start)
+            text = file.read(end - start).decode(self.encoding)
+
+        sentences = []
+        lines = io.StringIO(text, newline=None)
+        with paused_gc():
+            while True:
+                sentence_lines = self._read_next_sentence(lines)
+                if not sentence_lines:
+                    break
+                sentence = self._convert_lines_to_sentence(sentence_lines)
+                sentences.append(sentence)
+                if not sentence:
+                    break
+        return sentences
+
+    def parse_parallel(self, skip_first_line: bool, workers: int) -> List[Sentence]:
+        """Parse file in a process pool and link the sentences in file order
+
+        Args:
+            skip_first_line (bool): Exclude the header line.
+            workers (int): Number of processes.
+
+        Returns:
+            List[Sentence]: All sentences in file order.
+        """
+        # Several ranges per process balance the load of ranges with long sentences
+        byte_ranges = self.split_ranges(workers * 4, skip_first_line)
+        # Results are unpickled in this process, which also creates many objects
+        with paused_gc(), ProcessPoolExecutor(max_workers=workers) as executor:
+            range_sentences = list(executor.map(self.parse_range, byte_ranges))
+
+        sentences = []
+        previous_sentence = None
+        for sentence in itertools.chain.from_iterable(range_sentences):
+            if not sentence:
+                break
+            if self.banned_sentences is not None and any(
+                banned in sentence.to_plain_string() for banned in self.banned_sentences
+            ):
+                continue
+            sentence._previous_sentence = previous_sentence
+            sentence._next_sentence = None
+            if previous_sentence:
+                previous_sentence._next_sentence = sentence
+            sentences.append(sentence)
+            previous_sentence = sentence
+
+        log.info(
+            f"Parsed {len(sentences)} sentences in {len(byte_ranges)} ranges "
+            f"of {self.path_to_column_file} with {workers} processes"
+        )
+        return sentences
+
     def __len__(self):
         """Override method"""
-        return len(self.sentences)
+        if self.in_memory:
+            return len(self.sentences)
+        return self.total_sentence_count
 
     def obtain_statistics(self, name: str = "Pool", tag_type: str = None):
-        return Corpus._obtain_statistics_for(
-            self.sentences, name=name, tag_type=tag_type
+        sentences = self.sentences if self.in_memory else self
+        return Corpus._obtain_statistics_for(sentences, name=name, tag_type=tag_type)
+
+
+class LazyColumnDataset(ColumnDataset):
+    """Column dataset that reads sentences from file on demand
+
+    One scan of the file builds an index of the byte offset and token number of each sentence.
+    The index is saved next to the file ("{file}.index.npz") and reused while the file
+    is not modified, so later runs start without parsing the file. Sentences are created
+    only when they are requested, and are not kept in memory.
+
+    The sentence id is the position of the sentence in file, so it is stable and can be used
+    by Pool. banned_sentences is not supported, like flair ColumnDataset with in_memory=False.
+
+    Args:
+        path_to_column_file (Union[str, Path]): The column-formatted file.
+        column_name_map (Dict[int, str]): A map specifying the column format.
+        tag_to_bioes (str, optional): Whether to convert to BIOES tagging scheme.
+        column_delimiter (str, optional): Column separator. Defaults to any whitespace.
+        comment_symbol (str, optional): If set, lines that begin with this symbol are treated as comments.
+        document_separator_token (str, optional): If provided, sentences that function as document
+                                                  boundaries are so marked
+        encoding (str, optional): Encodings. Defaults to "utf-8".
+        skip_first_line (bool, optional): Set to True if your dataset has a header line.
+        label_name_map (Dict[str, str], optional): Optionally map tag names to different schema.
+        index_path (Optional[Union[str, Path]], optional): File to save the index.
+                                                           Defaults to None, "{file}.index.npz".
+
+    Attributes:
+        offsets (np.ndarray): Byte offset of each sentence in file, indexed by sentence id.
+        lengths (np.ndarray): Token number of each sentence, indexed by sentence id.
+    """
+
+    def __init__(
+        self,
+        path_to_column_file: Union[str, Path],
+        column_name_map: Dict[int, str],
+        tag_to_bioes: str = None,
+        column_delimiter: str = r"\s+",
+        comment_symbol: str = None,
+        document_separator_token: str = None,
+        encoding: str = "utf-8",
+        skip_first_line: bool = False,
+        label_name_map: Dict[str, str] = None,
+        index_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.init_parser(
+            path_to_column_file,
+            column_name_map,
+            tag_to_bioes=tag_to_bioes,
+            column_delimiter=column_delimiter,
+            comment_symbol=comment_symbol,
+            document_separator_token=document_separator_token,
+            encoding=encoding,
+            label_name_map=label_name_map,
         )
+        self.skip_first_line = skip_first_line
+        self.in_memory = False
+
+        if index_path is None:
+            index_path = self.path_to_column_file.with_name(
+                self.path_to_column_file.name + ".index.npz"
+            )
+        self.index_path = Path(index_path)
+
+        index = self.load_index()
+        if index is None:
+            index = self.build_index()
+            self.save_index(*index)
+        self.offsets, self.lengths = index
+        self.indices = self.offsets
+        self.total_sentence_count = len(self.offsets)
+
+    @property
+    def file_stamp(self) -> np.ndarray:
+        """Size and modification time of file, to check the saved index is not stale"""
+        stat = self.path_to_column_file.stat()
+        return np.array(
+            [stat.st_size, stat.st_mtime_ns, self.skip_first_line], dtype=np.int64
+        )
+
+    def is_comment(self, line: bytes) -> bool:
+        """Check a line is a comment"""
+        return self.comment_symbol is not None and line.startswith(
+            self.comment_symbol.encode(self.encoding)
+        )
+
+    def build_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Scan file once to find the offset and token number of each sentence
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Offsets and token numbers of sentences.
+        """
+        offsets = []
+        lengths = []
+        position = 0
+        token_count = 0
+        with open(self.path_to_column_file, "rb") as file:
+            if self.skip_first_line:
+                position += len(file.readline())
+            for line in file:
+                if line.isspace():
+                    if token_count > 0:
+                        lengths.append(token_count)
+                        token_count = 0
+                elif not self.is_comment(line):
+                    if token_count == 0:
+                        offsets.append(position)
+                    token_count += 1
+                position += len(line)
+        if token_count > 0:
+            lengths.append(token_count)
+
+        log.info(f"Indexed {len(offsets)} sentences in {self.path_to_column_file}")
+        return np.array(offsets, dtype=np.int64), np.array(lengths, dtype=np.int64)
+
+    def load_index(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Load the saved index if it is built from the current file
+
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: Offsets and token numbers of sentences,
+                                                     None if there is no valid index.
+        """
+        if not self.index_path.exists():
+            return None
+        with np.load(self.index_path) as index:
+            if not np.array_equal(index["stamp"], self.file_stamp):
+                log.info(f"Index {self.index_path} is stale, rebuild it")
+                return None
+            return index["offsets"], index["lengths"]
+
+    def save_index(self, offsets: np.ndarray, lengths: np.ndarray) -> None:
+        """Save index next to the file, skip if the directory is not writable"""
+        try:
+            atomic_write(
+                self.index_path,
+                lambda file: np.savez(
+                    file, offsets=offsets, lengths=lengths, stamp=self.file_stamp
+                ),
+                mode="wb",
+            )
+        except OSError as error:
+            log.warning(f"Could not save index to {self.index_path}: {error}")
+
+    def read_sentence(self, file) -> Sentence:
+        """Read the sentence at the current position of a binary file"""
+        lines = []
+        for line in iter(file.readline, b""):
+            if line.isspace():
+                if lines:
+                    break
+            elif not self.is_comment(line):
+                lines.append(line.decode(self.encoding))
+        return self._convert_lines_to_sentence(lines)
+
+    def __getitem__(self, index: int = 0) -> Sentence:
+        """Read sentence by sentence id"""
+        return self.get([index])[0]
+
+    def __iter__(self) -> Iterator[Sentence]:
+        """Read all sentences in order with one pass over the file"""
+        with open(self.path_to_column_file, "rb") as file:
+            for offset in self.offsets:
+                file.seek(offset)
+                yield self.read_sentence(file)
+
+    def get(self, sent_ids: Iterable[int]) -> List[Sentence]:
+        """Read sentences by sentence ids with one opened file
+
+        Sentences are read in file order to reduce disk seeks.
+
+        Args:
+            sent_ids (Iterable[int]): Sentence ids.
+
+        Returns:
+            List[Sentence]: Sentences in the same order as sent_ids.
+        """
+        sent_ids = np.asarray(list(sent_ids), dtype=np.int64)
+        sentences = [None] * len(sent_ids)
+        with open(self.path_to_column_file, "rb") as file:
+            for position in np.argsort(sent_ids, kind="stable"):
+                file.seek(self.offsets[sent_ids[position]])
+                sentences[position] = self.read_sentence(file)
+        return sentences
+
+    def batches(self, batch_size: int = 1024) -> Iterator[List[Sentence]]:
+        """Read all sentences in batches, only one batch is kept in memory
+
+        Args:
+            batch_size (int, optional): Sentence number of a batch. Defaults to 1024.
+
+        Yields:
+            Iterator[List[Sentence]]: Batches of sentences in file order.
+        """
+        batch = []
+        for sentence in self:
+            batch.append(sentence)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
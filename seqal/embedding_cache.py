@@ -0,0 +1,269 @@
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+from flair.data import Sentence
+from flair.embeddings import TokenEmbeddings
+
+from seqal.utils import atomic_write
+
+log = logging.getLogger(__name__)
+
+
+def sentence_key(sentence: Sentence) -> str:
+    """Id of a sentence in EmbeddingCache
+
+    The id is the hash of token texts, so the same sentence has the same id
+    in every query round and every process.
+
+    Args:
+        sentence (Sentence): A sentence.
+
+    Returns:
+        str: Sentence id.
+    """
+    text = "\x1f".join(token.text for token in sentence)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def is_static(embeddings: TokenEmbeddings) -> bool:
+    """Check embeddings are not fine-tuned, including all embeddings in a stack"""
+    sub_embeddings = getattr(embeddings, "embeddings", None)
+    if isinstance(sub_embeddings, list):
+        return all(is_static(embedding) for embedding in sub_embeddings)
+    return bool(embeddings.static_embeddings)
+
+
+def get_name_lengths(embeddings: TokenEmbeddings) -> List[Tuple[str, int]]:
+    """Get name and embedding length of each embeddings in a stack
+
+    Args:
+        embeddings (TokenEmbeddings): Token embeddings, maybe a stack of embeddings.
+
+    Returns:
+        List[Tuple[str, int]]: Name and embedding length in the order that flair concatenates
+                               token embeddings, which is sorted by name.
+    """
+    sub_embeddings = getattr(embeddings, "embeddings", None)
+    if isinstance(sub_embeddings, list):
+        name_lengths = [
+            name_length
+            for embedding in sub_embeddings
+            for name_length in get_name_lengths(embedding)
+        ]
+    else:
+        name_lengths = [(embeddings.name, embeddings.embedding_length)]
+    return sorted(name_lengths)
+
+
+class EmbeddingCache:
+    """Compact cache of token embeddings keyed by sentence id
+
+    Embeddings of all sentences are rows of one float32 matrix, and the index maps
+    a sentence id to its first row and token number. If path is set, the matrix is
+    a memory-mapped file and the index is saved to "{path}.json" by save,
+    so the cache can be loaded in the next query round or process.
+
+    Args:
+        embedding_length (int): Embedding length of a token.
+        path (Optional[Union[str, Path]], optional): File of the memory-mapped matrix.
+                                                     Defaults to None, the matrix is in memory.
+        capacity (int, optional): Initial row number of the matrix. Defaults to 1024.
+
+    Adding is thread-safe, so a tagger and its copy can share the cache while one scores the
+    data pool and the other trains. Getting needs no lock, because rows are written before
+    their index entry, and a grown matrix has all used rows before it replaces the old one.
+
+    Attributes:
+        index (Dict[str, Tuple[int, int]]): Sentence id to first row and token number.
+        size (int): Number of used rows.
+    """
+
+    def __init__(
+        self,
+        embedding_length: int,
+        path: Optional[Union[str, Path]] = None,
+        capacity: int = 1024,
+    ) -> None:
+        self.embedding_length = embedding_length
+        self.path = None if path is None else Path(path)
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if self.path is not None and self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            if state["embedding_length"] != embedding_length:
+                raise ValueError(
+                    f"Cache embedding length is {state['embedding_length']}, not {embedding_length}"
+                )
+            self.index = {key: tuple(value) for key, value in state["index"].items()}
+            self.size = state["size"]
+            capacity = max(capacity, self.size)
+        self.matrix = self.allocate(max(capacity, 1))
+
+    @property
+    def index_path(self) -> Path:
+        """File of the index"""
+        return self.path.with_name(self.path.name + ".json")
+
+    def __len__(self) -> int:
+        """Number of cached sentences"""
+        return len(self.index)
+
+    def __contains__(self, sentence: Sentence) -> bool:
+        """Check sentence is cached"""
+        return sentence_key(sentence) in self.index
+
+    def allocate(self, capacity: int) -> np.ndarray:
+        """Create the matrix with capacity rows, keep rows of the old matrix"""
+        if self.path is None:
+            matrix = np.zeros((capacity, self.embedding_length), dtype=np.float32)
+            if self.size > 0:
+                matrix[: self.size] = self.matrix[: self.size]
+            return matrix
+
+        # Grow the file in place, the used rows are already in it
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as file:
+            file.truncate(max(file.tell(), capacity * self.embedding_length * 4))
+        return np.memmap(
+            self.path,
+            dtype=np.float32,
+            mode="r+",
+            shape=(capacity, self.embedding_length),
+        )
+
+    def get(self, sentence: Sentence) -> Optional[torch.Tensor]:
+        """Get token embeddings of a sentence
+
+        Args:
+            sentence (Sentence): A sentence.
+
+        Returns:
+            Optional[torch.Tensor]: Token embeddings with shape (token number, embedding length),
+                                    None if the sentence is not cached.
+        """
+        position = self.index.get(sentence_key(sentence))
+        if position is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        start, length = position
+        end = start + length
+        return torch.from_numpy(np.asarray(self.matrix[start:end]))
+
+    def add(self, sentence: Sentence, embeddings: torch.Tensor) -> None:
+        """Add token embeddings of a sentence
+
+        Args:
+            sentence (Sentence): A sentence.
+            embeddings (torch.Tensor): Token embeddings with shape (token number, embedding length).
+        """
+        key = sentence_key(sentence)
+        rows = embeddings.detach().cpu().numpy()
+        length = rows.shape[0]
+        with self.lock:
+            if key in self.index:
+                return
+            if self.size + length > self.matrix.shape[0]:
+                self.matrix = self.allocate(
+                    max(2 * self.matrix.shape[0], self.size + length)
+                )
+            start, end = self.size, self.size + length
+            self.matrix[start:end] = rows
+            self.index[key] = (start, length)
+            self.size = end
+
+    def save(self) -> None:
+        """Flush the memory-mapped matrix and save the index"""
+        if self.path is None:
+            raise ValueError("EmbeddingCache without path can not be saved")
+        with self.lock:
+            self.matrix.flush()
+            state = {
+                "embedding_length": self.embedding_length,
+                "size": self.size,
+                "index": dict(self.index),
+            }
+        atomic_write(self.index_path, lambda file: json.dump(state, file))
+        log.info(f"Saved embeddings of {len(self)} sentences to {self.path}")
+
+
+class CachedEmbeddings(TokenEmbeddings):
+    """Static token embeddings that are computed once per sentence
+
+    Wrap the embeddings of tagger, e.g. WordEmbeddings, to look up token embeddings in EmbeddingCache.
+    Only sentences that are not in cache are embedded by the wrapped embeddings,
+    so labeled data is embedded once for all epochs and query rounds.
+    Use it with trainer_params["embeddings_storage_mode"] = "none",
+    then embeddings are not kept on tokens between epochs.
+
+    Args:
+        embeddings (TokenEmbeddings): Static embeddings to wrap.
+        cache (Optional[EmbeddingCache], optional): Cache to use. Defaults to None, a new in-memory cache.
+
+    Raises:
+        ValueError: if embeddings are fine-tuned in training.
+    """
+
+    def __init__(
+        self, embeddings: TokenEmbeddings, cache: Optional[EmbeddingCache] = None
+    ) -> None:
+        if not is_static(embeddings):
+            raise ValueError("Only static embeddings can be cached")
+        super().__init__()
+        self.embeddings = embeddings
+        self.cache = cache or EmbeddingCache(embeddings.embedding_length)
+        if self.cache.embedding_length != embeddings.embedding_length:
+            raise ValueError("Embedding length of cache and embeddings are different")
+        self.name = f"cached-{embeddings.name}"
+        self.static_embeddings = True
+
+    @property
+    def embedding_length(self) -> int:
+        return self.embeddings.embedding_length
+
+    def __getstate__(self) -> dict:
+        # The cache is not saved with the model
+        state = self.__dict__.copy()
+        state["cache"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.cache = EmbeddingCache(self.embeddings.embedding_length)
+
+    def _add_embeddings_internal(self, sentences: List[Sentence]) -> List[Sentence]:
+        missed_sentences = []
+        for sentence in sentences:
+            embeddings = self.cache.get(sentence)
+            if embeddings is None:
+                missed_sentences.append(sentence)
+                continue
+            for token, embedding in zip(sentence, embeddings):
+                token.set_embedding(self.name, embedding)
+
+        if missed_sentences:
+            names = self.embeddings.get_names()
+            self.embeddings.embed(missed_sentences)
+            for sentence in missed_sentences:
+                if len(sentence) == 0:
+                    continue
+                embeddings = torch.stack(
+                    [token.get_embedding(names) for token in sentence]
+                )
+                self.cache.add(sentence, embeddings)
+                for token, embedding in zip(sentence, embeddings):
+                    token.clear_embeddings(names)
+                    token.set_embedding(self.name, embedding)
+
+        return sentences
@@ -0,0 +1,256 @@
+import functools
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from flair.data import Sentence
+
+from seqal.data import Entities
+from seqal.pool import Pool
+
+log = logging.getLogger(__name__)
+
+# Methods of samplers that emit phases
+SAMPLER_PHASES = (
+    "sample_subpool",
+    "predict",
+    "get_entities",
+    "score",
+    "sentence_diversities",
+    "kmeans",
+    "sort",
+    "query",
+)
+
+
+@dataclass
+class PhaseEvent:
+    """Duration and item counts of a finished phase
+
+    Args:
+        phase (str): Phase name, e.g. "predict".
+        source (str): Class that runs the phase, e.g. "LeastConfidenceSampler".
+        duration (float): Duration in seconds.
+        counts (Dict[str, int]): Item counts, e.g. {"sentences": 100, "tokens": 1500}.
+    """
+
+    phase: str
+    source: str
+    duration: float
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> Dict[str, float]:
+        """Items per second of each count"""
+        if self.duration <= 0:
+            return {}
+        return {name: count / self.duration for name, count in self.counts.items()}
+
+
+def count_items(value: Any) -> Dict[str, int]:
+    """Count sentences, tokens or entities of a phase argument or result
+
+    Args:
+        value (Any): Pool, dataset, list of sentences, Entities or array.
+
+    Returns:
+        Dict[str, int]: Item counts, empty if value has no known items.
+    """
+    if isinstance(value, Entities):
+        return {"entities": len(value.entities)}
+    if isinstance(value, Pool):
+        lengths = value.lengths[value.ids]
+        return {"sentences": len(lengths), "tokens": int(lengths.sum())}
+    if isinstance(value, np.ndarray):
+        return {"items": len(value)}
+    # Lazy and binary datasets know sentence lengths without creating sentences
+    lengths = getattr(value, "lengths", None)
+    if isinstance(lengths, np.ndarray):
+        return {"sentences": len(lengths), "tokens": int(lengths.sum())}
+    sentences = getattr(value, "sentences", value)
+    if isinstance(sentences, list) and sentences and isinstance(sentences[0], Sentence):
+        return {
+            "sentences": len(sentences),
+            "tokens": sum(len(sentence) for sentence in sentences),
+        }
+    return {}
+
+
+class Instrumentation:
+    """Send phase events to sinks
+
+    A sink is a callable that takes a PhaseEvent. Without sinks, phases are not timed
+    and items are not counted, so the overhead is one check per phase.
+
+    Attributes:
+        sinks (List[Callable[[PhaseEvent], None]]): Registered sinks.
+    """
+
+    def __init__(self) -> None:
+        self.sinks: List[Callable[[PhaseEvent], None]] = []
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any sink is registered"""
+        return bool(self.sinks)
+
+    def add_sink(self, sink: Callable[[PhaseEvent], None]) -> None:
+        """Register a sink"""
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink: Callable[[PhaseEvent], None]) -> None:
+        """Unregister a sink"""
+        self.sinks.remove(sink)
+
+    def emit(self, event: PhaseEvent) -> None:
+        """Send an event to all sinks"""
+        for sink in list(self.sinks):
+            sink(event)
+
+    @contextmanager
+    def phase(
+        self, phase: str, source: str = "", **counts: int
+    ) -> Iterator[Dict[str, int]]:
+        """Time a block as a phase
+
+        The yielded dictionary is the item counts of the event, so the block can add counts.
+        No event is emitted if the block raises an error.
+
+        Args:
+            phase (str): Phase name.
+            source (str, optional): Class that runs the phase. Defaults to "".
+            **counts: Item counts known before the block.
+
+        Yields:
+            Iterator[Dict[str, int]]: Item counts of the event.
+        """
+        if not self.sinks:
+            yield counts
+            return
+        start = time.perf_counter()
+        yield counts
+        self.emit(PhaseEvent(phase, source, time.perf_counter() - start, counts))
+
+
+# Instrumentation of samplers and ActiveLearner
+instrumentation = Instrumentation()
+
+
+def timed(phase: str, items: Optional[Callable[..., Any]] = None) -> Callable:
+    """Decorate a method to emit a phase event
+
+    Items of the first argument after self are counted, and entities of an Entities result.
+
+    Args:
+        phase (str): Phase name.
+        items (Optional[Callable[..., Any]], optional): Function of the method arguments
+                                                        that returns the items to count.
+                                                        Defaults to None, the first argument.
+
+    Returns:
+        Callable: Decorator.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not instrumentation.sinks:
+                return method(self, *args, **kwargs)
+            if items is not None:
+                counts = count_items(items(self, *args, **kwargs))
+            else:
+                counts = count_items(args[0]) if args else {}
+            with instrumentation.phase(phase, type(self).__name__, **counts) as counts:
+                result = method(self, *args, **kwargs)
+                if isinstance(result, Entities):
+                    counts.update(count_items(result))
+            return result
+
+        wrapper.instrumented = True
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(cls: type, names: Iterable[str]) -> None:
+    """Decorate methods that cls defines by timed, with the method name as phase name
+
+    Args:
+        cls (type): Class to instrument.
+        names (Iterable[str]): Method names.
+    """
+    for name in names:
+        method = cls.__dict__.get(name)
+        if callable(method) and not getattr(method, "instrumented", False):
+            setattr(cls, name, timed(name)(method))
+
+
+def log_phase(event: PhaseEvent) -> None:
+    """Sink that logs each event"""
+    throughput = ", ".join(
+        f"{value:.1f} {name}/s" for name, value in event.throughput.items()
+    )
+    log.info(
+        f"{event.source}.{event.phase}: {event.duration:.3f}s {event.counts} {throughput}"
+    )
+
+
+class PhaseRecorder:
+    """Sink that keeps events and summarizes them by source and phase
+
+    Use it as a context manager to register it during a block.
+
+    Args:
+        target (Instrumentation, optional): Instrumentation to register to.
+                                            Defaults to the instrumentation of seqal.
+
+    Attributes:
+        events (List[PhaseEvent]): Recorded events in order of finish.
+    """
+
+    def __init__(self, target: Optional[Instrumentation] = None) -> None:
+        self.target = instrumentation if target is None else target
+        self.events: List[PhaseEvent] = []
+
+    def __call__(self, event: PhaseEvent) -> None:
+        self.events.append(event)
+
+    def __enter__(self) -> "PhaseRecorder":
+        self.target.add_sink(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.target.remove_sink(self)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Total of events with the same source and phase
+
+        Returns:
+            Dict[str, Dict[str, Any]]: "{source}.{phase}" to calls, total seconds,
+                                       item counts and throughput.
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for event in self.events:
+            total = totals.setdefault(
+                f"{event.source}.{event.phase}",
+                {"calls": 0, "seconds": 0.0, "counts": defaultdict(int)},
+            )
+            total["calls"] += 1
+            total["seconds"] += event.duration
+            for name, count in event.counts.items():
+                total["counts"][name] += count
+        for total in totals.values():
+            total["counts"] = dict(total["counts"])
+            total["throughput"] = (
+                {
+                    name: count / total["seconds"]
+                    for name, count in total["counts"].items()
+                }
+                if total["seconds"] > 0
+                else {}
+            )
+        return totals
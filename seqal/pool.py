@@ -0,0 +1,128 @@
+from typing import Iterable, Iterator, List, Union
+
+import numpy as np
+from flair.data import Sentence
+
+from seqal.binary_corpus import BinaryColumnDataset
+from seqal.datasets import LazyColumnDataset
+
+LAZY_DATASETS = (LazyColumnDataset, BinaryColumnDataset)
+
+
+class Pool:
+    """Data pool with stable sentence ids
+
+    The sentence id is the position of a sentence when the pool is created.
+    It never changes, so samplers and ActiveLearner can exchange sentence ids across iterations.
+    Removing queried sentences only flips their bits in the membership bitmap.
+
+    If sentences is a LazyColumnDataset or BinaryColumnDataset, the pool keeps the dataset
+    instead of a list, and sentences are created when they are requested.
+
+    Args:
+        sentences (Union[Iterable[Sentence], LazyColumnDataset, BinaryColumnDataset]):
+            Sentences in data pool.
+        batch_size (int, optional): Sentence number read at once when iterating a lazy pool.
+                                    Defaults to 1024.
+
+    Attributes:
+        sentences (Union[List[Sentence], LazyColumnDataset, BinaryColumnDataset]):
+            All sentences, indexed by sentence id.
+        active (np.ndarray): Membership bitmap. True if the sentence is still in data pool.
+        lengths (np.ndarray): Token number of each sentence, indexed by sentence id.
+    """
+
+    def __init__(
+        self,
+        sentences: Union[Iterable[Sentence], LazyColumnDataset, BinaryColumnDataset],
+        batch_size: int = 1024,
+    ) -> None:
+        self.batch_size = batch_size
+        if isinstance(sentences, LAZY_DATASETS):
+            self.sentences = sentences
+            self.lengths = sentences.lengths
+        else:
+            self.sentences = list(sentences)
+            self.lengths = np.fromiter(
+                (len(sent) for sent in self.sentences),
+                dtype=np.int64,
+                count=len(self.sentences),
+            )
+        self.active = np.ones(len(self.sentences), dtype=bool)
+        self.active_count = len(self.sentences)
+
+    def __len__(self) -> int:
+        """Number of sentences still in data pool"""
+        return self.active_count
+
+    def __getitem__(self, sent_id: int) -> Sentence:
+        """Get sentence by sentence id"""
+        return self.sentences[sent_id]
+
+    def __iter__(self) -> Iterator[Sentence]:
+        """Iterate sentences still in data pool"""
+        if not self.is_lazy:
+            for sent_id in self.ids:
+                yield self.sentences[sent_id]
+            return
+
+        ids = self.ids
+        for start in range(0, len(ids), self.batch_size):
+            end = start + self.batch_size
+            yield from self.sentences.get(ids[start:end])
+
+    @property
+    def is_lazy(self) -> bool:
+        """True if sentences are created on demand"""
+        return isinstance(self.sentences, LAZY_DATASETS)
+
+    def __contains__(self, sent_id: int) -> bool:
+        """Check sentence id is still in data pool"""
+        return bool(self.active[sent_id])
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Sentence ids still in data pool, in ascending order"""
+        return np.flatnonzero(self.active)
+
+    def get(self, sent_ids: Iterable[int]) -> List[Sentence]:
+        """Get sentences by sentence ids
+
+        Args:
+            sent_ids (Iterable[int]): Sentence ids.
+
+        Returns:
+            List[Sentence]: Sentences in the same order as sent_ids.
+        """
+        if self.is_lazy:
+            return self.sentences.get(sent_ids)
+        return [self.sentences[sent_id] for sent_id in sent_ids]
+
+    def remove(self, sent_ids: Iterable[int]) -> List[Sentence]:
+        """Remove sentences from data pool
+
+        The cost is O(k) for k sentence ids, the other sentences are not touched.
+
+        Args:
+            sent_ids (Iterable[int]): Sentence ids to remove.
+
+        Raises:
+            KeyError: if a sentence has been removed from data pool or ids are duplicated.
+
+        Returns:
+            List[Sentence]: Removed sentences in the same order as sent_ids.
+        """
+        sent_ids = list(sent_ids)
+        if len(set(sent_ids)) != len(sent_ids):
+            raise KeyError("Sentence ids to remove must be unique")
+        for sent_id in sent_ids:
+            if not self.active[sent_id]:
+                raise KeyError(f"Sentence {sent_id} is not in data pool")
+
+        self.active[sent_ids] = False
+        self.active_count -= len(sent_ids)
+        return self.get(sent_ids)
+
+    def to_list(self) -> List[Sentence]:
+        """Get sentences still in data pool as a list"""
+        return self.get(self.ids)
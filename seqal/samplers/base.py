@@ -1,5 +1,6 @@
+import logging
 from pickletools import float8
-from typing import List
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 import torch
@@ -7,16 +8,53 @@ from flair.data import Sentence
 from flair.embeddings import Embeddings
 
 from seqal.data import Entities, Entity
+from seqal.instrumentation import SAMPLER_PHASES, instrument_methods
+from seqal.pool import Pool
 from seqal.tagger import SequenceTagger
 
+log = logging.getLogger(__name__)
+
 
 class BaseSampler:
     """BaseSampler class
 
     This is a base class to inherit for active learning sampling method.
     Each sampling method class should inherit this class.
+
+    Args:
+        subpool_size (int, optional): If set, only a random subpool with this number of sentences
+                                      is scored in each query. Defaults to None (score the whole pool).
+        random_state (Union[int, np.random.Generator], optional): Seed or generator used to sample subpool.
+        stratify_by_length (bool, optional): If true, the subpool is sampled from sentence length strata
+                                             in proportion to their size. Defaults to False.
+        n_strata (int, optional): Number of sentence length strata. Defaults to 10.
+
+    Attributes:
+        subpool_history (List[List[int]]): Sampled subpool ids of each query, used to reproduce runs.
+
+    Methods in SAMPLER_PHASES, e.g. predict, get_entities, score and sort, emit phase events
+    to seqal.instrumentation sinks, also when a subclass overrides them.
     """
 
+    def __init__(
+        self,
+        subpool_size: Optional[int] = None,
+        random_state: Union[int, np.random.Generator, None] = None,
+        stratify_by_length: bool = False,
+        n_strata: int = 10,
+    ) -> None:
+        if subpool_size is not None and subpool_size <= 0:
+            raise ValueError("subpool_size must be bigger than 0")
+        self.subpool_size = subpool_size
+        self.rng = np.random.default_rng(random_state)
+        self.stratify_by_length = stratify_by_length
+        self.n_strata = n_strata
+        self.subpool_history = []
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        instrument_methods(cls, SAMPLER_PHASES)
+
     def __call__(self):
         """Run active learning workflow
 
@@ -32,14 +70,100 @@ class BaseSampler:
         """
         raise NotImplementedError
 
-    def predict(self, sents: List[Sentence], tagger: SequenceTagger) -> None:
+    def sample_subpool(
+        self, sentences: Union[List[Sentence], Pool]
+    ) -> Tuple[List[Sentence], List[int]]:
+        """Sample a uniform random subpool from data pool for scoring
+
+        If subpool_size is not set or the data pool is not bigger than subpool_size,
+        the whole data pool is returned.
+
+        Args:
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+
+        Returns:
+            Tuple[List[Sentence], List[int]]:
+                subpool: Sentences in subpool.
+                subpool_ids: Id of each subpool sentence in data pool.
+                             If sentences is a Pool, these are the stable sentence ids of Pool,
+                             otherwise the index in sentences.
+        """
+        if isinstance(sentences, Pool):
+            pool_ids = sentences.ids
+            lengths = sentences.lengths[pool_ids]
+        else:
+            pool_ids = np.arange(len(sentences))
+            lengths = None
+
+        pool_size = len(pool_ids)
+        if self.subpool_size is None or self.subpool_size >= pool_size:
+            if isinstance(sentences, Pool):
+                return sentences.get(pool_ids), pool_ids.tolist()
+            return sentences, pool_ids.tolist()
+
+        if self.stratify_by_length is True:
+            if lengths is None:
+                lengths = np.array([len(sent) for sent in sentences])
+            positions = self.stratified_sample(lengths, self.subpool_size)
+        else:
+            positions = self.rng.choice(pool_size, self.subpool_size, replace=False)
+        subpool_ids = pool_ids[np.sort(positions)].tolist()
+
+        self.subpool_history.append(subpool_ids)
+        log.info(
+            f"Query {len(self.subpool_history)}: sampled subpool of {len(subpool_ids)} sentences "
+            f"from data pool of {pool_size} sentences"
+        )
+        log.debug(f"Subpool ids: {subpool_ids}")
+
+        if isinstance(sentences, Pool):
+            return sentences.get(subpool_ids), subpool_ids
+        return [sentences[i] for i in subpool_ids], subpool_ids
+
+    def stratified_sample(self, lengths: np.ndarray, sample_size: int) -> np.ndarray:
+        """Sample ids from sentence length strata in proportion to stratum size
+
+        Sentences are sorted by length and split into n_strata strata of equal size.
+        The quota of each stratum is rounded by the largest remainder method,
+        so the total sample size is exactly sample_size.
+
+        Args:
+            lengths (np.ndarray): Token number of each sentence.
+            sample_size (int): Number of ids to sample.
+
+        Returns:
+            np.ndarray: Sampled sentence ids.
+        """
+        ordered_ids = np.argsort(lengths, kind="stable")
+        strata = np.array_split(ordered_ids, min(self.n_strata, len(ordered_ids)))
+
+        exact_quotas = np.array([len(s) for s in strata]) * sample_size / len(lengths)
+        quotas = np.floor(exact_quotas).astype(int)
+        remainder = sample_size - quotas.sum()
+        quotas[np.argsort(quotas - exact_quotas, kind="stable")[:remainder]] += 1
+
+        return np.concatenate(
+            [
+                self.rng.choice(stratum, quota, replace=False)
+                for stratum, quota in zip(strata, quotas)
+            ]
+        )
+
+    def predict(
+        self,
+        sents: List[Sentence],
+        tagger: SequenceTagger,
+        tag_type: Optional[str] = None,
+    ) -> None:
         """Predict unlabel data
 
         Args:
             sents (List[Sentence]): Sentences in data pool.
             tagger (Module): Trained model.
+            tag_type (Optional[str], optional): Label type to write predicted tags.
+                                                Defaults to None, which means the tag_type of tagger.
         """
-        tagger.predict(sents, mini_batch_size=32)
+        tagger.predict(sents, mini_batch_size=32, label_name=tag_type)
 
     def sort(self, sent_scores: np.ndarray, order: str = "ascend") -> List[int]:
         """Sort sentence id based on sentence scores
@@ -162,3 +286,6 @@ class BaseSampler:
                     "Entities are empty. Sentences have not been predicted."
                 )
         return entities
+
+
+instrument_methods(BaseSampler, SAMPLER_PHASES)
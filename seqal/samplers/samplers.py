@@ -1,7 +1,7 @@
 import math
 import random
 from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import torch
@@ -11,6 +11,7 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import MinMaxScaler
 
 from seqal.data import Entities, Entity
+from seqal.pool import Pool
 from seqal.tagger import SequenceTagger
 
 from .base import BaseSampler
@@ -21,7 +22,7 @@ class RandomSampler(BaseSampler):
 
     def __call__(
         self,
-        sentences: List[Sentence],
+        sentences: Union[List[Sentence], Pool],
         tag_type: str,
         query_number: int,
         token_based: bool = False,
@@ -30,8 +31,8 @@ class RandomSampler(BaseSampler):
         """Random sampling workflow
 
         Args:
-            sentences (List[Sentence]): Sentences in data pool.
-            tag_type (str): Tag type to predict.
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+            tag_type (str): Tag type to predict. Predicted tags are written to this label type.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                         If false, using query number as sentence number to query data.
@@ -42,15 +43,16 @@ class RandomSampler(BaseSampler):
             embeddings: The embeddings method
 
         Returns:
-            List[int]: Queried sentence ids.
+            List[int]: Queried sentence ids. The stable sentence ids if sentences is a Pool.
         """
+        sentences, subpool_ids = self.sample_subpool(sentences)
         random.seed(0)
         sent_ids = list(range(len(sentences)))
         random_sent_ids = random.sample(sent_ids, len(sent_ids))
         queried_sent_ids = self.query(
             sentences, random_sent_ids, query_number, token_based
         )
-        return queried_sent_ids
+        return [subpool_ids[i] for i in queried_sent_ids]
 
 
 class LeastConfidenceSampler(BaseSampler):
@@ -64,7 +66,7 @@ class LeastConfidenceSampler(BaseSampler):
 
     def __call__(
         self,
-        sentences: List[Sentence],
+        sentences: Union[List[Sentence], Pool],
         tag_type: str,
         query_number: int,
         token_based: bool = False,
@@ -73,8 +75,8 @@ class LeastConfidenceSampler(BaseSampler):
         """Least confidence sampling workflow
 
         Args:
-            sentences (List[Sentence]): Sentences in data pool.
-            tag_type (str): Tag type to predict.
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+            tag_type (str): Tag type to predict. Predicted tags are written to this label type.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                           If false, using query number as sentence number to query data.
@@ -85,25 +87,28 @@ class LeastConfidenceSampler(BaseSampler):
             embeddings: The embeddings method
 
         Returns:
-            List[int]: Queried sentence ids.
+            List[int]: Queried sentence ids. The stable sentence ids if sentences is a Pool.
         """
+        # Score a random subpool instead of the whole data pool if subpool_size is set
+        sentences, subpool_ids = self.sample_subpool(sentences)
         tagger = kwargs["tagger"]
-        self.predict(sentences, tagger)
-        scores = self.score(sentences, tagger)
+        self.predict(sentences, tagger, tag_type)
+        scores = self.score(sentences, tagger, tag_type=tag_type)
         sorted_sent_ids = self.sort(-scores, order="ascend")
         queried_sent_ids = self.query(
             sentences, sorted_sent_ids, query_number, token_based
         )
-        return queried_sent_ids
+        return [subpool_ids[i] for i in queried_sent_ids]
 
     def score(
         self,
         sentences: List[Sentence],
         tagger: SequenceTagger,
         kwargs: Optional[dict] = None,
+        tag_type: Optional[str] = None,
     ) -> np.ndarray:
         """Calculate score for each sentence"""
-        log_probs = tagger.log_probability(sentences)
+        log_probs = tagger.log_probability(sentences, tag_type=tag_type)
         scores = 1 - np.exp(log_probs)
         return scores
 
@@ -119,7 +124,7 @@ class MaxNormLogProbSampler(BaseSampler):
 
     def __call__(
         self,
-        sentences: List[Sentence],
+        sentences: Union[List[Sentence], Pool],
         tag_type: str,
         query_number: int,
         token_based: bool = False,
@@ -128,8 +133,8 @@ class MaxNormLogProbSampler(BaseSampler):
         """Maximum Normalized Log-Probability sampling workflow
 
         Args:
-            sentences (List[Sentence]): Sentences in data pool.
-            tag_type (str): Tag type to predict.
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+            tag_type (str): Tag type to predict. Predicted tags are written to this label type.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                           If false, using query number as sentence number to query data.
@@ -140,25 +145,28 @@ class MaxNormLogProbSampler(BaseSampler):
             embeddings: The embeddings method
 
         Returns:
-            List[int]: Queried sentence ids.
+            List[int]: Queried sentence ids. The stable sentence ids if sentences is a Pool.
         """
+        # Score a random subpool instead of the whole data pool if subpool_size is set
+        sentences, subpool_ids = self.sample_subpool(sentences)
         tagger = kwargs["tagger"]
-        self.predict(sentences, tagger)
-        scores = self.score(sentences, tagger)
+        self.predict(sentences, tagger, tag_type)
+        scores = self.score(sentences, tagger, tag_type=tag_type)
         sorted_sent_ids = self.sort(scores, order="ascend")
         queried_sent_ids = self.query(
             sentences, sorted_sent_ids, query_number, token_based
         )
-        return queried_sent_ids
+        return [subpool_ids[i] for i in queried_sent_ids]
 
     def score(
         self,
         sentences: List[Sentence],
         tagger: SequenceTagger,
         kwargs: Optional[dict] = None,
+        tag_type: Optional[str] = None,
     ) -> np.ndarray:
         """Calculate score for each sentence"""
-        log_probs = tagger.log_probability(sentences)
+        log_probs = tagger.log_probability(sentences, tag_type=tag_type)
         lengths = np.array([len(sent) for sent in sentences])
         normed_log_probs = log_probs / lengths
         return normed_log_probs
@@ -175,7 +183,7 @@ class StringNGramSampler(BaseSampler):
 
     def __call__(
         self,
-        sentences: List[Sentence],
+        sentences: Union[List[Sentence], Pool],
         tag_type: str,
         query_number: int,
         token_based: bool = False,
@@ -184,8 +192,8 @@ class StringNGramSampler(BaseSampler):
         """StringNGram similarity sampling workflow
 
         Args:
-            sentences (List[Sentence]): Sentences in data pool.
-            tag_type (str): Tag type to predict.
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+            tag_type (str): Tag type to predict. Predicted tags are written to this label type.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                           If false, using query number as sentence number to query data.
@@ -196,24 +204,29 @@ class StringNGramSampler(BaseSampler):
             embeddings: The embeddings method
 
         Returns:
-            List[int]: Queried sentence ids.
+            List[int]: Queried sentence ids. The stable sentence ids if sentences is a Pool.
         """
+        # Score a random subpool instead of the whole data pool if subpool_size is set
+        sentences, subpool_ids = self.sample_subpool(sentences)
         tagger = kwargs["tagger"]
         embeddings = kwargs["embeddings"]
-        self.predict(sentences, tagger)
+        self.predict(sentences, tagger, tag_type)
         entities = self.get_entities(sentences, embeddings, tag_type)
 
         # If no entities, return random indices
         if not entities.entities:
             random_sampler = RandomSampler()
-            return random_sampler(sentences, tag_type, query_number, token_based)
+            queried_sent_ids = random_sampler(
+                sentences, tag_type, query_number, token_based
+            )
+            return [subpool_ids[i] for i in queried_sent_ids]
 
         scores = self.score(sentences, entities)
         sorted_sent_ids = self.sort(scores, order="ascend")
         queried_sent_ids = self.query(
             sentences, sorted_sent_ids, query_number, token_based
         )
-        return queried_sent_ids
+        return [subpool_ids[i] for i in queried_sent_ids]
 
     def score(
         self,
@@ -363,7 +376,7 @@ class DistributeSimilaritySampler(BaseSampler):
 
     def __call__(
         self,
-        sentences: List[Sentence],
+        sentences: Union[List[Sentence], Pool],
         tag_type: str,
         query_number: int,
         token_based: bool = False,
@@ -372,8 +385,8 @@ class DistributeSimilaritySampler(BaseSampler):
         """Distribute similarity sampling workflow
 
         Args:
-            sentences (List[Sentence]): Sentences in data pool.
-            tag_type (str): Tag type to predict.
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+            tag_type (str): Tag type to predict. Predicted tags are written to this label type.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                           If false, using query number as sentence number to query data.
@@ -384,24 +397,29 @@ class DistributeSimilaritySampler(BaseSampler):
             embeddings: The embeddings method
 
         Returns:
-            List[int]: Queried sentence ids.
+            List[int]: Queried sentence ids. The stable sentence ids if sentences is a Pool.
         """
+        # Score a random subpool instead of the whole data pool if subpool_size is set
+        sentences, subpool_ids = self.sample_subpool(sentences)
         tagger = kwargs["tagger"]
         embeddings = kwargs["embeddings"]
-        self.predict(sentences, tagger)
+        self.predict(sentences, tagger, tag_type)
         entities = self.get_entities(sentences, embeddings, tag_type)
 
         # If no entities, return random indices
         if not entities.entities:
             random_sampler = RandomSampler()
-            return random_sampler(sentences, tag_type, query_number, token_based)
+            queried_sent_ids = random_sampler(
+                sentences, tag_type, query_number, token_based
+            )
+            return [subpool_ids[i] for i in queried_sent_ids]
 
         scores = self.score(sentences, entities)
         sorted_sent_ids = self.sort(scores, order="ascend")
         queried_sent_ids = self.query(
             sentences, sorted_sent_ids, query_number, token_based
         )
-        return queried_sent_ids
+        return [subpool_ids[i] for i in queried_sent_ids]
 
     def score(
         self,
@@ -523,7 +541,7 @@ class ClusterSimilaritySampler(BaseSampler):
         BaseSampler: BaseSampler class.
     """
 
-    def __init__(self, kmeans_params: dict = None) -> None:
+    def __init__(self, kmeans_params: dict = None, **kwargs) -> None:
         """Inits ClusterSimilaritySampler class with kmeans_params
         Args:
             kmeans_params (dict, optional): Parameters for clustering, detail on sklearn.cluster.KMeans.
@@ -532,7 +550,9 @@ class ClusterSimilaritySampler(BaseSampler):
                         "n_init": Number of time the k-means algorithm
                                 will be run with different centroid seeds.
                         "random_state": Determines random number generation for centroid initialization.
+            kwargs: Subpool parameters of BaseSampler, e.g. subpool_size, random_state.
         """
+        super().__init__(**kwargs)
         if "n_clusters" not in kmeans_params:
             output = (
                 "You have to provide 'kmeans_params' parameter to use ClusterSimilaritySampler."
@@ -544,7 +564,7 @@ class ClusterSimilaritySampler(BaseSampler):
 
     def __call__(
         self,
-        sentences: List[Sentence],
+        sentences: Union[List[Sentence], Pool],
         tag_type: str,
         query_number: int,
         token_based: bool = False,
@@ -553,8 +573,8 @@ class ClusterSimilaritySampler(BaseSampler):
         """Distribute similarity sampling workflow
 
         Args:
-            sentences (List[Sentence]): Sentences in data pool.
-            tag_type (str): Tag type to predict.
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+            tag_type (str): Tag type to predict. Predicted tags are written to this label type.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                           If false, using query number as sentence number to query data.
@@ -564,24 +584,29 @@ class ClusterSimilaritySampler(BaseSampler):
             embeddings: The embeddings method
 
         Returns:
-            List[int]: Queried sentence ids.
+            List[int]: Queried sentence ids. The stable sentence ids if sentences is a Pool.
         """
+        # Score a random subpool instead of the whole data pool if subpool_size is set
+        sentences, subpool_ids = self.sample_subpool(sentences)
         tagger = kwargs["tagger"]
         embeddings = kwargs["embeddings"]
-        self.predict(sentences, tagger)
+        self.predict(sentences, tagger, tag_type)
         entities = self.get_entities(sentences, embeddings, tag_type)
 
         # If no entities, return random indices
         if not entities.entities:
             random_sampler = RandomSampler()
-            return random_sampler(sentences, tag_type, query_number, token_based)
+            queried_sent_ids = random_sampler(
+                sentences, tag_type, query_number, token_based
+            )
+            return [subpool_ids[i] for i in queried_sent_ids]
 
         scores = self.score(sentences, entities, kwargs)
         sorted_sent_ids = self.sort(scores, order="ascend")
         queried_sent_ids = self.query(
             sentences, sorted_sent_ids, query_number, token_based
         )
-        return queried_sent_ids
+        return [subpool_ids[i] for i in queried_sent_ids]
 
     def score(
         self,
@@ -684,6 +709,7 @@ class CombinedMultipleSampler(BaseSampler):
         combined_type: str = "parallel",
         kmeans_params: dict = None,
         scaler: BaseEstimator = None,
+        **kwargs,
     ) -> None:
         """Inits CombinedMultipleSampler class
 
@@ -705,7 +731,9 @@ class CombinedMultipleSampler(BaseSampler):
                                 will be run with different centroid seeds.
                         "random_state": Determines random number generation for centroid initialization.
             scaler (BaseEstimator, optional): The scaler method for two kinds of samplers. Defaults to "None".
+            kwargs: Subpool parameters of BaseSampler, e.g. subpool_size, random_state.
         """
+        super().__init__(**kwargs)
         self.available_sampler_types = ["lc_ds", "lc_cs", "mnlp_ds", "mnlp_cs"]
         self.available_combined_types = ["series", "parallel"]
 
@@ -738,7 +766,7 @@ class CombinedMultipleSampler(BaseSampler):
 
     def __call__(
         self,
-        sentences: List[Sentence],
+        sentences: Union[List[Sentence], Pool],
         tag_type: str,
         query_number: int,
         token_based: bool = False,
@@ -747,8 +775,8 @@ class CombinedMultipleSampler(BaseSampler):
         """Combined multiple sampler sampling workflow
 
         Args:
-            sentences (List[Sentence]): Sentences in data pool.
-            tag_type (str): Tag type to predict.
+            sentences (Union[List[Sentence], Pool]): Sentences in data pool.
+            tag_type (str): Tag type to predict. Predicted tags are written to this label type.
             query_number (int): batch query number.
             token_based (bool, optional): If true, using query number as token number to query data.
                                           If false, using query number as sentence number to query data.
@@ -758,11 +786,14 @@ class CombinedMultipleSampler(BaseSampler):
             embeddings: The embeddings method
 
         Returns:
-            List[int]: Queried sentence ids.
+            List[int]: Queried sentence ids. The stable sentence ids if sentences is a Pool.
         """
         sampler_type = self.sampler_type
         combined_type = self.combined_type
 
+        # Score a random subpool instead of the whole data pool if subpool_size is set
+        sentences, subpool_ids = self.sample_subpool(sentences)
+
         # Get samplers
         uncertainty_sampler, diversity_sampler = self.get_samplers(sampler_type)
 
@@ -774,29 +805,38 @@ class CombinedMultipleSampler(BaseSampler):
             uncertainty_sampler_queried_sents = [
                 sentences[i] for i in uncertainty_sampler_queried_sent_ids
             ]
-            queried_sent_ids = diversity_sampler(
+            diversity_sampler_queried_sent_ids = diversity_sampler(
                 uncertainty_sampler_queried_sents,
                 tag_type,
                 query_number,
                 token_based,
                 **kwargs,
             )
-            return queried_sent_ids
+            # Map ids in uncertainty queried sentences back to ids in data pool
+            return [
+                subpool_ids[uncertainty_sampler_queried_sent_ids[i]]
+                for i in diversity_sampler_queried_sent_ids
+            ]
 
         # The combine_type == "parallel"
         tagger = kwargs["tagger"]
         embeddings = kwargs["embeddings"]
 
-        self.predict(sentences, tagger)
+        self.predict(sentences, tagger, tag_type)
         entities = self.get_entities(sentences, embeddings, tag_type)
 
         # If no entities, return random indices
         if not entities.entities:
             random_sampler = RandomSampler()
-            return random_sampler(sentences, tag_type, query_number, token_based)
+            queried_sent_ids = random_sampler(
+                sentences, tag_type, query_number, token_based
+            )
+            return [subpool_ids[i] for i in queried_sent_ids]
 
         # Calculate scores
-        uncertainty_scores = uncertainty_sampler.score(sentences, tagger)
+        uncertainty_scores = uncertainty_sampler.score(
+            sentences, tagger, tag_type=tag_type
+        )
         diversity_scores = diversity_sampler.score(sentences, entities, kwargs)
 
         # Normalize scores
@@ -808,7 +848,7 @@ class CombinedMultipleSampler(BaseSampler):
         queried_sent_ids = self.query(
             sentences, sorted_sent_ids, query_number, token_based
         )
-        return queried_sent_ids
+        return [subpool_ids[i] for i in queried_sent_ids]
 
     def normalize_scores(
         self,
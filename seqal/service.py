@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+from typing import Any, List, Tuple
+
+from seqal.active_learner import ActiveLearner
+from seqal.async_learner import AsyncActiveLearner
+from seqal.pool import Pool
+from seqal.utils import add_tags
+
+log = logging.getLogger(__name__)
+
+ENDPOINTS = {("POST", "/query"), ("POST", "/submit"), ("GET", "/status")}
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    500: "Internal Server Error",
+}
+
+
+class RequestError(ValueError):
+    """Invalid request from a client, answered with status 400"""
+
+
+class QueryService:
+    """Local HTTP service that keeps ActiveLearner, data pool and tagger in memory.
+
+    Endpoints (JSON in, JSON out):
+        POST /query: Body {"query_number": 2}. Returns {"batch_id", "generation", "sent_ids", "texts"}.
+                     Query requests that arrive within batch_window, or while a scoring pass is running,
+                     are coalesced into one scoring pass. Each request gets its own slice of the result.
+        POST /submit: Body {"annotations": [...]} in the format of seqal.utils.add_tags.
+                      Annotated samples are trained in background and the new model is swapped in
+                      when training finishes. Queries during training are scored by the previous model.
+        GET /status: Returns model generation, pool size, labeled data size and training state.
+
+    Args:
+        learner (ActiveLearner): Initialized active learner.
+        pool (Pool): Data pool.
+        host (str, optional): Host to bind. Defaults to "127.0.0.1".
+        port (int, optional): Port to bind. Defaults to 0, which means a free port.
+        batch_window (float, optional): Seconds to wait for concurrent query requests. Defaults to 0.05.
+        dir_path (str, optional): Directory path to save log and model of each training.
+                                  Defaults to "output/retrain".
+        teach_kwargs: Parameters of ActiveLearner.teach, e.g. warm_start=True.
+    """
+
+    def __init__(
+        self,
+        learner: ActiveLearner,
+        pool: Pool,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        batch_window: float = 0.05,
+        dir_path: str = "output/retrain",
+        **teach_kwargs,
+    ) -> None:
+        self.driver = AsyncActiveLearner(
+            learner, pool, query_number=1, dir_path=dir_path, **teach_kwargs
+        )
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.query_requests = []
+        self.batching_task = None
+        self.server = None
+
+    async def start(self) -> None:
+        """Start listening, the bound port is set to self.port"""
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.info(f"Query service is listening on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Stop listening and wait for background training"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.driver.wait_training()
+        self.driver.close()
+
+    async def serve_forever(self) -> None:
+        """Start the service and serve until cancelled"""
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def query(self, query_number: int) -> dict:
+        """Query samples, concurrent calls are coalesced into one scoring pass.
+
+        Args:
+            query_number (int): Batch query number of this request.
+
+        Returns:
+            dict: Queried batch of this request.
+        """
+        if (
+            not isinstance(query_number, int)
+            or isinstance(query_number, bool)
+            or query_number <= 0
+        ):
+            raise RequestError("query_number must be an integer bigger than 0")
+        future = asyncio.get_running_loop().create_future()
+        self.query_requests.append((query_number, future))
+        if self.batching_task is None or self.batching_task.done():
+            self.batching_task = asyncio.create_task(self.run_query_batches())
+        return await future
+
+    async def run_query_batches(self) -> None:
+        """Score coalesced query requests until no request is waiting"""
+        await asyncio.sleep(self.batch_window)
+        while self.query_requests:
+            requests, self.query_requests = self.query_requests, []
+            try:
+                batch = await self.driver.query(sum(n for n, _ in requests))
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            log.info(
+                f"Scored {len(requests)} query requests in one pass with model generation {batch.generation}"
+            )
+
+            start = 0
+            for query_number, future in requests:
+                end = start + query_number
+                future.set_result(
+                    {
+                        "batch_id": batch.batch_id,
+                        "generation": batch.generation,
+                        "sent_ids": batch.sent_ids[start:end],
+                        "texts": [
+                            sent.to_plain_string()
+                            for sent in batch.sentences[start:end]
+                        ],
+                    }
+                )
+                start = end
+
+    def submit(self, annotations: List[dict]) -> dict:
+        """Add annotated samples and retrain model in background.
+
+        Args:
+            annotations (List[dict]): Annotated data in the format of seqal.utils.add_tags.
+
+        Returns:
+            dict: Number of accepted samples and the current model generation.
+
+        Raises:
+            RequestError: if annotations are not in the format of seqal.utils.add_tags.
+        """
+        try:
+            annotated_samples = add_tags(annotations)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise RequestError(f"Invalid annotations: {e!r}") from e
+        self.driver.submit(annotated_samples)
+        return {
+            "accepted": len(annotated_samples),
+            "generation": self.driver.generation,
+        }
+
+    def status(self) -> dict:
+        """State of the service"""
+        training_task = self.driver.training_task
+        return {
+            "generation": self.driver.generation,
+            "pool_size": len(self.driver.pool),
+            "labeled_size": len(self.driver.learner.corpus.train),
+            "queried_batches": self.driver.batch_count,
+            "training": training_task is not None and not training_task.done(),
+            "pending_samples": len(self.driver.pending_samples),
+        }
+
+    async def dispatch(self, method: str, path: str, body: Any) -> dict:
+        """Call the endpoint of method and path, which must be in ENDPOINTS
+
+        Raises:
+            RequestError: if the body is invalid.
+        """
+        if body is None:
+            body = {}
+        if not isinstance(body, dict):
+            raise RequestError("Request body must be a JSON object")
+        if path == "/query":
+            return await self.query(body.get("query_number", 1))
+        if path == "/submit":
+            if not isinstance(body.get("annotations"), list):
+                raise RequestError("annotations must be a list")
+            return self.submit(body["annotations"])
+        return self.status()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Handle one HTTP request on a connection"""
+        try:
+            method, path, body = await read_request(reader)
+            if (method, path) in ENDPOINTS:
+                status, response = 200, await self.dispatch(method, path, body)
+            else:
+                status, response = 404, {"error": f"Not found: {method} {path}"}
+        except RequestError as e:
+            status, response = 400, {"error": str(e)}
+        except Exception as e:
+            log.exception("Query service failed to handle request")
+            status, response = 500, {"error": str(e)}
+
+        content = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + content
+        )
+        await writer.drain()
+        writer.close()
+
+
+async def read_request(
+    reader: asyncio.StreamReader,
+) -> Tuple[str, str, Any]:
+    """Read method, path and JSON body of a HTTP request
+
+    Raises:
+        RequestError: if the request is malformed.
+    """
+    request_line = (await reader.readline()).decode("latin-1").split()
+    if len(request_line) < 2:
+        raise RequestError("Malformed request line")
+    method, path = request_line[0].upper(), request_line[1]
+
+    content_length = 0
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            try:
+                content_length = int(value.strip())
+            except ValueError as e:
+                raise RequestError("Malformed Content-Length") from e
+
+    body = None
+    if content_length > 0:
+        try:
+            body = json.loads(await reader.readexactly(content_length))
+        except (asyncio.IncompleteReadError, ValueError) as e:
+            raise RequestError(f"Malformed JSON body: {e}") from e
+    return method, path, body
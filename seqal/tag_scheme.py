@@ -0,0 +1,236 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from flair.data import Sentence
+
+SCHEMES = ("BIO", "BIOES", "BILOU")
+
+# Schemes with end and single prefixes
+END_PREFIXES = {"BIOES": ("E", "S"), "BILOU": ("L", "U")}
+
+# Conversions that only rename the first character of each tag
+PREFIX_MAPS = {
+    ("BILOU", "BIO"): {"L": "I", "U": "B"},
+    ("BIOES", "BIO"): {"E": "I", "S": "B"},
+    ("BILOU", "BIOES"): {"L": "E", "U": "S"},
+    ("BIOES", "BILOU"): {"E": "L", "S": "U"},
+}
+
+
+def replace_prefix(tag: str, prefix_map: Dict[str, str]) -> str:
+    """Replace the first character of a tag if it is in prefix_map"""
+    return prefix_map.get(tag[:1], tag[:1]) + tag[1:]
+
+
+class TagSchemeConverter:
+    """Convert tags between BIO, BIOES and BILOU on integer codes
+
+    Tags are mapped to integer codes once, and the converter builds lookup tables over the
+    tag vocabulary, which is small. A whole corpus is converted as one array of codes:
+    renaming prefixes is one table lookup, and BIO to BIOES/BILOU compares each code with
+    the next code in the array, except at the end of a sentence.
+
+    The result is the same as bilou2bio, bilou2bioes, bioes2bio and bio2bioes in seqal.utils.
+    From BIO, B and I become single and end tags if the next tag in the sentence
+    does not contain "I-".
+
+    Args:
+        source (str): Scheme of input tags, "BIO", "BIOES" or "BILOU".
+        target (str): Scheme of output tags, "BIO", "BIOES" or "BILOU".
+        tags (Optional[Sequence[str]], optional): Tags of existing codes, e.g. the tags of a tag type in
+                                                  BinaryColumnDataset. Defaults to None.
+
+    Raises:
+        ValueError: if a scheme is not supported.
+
+    Attributes:
+        tags (List[str]): Tag of each code. Converted tags are added to it.
+    """
+
+    def __init__(
+        self, source: str, target: str, tags: Optional[Sequence[str]] = None
+    ) -> None:
+        for scheme in (source, target):
+            if scheme not in SCHEMES:
+                raise ValueError(f"Tag scheme must be one of {SCHEMES}, not {scheme}")
+        self.source = source
+        self.target = target
+        self.tags: List[str] = []
+        self.index: Dict[str, int] = {}
+        for tag in tags or []:
+            self.add(tag)
+        self.tables: Dict[str, np.ndarray] = {}
+        self.table_size = 0
+
+    def add(self, tag: str) -> int:
+        """Get the code of a tag, add the tag if it is new"""
+        code = self.index.get(tag)
+        if code is None:
+            code = self.index[tag] = len(self.tags)
+            self.tags.append(tag)
+        return code
+
+    def encode(self, tag_lists: Iterable[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode tags of sentences as one array
+
+        Args:
+            tag_lists (Iterable[List[str]]): Tags of each sentence.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Codes of all tags, and offsets of sentences
+                                           with the code number at the end.
+        """
+        codes = []
+        lengths = [0]
+        add = self.add
+        for tags in tag_lists:
+            codes.extend(map(add, tags))
+            lengths.append(len(tags))
+        return np.array(codes, dtype=np.int32), np.cumsum(lengths)
+
+    def decode(self, codes: np.ndarray, offsets: np.ndarray) -> List[List[str]]:
+        """Decode codes to tags of each sentence"""
+        tags = np.array(self.tags, dtype=object)[codes].tolist()
+        return [
+            tags[start:end]
+            for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        ]
+
+    def build_tables(self) -> Dict[str, np.ndarray]:
+        """Build lookup tables over the tag vocabulary, rebuilt when new tags are added"""
+        prefix_map = PREFIX_MAPS.get((self.source, self.target))
+        # Converted tags are added to the vocabulary, so build again until tables cover all codes
+        while self.table_size < len(self.tags):
+            tags = list(self.tags)
+            if prefix_map is not None:
+                self.tables = {
+                    "prefix": np.array(
+                        [self.add(replace_prefix(tag, prefix_map)) for tag in tags],
+                        dtype=np.int32,
+                    )
+                }
+            elif self.source == "BIO" and self.target in END_PREFIXES:
+                end, single = END_PREFIXES[self.target]
+                self.tables = {
+                    "begin": np.array([tag[:1] == "B" for tag in tags], dtype=bool),
+                    "inside": np.array([tag[:1] == "I" for tag in tags], dtype=bool),
+                    "continue": np.array(["I-" in tag for tag in tags], dtype=bool),
+                    "single": np.array(
+                        [self.add(single + tag[1:]) for tag in tags], dtype=np.int32
+                    ),
+                    "end": np.array(
+                        [self.add(end + tag[1:]) for tag in tags], dtype=np.int32
+                    ),
+                }
+            self.table_size = len(tags)
+            # The last entry is read by code -1, a token without tag, which stays -1
+            for name, table in self.tables.items():
+                sentinel = False if table.dtype == bool else -1
+                self.tables[name] = np.append(table, np.array(sentinel, table.dtype))
+        return self.tables
+
+    def convert_codes(self, codes: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """Convert codes of all sentences
+
+        Args:
+            codes (np.ndarray): Codes of all tags, e.g. from encode. -1 is a token without tag.
+            offsets (np.ndarray): Offsets of sentences with the code number at the end.
+
+        Returns:
+            np.ndarray: Converted codes, decoded by self.tags.
+        """
+        codes = np.asarray(codes)
+        if self.source == self.target or len(codes) == 0:
+            return codes.copy()
+
+        tables = self.build_tables()
+        if "prefix" in tables:
+            return tables["prefix"][codes]
+
+        # A tag is followed by an inside tag if the next tag in the same sentence contains "I-"
+        followed = np.zeros(len(codes), dtype=bool)
+        followed[:-1] = tables["continue"][codes[1:]]
+        offsets = np.asarray(offsets)
+        sentence_ends = offsets[1:][offsets[1:] > offsets[:-1]] - 1
+        followed[sentence_ends] = False
+
+        converted = codes.copy()
+        single = tables["begin"][codes] & ~followed
+        converted[single] = tables["single"][codes[single]]
+        end = tables["inside"][codes] & ~followed
+        converted[end] = tables["end"][codes[end]]
+        return converted
+
+    def convert(self, tag_lists: Iterable[List[str]]) -> List[List[str]]:
+        """Convert tags of sentences
+
+        Args:
+            tag_lists (Iterable[List[str]]): Tags of each sentence.
+
+        Returns:
+            List[List[str]]: Converted tags of each sentence.
+        """
+        codes, offsets = self.encode(tag_lists)
+        return self.decode(self.convert_codes(codes, offsets), offsets)
+
+
+def convert_tags(tags: List[str], source: str, target: str) -> List[str]:
+    """Convert tags of a sentence between BIO, BIOES and BILOU
+
+    A sentence is short, so it is converted on strings. Building the lookup tables
+    of TagSchemeConverter only pays off for many sentences.
+
+    Args:
+        tags (List[str]): Tags of a sentence.
+        source (str): Scheme of input tags.
+        target (str): Scheme of output tags.
+
+    Raises:
+        ValueError: if a scheme is not supported.
+
+    Returns:
+        List[str]: Converted tags.
+    """
+    for scheme in (source, target):
+        if scheme not in SCHEMES:
+            raise ValueError(f"Tag scheme must be one of {SCHEMES}, not {scheme}")
+    if source == target:
+        return list(tags)
+
+    prefix_map = PREFIX_MAPS.get((source, target))
+    if prefix_map is not None:
+        return [replace_prefix(tag, prefix_map) for tag in tags]
+
+    # From BIO, B and I become single and end tags if the next tag does not contain "I-"
+    end, single = END_PREFIXES[target]
+    new_tags = []
+    for tag, next_tag in zip(tags, tags[1:] + [""]):
+        prefix = tag[:1]
+        if prefix in ("B", "I") and "I-" not in next_tag:
+            tag = (single if prefix == "B" else end) + tag[1:]
+        new_tags.append(tag)
+    return new_tags
+
+
+def convert_sentences(
+    sentences: List[Sentence], source: str, target: str, tag_type: str = "ner"
+) -> List[Sentence]:
+    """Convert tags of sentences in place between BIO, BIOES and BILOU
+
+    Args:
+        sentences (List[Sentence]): Sentences with tags.
+        source (str): Scheme of input tags.
+        target (str): Scheme of output tags.
+        tag_type (str, optional): Tag type to convert. Defaults to "ner".
+
+    Returns:
+        List[Sentence]: The same sentences with converted tags.
+    """
+    converter = TagSchemeConverter(source, target)
+    tag_lists = [
+        [token.get_tag(tag_type).value for token in sent] for sent in sentences
+    ]
+    for sent, tags in zip(sentences, converter.convert(tag_lists)):
+        for token, tag in zip(sent, tags):
+            token.set_label(tag_type, tag)
+    return sentences
@@ -1,4 +1,5 @@
-from typing import List, Tuple, Union
+import copy
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import flair.data
 import numpy as np
@@ -8,16 +9,94 @@ from flair.datasets import DataLoader, SentenceDataset
 from flair.models import SequenceTagger as FlairSequenceTagger
 from flair.models.sequence_tagger_model import pad_tensors
 
+from seqal.embedding_cache import EmbeddingCache, get_name_lengths, is_static
+
 
 class SequenceTagger(FlairSequenceTagger):
+    feature_cache: Optional[EmbeddingCache] = None
+
+    def set_feature_cache(self, cache: Optional[EmbeddingCache]) -> None:
+        """Use cached embedding layer output in forward.
+
+        If embeddings are not fine-tuned, the embedding layer output of a sentence is the same in
+        every query round. With a feature cache, each sentence is embedded once, and later forward
+        passes only run the layers after embeddings.
+
+        Args:
+            cache (Optional[EmbeddingCache]): Cache of token embeddings. None to stop using cache.
+
+        Raises:
+            ValueError: if embeddings are fine-tuned or cache has a different embedding length.
+        """
+        if cache is not None:
+            if not is_static(self.embeddings):
+                raise ValueError(
+                    "Feature cache needs embeddings that are not fine-tuned"
+                )
+            if cache.embedding_length != self.embeddings.embedding_length:
+                raise ValueError("Embedding length of cache and tagger are different")
+        self.feature_cache = cache
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "SequenceTagger":
+        """Copy the model and share the feature cache with the copy
+
+        The feature cache holds embeddings of the whole data pool, maybe in a memory-mapped file,
+        and it stays valid for the copy because embeddings are not fine-tuned.
+        """
+        if self.feature_cache is not None:
+            memo[id(self.feature_cache)] = self.feature_cache
+        tagger = self.__class__.__new__(self.__class__)
+        memo[id(self)] = tagger
+        tagger.__setstate__(copy.deepcopy(self.__dict__, memo))
+        return tagger
+
+    def forward(self, sentences: List[Sentence]) -> torch.Tensor:
+        """Overided FlairSequenceTagger.forward to use feature cache"""
+        if self.feature_cache is not None:
+            self.load_cached_features(sentences)
+        return super().forward(sentences)
+
+    def load_cached_features(self, sentences: List[Sentence]) -> None:
+        """Add cached token embeddings to sentences, embed and cache the missed sentences
+
+        After this, flair skips embedding the sentences because static embeddings are already added.
+        """
+        name_lengths = get_name_lengths(self.embeddings)
+        names = [name for name, _ in name_lengths]
+        lengths = [length for _, length in name_lengths]
+
+        missed_sentences = []
+        for sentence in sentences:
+            features = self.feature_cache.get(sentence)
+            if features is None:
+                missed_sentences.append(sentence)
+                continue
+            for name, name_features in zip(names, torch.split(features, lengths, 1)):
+                for token, token_features in zip(sentence, name_features):
+                    token.set_embedding(name, token_features)
+
+        if missed_sentences:
+            self.embeddings.embed(missed_sentences)
+            for sentence in missed_sentences:
+                if len(sentence) > 0:
+                    features = torch.stack(
+                        [token.get_embedding(names) for token in sentence]
+                    )
+                    self.feature_cache.add(sentence, features)
+
     def log_probability(
-        self, sentences: List[Sentence], batch_szie: int = 32
+        self,
+        sentences: List[Sentence],
+        batch_szie: int = 32,
+        tag_type: Optional[str] = None,
     ) -> np.array:
         """Calculate probability of each sentence.
 
         Args:
             sentences (List[Sentence]): Sentences must be predicted.
             batch_szie (int, optional): Defaults to 32.
+            tag_type (Optional[str], optional): Label type of predicted tags.
+                                                Defaults to None, which means the tag_type of tagger.
 
         Returns:
             [np.array]: The log probability of each sentences
@@ -29,13 +108,19 @@ class SequenceTagger(FlairSequenceTagger):
         with torch.no_grad():
             for batch in dataloader:
                 features = self.forward(batch)
-                batch_loss, _ = self._calculate_loss(features, batch, reduction="none")
+                batch_loss, _ = self._calculate_loss(
+                    features, batch, reduction="none", tag_type=tag_type
+                )
                 scores.extend(batch_loss.neg().tolist())
 
         return np.array(scores)
 
     def _calculate_loss(
-        self, features: torch.Tensor, sentences: List[Sentence], reduction: str = "sum"
+        self,
+        features: torch.Tensor,
+        sentences: List[Sentence],
+        reduction: str = "sum",
+        tag_type: Optional[str] = None,
     ) -> Tuple[Union[float, torch.Tensor], int]:
         """Overided FlairSequenceTagger._calculate_loss with reduction parameter
 
@@ -43,11 +128,16 @@ class SequenceTagger(FlairSequenceTagger):
             features (torch.Tensor): features after forward
             sentences (List[Sentence]): sentence after prediction
             reduction (str, optional): reduction method. Defaults to "sum".
+            tag_type (Optional[str], optional): Label type of tags to calculate loss.
+                                                Defaults to None, which means the tag_type of tagger.
 
         Returns:
             Tuple[Union[float, torch.Tensor], int]: scores and token_count
         """
 
+        if tag_type is None:
+            tag_type = self.tag_type
+
         lengths: List[int] = [len(sentence.tokens) for sentence in sentences]
 
         tag_list: List = []
@@ -55,7 +145,7 @@ class SequenceTagger(FlairSequenceTagger):
         for s_id, sentence in enumerate(sentences):
             # get the tags in this sentence
             tag_idx: List[int] = [
-                self.tag_dictionary.get_idx_for_item(token.get_tag(self.tag_type).value)
+                self.tag_dictionary.get_idx_for_item(token.get_tag(tag_type).value)
                 for token in sentence
             ]
             token_count += len(tag_idx)
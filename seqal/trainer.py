@@ -0,0 +1,102 @@
+import logging
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from flair.data import Dictionary
+from flair.trainers import ModelTrainer
+from flair.training_utils import log_line
+
+log = logging.getLogger(__name__)
+
+
+class InMemoryModelTrainer(ModelTrainer):
+    """ModelTrainer that keeps the best model in memory instead of writing checkpoints.
+
+    flair ModelTrainer saves best-model.pt, final-model.pt, training.log, loss.tsv and
+    prediction files of dev and test data to base_path. This trainer keeps a copy of the best
+    weights in memory, skips the other model files and logs, and loads the best weights
+    into the model after training.
+
+    Attributes:
+        best_state_dict (dict): Weights of the best model, None if no best model is selected,
+                                e.g. train_with_dev is True.
+    """
+
+    def train(self, base_path: Union[Path, str], **kwargs) -> dict:
+        """Train model without writing model files, see flair ModelTrainer.train for parameters
+
+        Raises:
+            ValueError: if anneal_with_restarts or anneal_with_prestarts is True.
+                        flair restores the best model from best-model.pt on disk for them.
+        """
+        for name in ("anneal_with_restarts", "anneal_with_prestarts"):
+            if kwargs.get(name):
+                raise ValueError(f"{name} is not supported in in_memory mode")
+        kwargs.setdefault("create_file_logs", False)
+        kwargs.setdefault("create_loss_file", False)
+        kwargs["save_final_model"] = False
+        kwargs["checkpoint"] = False
+        kwargs["save_model_each_k_epochs"] = 0
+        self.best_state_dict = None
+
+        # flair calls model.save and writes evaluation output files inside train.
+        # Replace them on the model instance during training.
+        evaluate = self.model.evaluate
+        self.model.save = self.save_in_memory
+        self.model.evaluate = lambda *args, **eval_kwargs: evaluate(
+            *args, **{**eval_kwargs, "out_path": None}
+        )
+        try:
+            result = super().train(base_path, **kwargs)
+        finally:
+            del self.model.save
+            del self.model.evaluate
+
+        if self.best_state_dict is not None:
+            self.model.load_state_dict(self.best_state_dict)
+        return result
+
+    def save_in_memory(self, model_file: Union[Path, str], checkpoint: bool = False):
+        """Keep best model weights in memory, skip other model files"""
+        if Path(model_file).name == "best-model.pt":
+            self.best_state_dict = {
+                key: value.detach().clone()
+                for key, value in self.model.state_dict().items()
+            }
+        else:
+            log.debug(f"Skip saving {model_file} in memory training")
+
+    def final_test(
+        self,
+        base_path: Union[Path, str],
+        eval_mini_batch_size: int,
+        main_evaluation_metric: Tuple[str, str],
+        num_workers: int = 8,
+        gold_label_dictionary_for_eval: Optional[Dictionary] = None,
+    ) -> float:
+        """Test the best model in memory
+
+        flair ModelTrainer.final_test loads base_path/best-model.pt if it exists, which may be
+        left by an earlier training in the same directory. The model in memory is tested instead.
+        """
+        log_line(log)
+        if self.best_state_dict is not None:
+            self.model.load_state_dict(self.best_state_dict)
+        else:
+            log.info("Testing using last state of model ...")
+        self.model.eval()
+
+        test_results = self.model.evaluate(
+            self.corpus.test,
+            gold_label_type=self.model.label_type,
+            mini_batch_size=eval_mini_batch_size,
+            num_workers=num_workers,
+            out_path=None,
+            embedding_storage_mode="none",
+            main_evaluation_metric=main_evaluation_metric,
+            gold_label_dictionary=gold_label_dictionary_for_eval,
+        )
+        log.info(test_results.log_line)
+        log.info(test_results.detailed_results)
+        log_line(log)
+        return test_results.main_score
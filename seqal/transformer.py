@@ -1,13 +1,192 @@
+import json
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
 from flair.data import Sentence
 from spacy.language import Language
+from spacy.tokens import Doc
+
+from seqal.utils import atomic_write, open_text
+
+log = logging.getLogger(__name__)
+
+# Token texts and start character positions of a text
+Tokens = Tuple[Tuple[str, ...], Tuple[int, ...]]
+
+
+def pipe_texts(
+    nlp: Language, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1
+) -> Iterator[Doc]:
+    """Tokenize texts in batches by nlp.pipe
+
+    Only the tokenizer runs, the pipeline components (e.g. tagger, parser, ner) are disabled.
+    So the tokens are the same as nlp(text) unless a component changes tokenization,
+    e.g. merge_entities.
+
+    Args:
+        nlp (Language): Spacy language model.
+        texts (Iterable[str]): Texts to tokenize.
+        batch_size (int, optional): Text number of a batch. Defaults to 1000.
+        n_process (int, optional): Process number, -1 means all CPUs. Defaults to 1.
+
+    Returns:
+        Iterator[Doc]: Docs in the same order as texts.
+    """
+    return nlp.pipe(
+        texts, batch_size=batch_size, n_process=n_process, disable=nlp.pipe_names
+    )
+
+
+def model_key(nlp: Language) -> str:
+    """Identity of a spacy model, stable between runs"""
+    meta = nlp.meta
+    return f"{meta.get('lang', nlp.lang)}_{meta.get('name')}-{meta.get('version')}"
+
+
+class TokenizationCache:
+    """Bounded LRU cache of spacy tokenization results
+
+    Results are keyed by the model identity (language, name and version) and the text,
+    so one cache can be shared by Transformer and Aligner, even with several models.
+    Texts that are not cached are tokenized by the tokenizer only, like pipe_texts.
+    If path is set, the cache is loaded from it and written to it by save.
+
+    Args:
+        maxsize (int, optional): Maximum number of cached texts. Defaults to 100000.
+        path (Optional[Union[str, Path]], optional): JSON file of the cache. Defaults to None.
+
+    Attributes:
+        hits (int): Number of texts found in cache.
+        misses (int): Number of texts tokenized by spacy.
+    """
+
+    def __init__(
+        self, maxsize: int = 100000, path: Optional[Union[str, Path]] = None
+    ) -> None:
+        self.maxsize = maxsize
+        self.path = None if path is None else Path(path)
+        self.entries: "OrderedDict[Tuple[str, str], Tokens]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if self.path is not None and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+            # Entries are saved from least to most recently used
+            for model, text, texts, starts in entries[-maxsize:]:
+                self.entries[(model, text)] = (tuple(texts), tuple(starts))
+
+    def __len__(self) -> int:
+        """Number of cached texts"""
+        return len(self.entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of hits in all lookups, 0 before the first lookup"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: Tuple[str, str]) -> Optional[Tokens]:
+        """Get tokens by (model identity, text) and mark them as recently used"""
+        tokens = self.entries.get(key)
+        if tokens is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return tokens
+
+    def add(self, key: Tuple[str, str], doc: Doc) -> Tokens:
+        """Add tokens of a doc, remove the least recently used texts beyond maxsize"""
+        tokens = (
+            tuple(token.text for token in doc),
+            tuple(token.idx for token in doc),
+        )
+        self.entries[key] = tokens
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return tokens
+
+    def tokenize(self, nlp: Language, text: str) -> Tokens:
+        """Tokenize a text
+
+        Args:
+            nlp (Language): Spacy language model.
+            text (str): Text to tokenize.
+
+        Returns:
+            Tokens: Token texts and start character positions.
+        """
+        key = (model_key(nlp), text)
+        tokens = self.get(key)
+        if tokens is None:
+            tokens = self.add(key, nlp.make_doc(text))
+        return tokens
+
+    def tokenize_many(
+        self,
+        nlp: Language,
+        texts: Iterable[str],
+        batch_size: int = 1000,
+        n_process: int = 1,
+    ) -> List[Tokens]:
+        """Tokenize texts, texts that are not cached are tokenized by pipe_texts once
+
+        Args:
+            nlp (Language): Spacy language model.
+            texts (Iterable[str]): Texts to tokenize.
+            batch_size (int, optional): Text number of a batch. Defaults to 1000.
+            n_process (int, optional): Process number, -1 means all CPUs. Defaults to 1.
+
+        Returns:
+            List[Tokens]: Token texts and start character positions of each text.
+        """
+        model = model_key(nlp)
+        texts = list(texts)
+        results = {}
+        missed_texts = []
+        for text in texts:
+            if text in results:
+                self.hits += 1
+                continue
+            results[text] = self.get((model, text))
+            if results[text] is None:
+                missed_texts.append(text)
+
+        docs = pipe_texts(nlp, missed_texts, batch_size, n_process)
+        for text, doc in zip(missed_texts, docs):
+            results[text] = self.add((model, text), doc)
+        return [results[text] for text in texts]
+
+    def save(self) -> None:
+        """Save the cache to path"""
+        if self.path is None:
+            raise ValueError("TokenizationCache without path can not be saved")
+        entries = [
+            [model, text, texts, starts]
+            for (model, text), (texts, starts) in self.entries.items()
+        ]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(
+            self.path, lambda file: json.dump(entries, file, ensure_ascii=False)
+        )
+        log.info(
+            f"Saved tokens of {len(self)} texts to {self.path}, hit rate {self.hit_rate:.2%}"
+        )
 
 
 class Transformer:
     """Transform sentence to character or subword form"""
 
-    def __init__(self, nlp: Language) -> None:
+    def __init__(
+        self, nlp: Language, cache: Optional[TokenizationCache] = None
+    ) -> None:
         self.lang = nlp.lang
         self.nlp = nlp
+        self.cache = cache
 
     def to_subword(self, sentence: str) -> Sentence:
         """Convert non-space language to subword form.
@@ -18,10 +197,39 @@ class Transformer:
         Returns:
             Sentence: Sentence class with subword form.
         """
+        if self.cache is not None:
+            texts, _ = self.cache.tokenize(self.nlp, sentence)
+            return Sentence(list(texts))
+
         doc = self.nlp(sentence)
         new_sentence = Sentence([token.text for token in doc])
         return new_sentence
 
+    def to_subword_many(
+        self, sentences: Iterable[str], batch_size: int = 1000, n_process: int = 1
+    ) -> List[Sentence]:
+        """Convert non-space language sentences to subword form in batches.
+
+        Args:
+            sentences (Iterable[str]): Sentence strings.
+            batch_size (int, optional): Sentence number of a batch for nlp.pipe. Defaults to 1000.
+            n_process (int, optional): Process number of nlp.pipe, -1 means all CPUs. Defaults to 1.
+
+        Returns:
+            List[Sentence]: Sentence classes with subword form, the same as to_subword of each sentence.
+        """
+        if self.cache is not None:
+            return [
+                Sentence(list(texts))
+                for texts, _ in self.cache.tokenize_many(
+                    self.nlp, sentences, batch_size, n_process
+                )
+            ]
+        return [
+            Sentence([token.text for token in doc])
+            for doc in pipe_texts(self.nlp, sentences, batch_size, n_process)
+        ]
+
     def to_char(self, sentence: Sentence, tag_type: str = "ner") -> Sentence:
         """Convert subword form to character form.
 
@@ -32,27 +240,85 @@ class Transformer:
         Returns:
             Sentence: Sentence class tagged with character form
         """
-        new_sentence = Sentence(list(sentence.to_original_text().replace(" ", "")))
-        char_idx_in_setence = 0
-        for token in sentence:
-            tag = token.get_tag("ner").value
-            if tag == "O":
-                for _ in token.text:
-                    new_sentence[char_idx_in_setence].set_label(tag_type, tag)
-                    char_idx_in_setence += 1
-            else:
-                for i, _ in enumerate(token.text):
-                    if i == 0:
-                        new_sentence[char_idx_in_setence].set_label(tag_type, tag)
-                    else:
-                        tag_list = list(tag)
-                        if i == len(token.text) - 1:
-                            tag_list[0] = "E"
-                        else:
-                            tag_list[0] = "I"
-                        new_sentence[char_idx_in_setence].set_label(
-                            tag_type, "".join(tag_list)
-                        )
-                    char_idx_in_setence += 1
-
+        chars, tags = self.to_char_tags(sentence, tag_type)
+        new_sentence = Sentence(chars)
+        for token, tag in zip(new_sentence, tags):
+            token.set_label(tag_type, tag)
         return new_sentence
+
+    def to_char_tags(
+        self, sentence: Sentence, tag_type: str = "ner"
+    ) -> Tuple[List[str], List[str]]:
+        """Convert subword form to characters and character tags without creating tokens.
+
+        Each token is a span of character offsets. The first character keeps the token tag,
+        the last character takes "E-" and the characters between take "I-",
+        which are filled by slice assignment. Characters of untagged tokens are "O".
+
+        Args:
+            sentence (Sentence): Sentence class tagged with subword form
+            tag_type (str, optional): Tag type. Defaults to "ner".
+
+        Returns:
+            chars (List[str]): A list of character without spaces.
+            tags (List[str]): A list of tags of characters.
+        """
+        texts = [token.text.replace(" ", "") for token in sentence]
+        chars = list("".join(texts))
+        tags = ["O"] * len(chars)
+        end = 0
+        for token, text in zip(sentence, texts):
+            start, end = end, end + len(text)
+            tag = token.get_tag(tag_type).value
+            if tag in ("O", "") or start == end:
+                continue
+            tags[start] = tag
+            if end - start > 1:
+                entity = tag[1:]
+                inside, last = start + 1, end - 1
+                tags[inside:last] = ["I" + entity] * (last - inside)
+                tags[last] = "E" + entity
+        return chars, tags
+
+    def to_char_tags_many(
+        self, sentences: Iterable[Sentence], tag_type: str = "ner"
+    ) -> List[Tuple[List[str], List[str]]]:
+        """Convert sentences of subword form to characters and character tags.
+
+        Args:
+            sentences (Iterable[Sentence]): Sentence classes tagged with subword form
+            tag_type (str, optional): Tag type. Defaults to "ner".
+
+        Returns:
+            List[Tuple[List[str], List[str]]]: Characters and tags of each sentence.
+        """
+        return [self.to_char_tags(sentence, tag_type) for sentence in sentences]
+
+    def write_char_jsonl(
+        self,
+        sentences: Iterable[Sentence],
+        file_path: Union[str, Path],
+        tag_type: str = "ner",
+    ) -> int:
+        """Write sentences in character form to a JSONL file, one sentence at a time.
+
+        Each line is {"text": characters, "labels": tags}, the character-based format of
+        Aligner.add_tags_on_char_non_spaced_language. The file is compressed
+        if the suffix is ".gz" or ".xz".
+
+        Args:
+            sentences (Iterable[Sentence]): Sentence classes tagged with subword form
+            file_path (Union[str, Path]): Output file.
+            tag_type (str, optional): Tag type. Defaults to "ner".
+
+        Returns:
+            int: Number of written sentences.
+        """
+        count = 0
+        with open_text(file_path, "wt") as file:
+            for sentence in sentences:
+                chars, tags = self.to_char_tags(sentence, tag_type)
+                record = {"text": chars, "labels": tags}
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
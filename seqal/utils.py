@@ -1,8 +1,20 @@
+import gc
+import gzip
+import hashlib
+import io
 import json
-from collections import defaultdict
-from typing import List
+import lzma
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Union
 
 from flair.data import Corpus, Sentence
+from flair.tokenization import Tokenizer
+
+from seqal.tag_scheme import convert_tags
 
 
 def assign_id_corpus(corpus: Corpus) -> Corpus:
@@ -28,63 +40,228 @@ def assign_id_corpus(corpus: Corpus) -> Corpus:
     return corpus
 
 
+FILE_FORMATS = ("conll", "jsonl", "json")
+COMPRESSIONS = {".gz": "gzip", ".xz": "xz"}
+
+
+class LabeledDataWriter:
+    """Streaming writer of labeled sentences
+
+    Sentences are written one by one through a large write buffer, so the memory does not grow
+    with the dataset. The writer can stay open across query rounds, and write the queried samples
+    of each round. The "json" format writes the same indented JSON array as json.dumps(data, indent=4),
+    element by element, and closes the array in close.
+
+    Args:
+        file_path (Union[str, Path]): Path to save file.
+        file_format (str, optional): "conll", "jsonl" or "json". Defaults to "conll".
+        tag_type (str, optional): Output tag type. Defaults to "ner".
+        compression (Optional[str], optional): "gzip" or "xz". Defaults to None,
+                                               which means inferred from the suffix (".gz", ".xz").
+        append (bool, optional): Append to an existing file. Defaults to False.
+        buffer_size (int, optional): Size of the write buffer in bytes. Defaults to 1MB.
+
+    Raises:
+        NameError: if file_format is not supported.
+        ValueError: if compression is not supported or a compressed JSON array is appended.
+    """
+
+    def __init__(
+        self,
+        file_path: Union[str, Path],
+        file_format: str = "conll",
+        tag_type: str = "ner",
+        compression: Optional[str] = None,
+        append: bool = False,
+        buffer_size: int = 1 << 20,
+    ) -> None:
+        if file_format not in FILE_FORMATS:
+            raise NameError("The file_format must be 'conll', 'jsonl' or 'json'.")
+        file_path = Path(file_path)
+        if compression is None:
+            compression = COMPRESSIONS.get(file_path.suffix)
+        if compression not in (None, "gzip", "xz"):
+            raise ValueError("The compression must be 'gzip' or 'xz'.")
+
+        self.file_format = file_format
+        self.tag_type = tag_type
+        self.count = 0
+        self.array_started = False
+        self.has_elements = False
+        append = append and file_path.exists() and file_path.stat().st_size > 0
+        mode = "ab" if append else "wb"
+
+        if file_format == "json" and append:
+            if compression is not None:
+                raise ValueError("Compressed JSON array can not be appended.")
+            self.reopen_json_array(file_path)
+
+        if compression == "gzip":
+            raw = gzip.open(file_path, mode)
+        elif compression == "xz":
+            raw = lzma.open(file_path, mode)
+        else:
+            raw = open(file_path, mode, buffering=0)
+        self.file = io.TextIOWrapper(
+            io.BufferedWriter(raw, buffer_size), encoding="utf-8", newline="\n"
+        )
+
+    def reopen_json_array(self, file_path: Path) -> None:
+        """Remove the end of a JSON array written by this writer, so elements can be added"""
+        with open(file_path, "r+b") as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            file.seek(max(0, size - 2))
+            tail = file.read()
+            if tail == b"[]":
+                file.truncate(size - 2)
+            elif tail == b"\n]":
+                file.truncate(size - 2)
+                self.array_started = True
+                self.has_elements = True
+            else:
+                raise ValueError(f"{file_path} does not end with a JSON array")
+
+    def __enter__(self) -> "LabeledDataWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, sentences: Iterable[Sentence]) -> None:
+        """Write sentences
+
+        Args:
+            sentences (Iterable[Sentence]): Labeled sentences.
+        """
+        tag_type = self.tag_type
+        for sent in sentences:
+            if self.file_format == "conll":
+                lines = [
+                    f"{token.text}\t{token.get_tag(tag_type).value}\n" for token in sent
+                ]
+                lines.append("\n")
+                self.file.write("".join(lines))
+                self.count += 1
+                continue
+
+            sent_dict = {
+                "text": [token.text for token in sent],
+                "labels": [token.get_tag(tag_type).value for token in sent],
+            }
+            if self.file_format == "jsonl":
+                self.file.write(json.dumps(sent_dict) + "\n")
+            else:
+                if not self.array_started:
+                    self.file.write("[\n")
+                    self.array_started = True
+                elif self.has_elements:
+                    self.file.write(",\n")
+                element = json.dumps(sent_dict, indent=4).replace("\n", "\n    ")
+                self.file.write(f"    {element}")
+                self.has_elements = True
+            self.count += 1
+
+    def flush(self) -> None:
+        """Flush buffered data to file"""
+        self.file.flush()
+
+    def close(self) -> None:
+        """Flush buffered data and close file"""
+        if self.file.closed:
+            return
+        if self.file_format == "json":
+            self.file.write("\n]" if self.array_started else "[]")
+        self.file.close()
+
+
 def output_labeled_data(
-    sentences: List[Sentence],
+    sentences: Iterable[Sentence],
     file_path: str,
     file_format: str = "conll",
     tag_type: str = "ner",
+    compression: Optional[str] = None,
+    append: bool = False,
 ) -> None:
-    """Output dataset as conll format.
+    """Output dataset as conll, jsonl or json format.
+
+    Sentences are streamed to file by LabeledDataWriter.
 
     Args:
-        sentences (List[Sentence]): List of sentences.
+        sentences (Iterable[Sentence]): Sentences.
         file_path (str): Path to save file.
-        file_format (str, optional): Output file format. Defaults to "conll". Or "json"
+        file_format (str, optional): Output file format. Defaults to "conll". Or "jsonl", "json".
         tag_type (str, optional): Output tag type. Defaults to "ner".
+        compression (Optional[str], optional): "gzip" or "xz". Defaults to None,
+                                               which means inferred from the suffix (".gz", ".xz").
+        append (bool, optional): Append to an existing file, e.g. in each query round. Defaults to False.
     """
-    if file_format == "conll":
-        with open(file_path, "w", encoding="utf-8") as file:
-            for sent in sentences:
-                for token in sent:
-                    line = (
-                        f"{token.text}\t{token.get_tag(tag_type).value}\n"  # noqa: E731
-                    )
-                    file.write(line)
-                file.write("\n")
-    elif file_format == "json":
-        data = []
-        for sent in sentences:
-            sent_dict = {"text": [], "labels": []}
-            for token in sent:
-                sent_dict["text"].append(token.text)
-                sent_dict["labels"].append(token.get_tag(tag_type).value)
-            data.append(sent_dict)
+    with LabeledDataWriter(
+        file_path, file_format, tag_type, compression=compression, append=append
+    ) as writer:
+        writer.write(sentences)
 
-        json_object = json.dumps(data, indent=4)
-        with open(file_path, "w", encoding="utf-8") as file:
-            file.write(json_object)
-    else:
-        raise NameError("The file_format must be 'conll' or 'json'.")
 
+def open_text(file_path: Union[str, Path], mode: str = "rt") -> IO:
+    """Open a text file, which is compressed if the suffix is ".gz" or ".xz"
 
-def add_tags(query_labels: List[dict]) -> List[Sentence]:
+    Args:
+        file_path (Union[str, Path]): File path.
+        mode (str, optional): Text mode to open file. Defaults to "rt".
+
+    Returns:
+        IO: The opened file.
+    """
+    compression = COMPRESSIONS.get(Path(file_path).suffix)
+    if compression == "gzip":
+        return gzip.open(file_path, mode, encoding="utf-8")
+    if compression == "xz":
+        return lzma.open(file_path, mode, encoding="utf-8")
+    return open(file_path, mode, encoding="utf-8")
+
+
+def read_annotations(file_path: Union[str, Path]) -> Iterator[dict]:
+    """Read annotations from a JSONL export one line at a time
+
+    Each line is a dictionary in the format of add_tags. Blank lines are skipped.
+    The file is compressed if the suffix is ".gz" or ".xz".
+
+    Args:
+        file_path (Union[str, Path]): JSONL file of annotations.
+
+    Yields:
+        Iterator[dict]: Annotation of a sentence.
+    """
+    with open_text(file_path) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def add_tags(query_labels: Iterable[dict], tag_type: str = "ner") -> List[Sentence]:
     """Add tags to create sentences.
 
+    Labels of a sentence are indexed by start position and text,
+    so the tag of each token is set once in one pass over tokens.
+    Tokens without label are tagged as "O".
+
     Args:
-        query_labels (List[dict]): Each dictionary contains text and labels.
-                                   Example:
-                                    [
-                                        {
-                                            "text": "I love Berlin .",
-                                            "labels": [
+        query_labels (Iterable[dict]): Each dictionary contains text and labels.
+                                       It can be a stream, e.g. read_annotations(file_path).
+                                       Example:
+                                        [
                                             {
-                                                "start_pos": 7,
-                                                "text": "Berlin",
-                                                "label": "B-LOC"
+                                                "text": "I love Berlin .",
+                                                "labels": [
+                                                {
+                                                    "start_pos": 7,
+                                                    "text": "Berlin",
+                                                    "label": "B-LOC"
+                                                }
+                                                ]
                                             }
-                                            ]
-                                        }
-                                    ]
+                                        ]
+        tag_type (str, optional): Tag type to add. Defaults to "ner".
 
     Returns:
         List[Sentence]: A list of sentences.
@@ -92,20 +269,16 @@ def add_tags(query_labels: List[dict]) -> List[Sentence]:
     annotated_sentences = []
     for sent in query_labels:
         sentence = Sentence(sent["text"])
-        sent_labels = sent["labels"]
-        if len(sent_labels) != 0:
-            for token in sentence:
-                for token_label_info in sent_labels:
-                    if (
-                        token.start_pos == token_label_info["start_pos"]
-                        and token.text == token_label_info["text"]
-                    ):
-                        token.add_tag("ner", token_label_info["label"])
-                        break
-                    token.add_tag("ner", "O")
-        else:
-            for token in sentence:
-                token.add_tag("ner", "O")
+        label_index = {}
+        for token_label_info in sent["labels"]:
+            key = (token_label_info["start_pos"], token_label_info["text"])
+            # The first label of a token is used, like a scan in list order
+            label_index.setdefault(key, token_label_info["label"])
+
+        for token in sentence:
+            token.set_label(
+                tag_type, label_index.get((token.start_pos, token.text), "O")
+            )
         annotated_sentences.append(sentence)
 
     return annotated_sentences
@@ -135,13 +308,113 @@ def entity_ratio(sentences: List[Sentence], tag_type: str = "ner") -> float:
     return float(sum(entity_counter.values()) / len(entity_counter.keys()))
 
 
-def load_plain_text(file_path: str) -> List[Sentence]:
-    """Load plain dataset"""
-    sentences = []
+def tokenize_lines(
+    lines: List[str], use_tokenizer: Union[bool, Tokenizer] = True
+) -> List[Sentence]:
+    """Create sentences from lines, used in the worker processes of iter_plain_text"""
+    with paused_gc():
+        return [Sentence(line, use_tokenizer=use_tokenizer) for line in lines]
+
+
+def read_line_chunks(
+    file_path: str,
+    chunk_size: int,
+    skip_blank: bool = False,
+    skip_duplicates: bool = False,
+) -> Iterator[List[str]]:
+    """Read lines of a text file in chunks
+
+    Args:
+        file_path (str): Path of the text file.
+        chunk_size (int): Line number of a chunk.
+        skip_blank (bool, optional): Skip lines with only whitespace. Defaults to False.
+        skip_duplicates (bool, optional): Skip lines that are the same as a previous line after
+                                          stripping whitespace. Defaults to False.
+
+    Yields:
+        Iterator[List[str]]: Chunks of lines in file order.
+    """
+    # Digests of seen lines, smaller than keeping the lines
+    seen = set()
+    chunk = []
     with open(file_path, mode="r", encoding="utf-8") as f:
         for line in f:
-            sentences.append(Sentence(line))
-    return sentences
+            text = line.strip()
+            if skip_blank and not text:
+                continue
+            if skip_duplicates:
+                digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+                if digest in seen:
+                    continue
+                seen.add(digest)
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_plain_text(
+    file_path: str,
+    chunk_size: int = 1000,
+    workers: int = 1,
+    skip_blank: bool = False,
+    skip_duplicates: bool = False,
+    use_tokenizer: Union[bool, Tokenizer] = True,
+) -> Iterator[List[Sentence]]:
+    """Load plain dataset lazily in chunks of sentences
+
+    Each line is a sentence. The file is read while the chunks are consumed,
+    so scoring can start on the first chunk before the file is loaded.
+    If workers is bigger than 1, chunks are tokenized in a process pool,
+    and at most 2 * workers chunks are loaded ahead. Chunks are yielded in file order.
+
+    Args:
+        file_path (str): Path of the text file.
+        chunk_size (int, optional): Sentence number of a chunk. Defaults to 1000.
+        workers (int, optional): Number of processes to tokenize. Defaults to 1 (no process pool).
+        skip_blank (bool, optional): Skip lines with only whitespace. Defaults to False.
+        skip_duplicates (bool, optional): Skip lines that are the same as a previous line after
+                                          stripping whitespace. Defaults to False.
+        use_tokenizer (Union[bool, Tokenizer], optional): Tokenizer of Sentence.
+                                                          It must be picklable if workers > 1.
+                                                          Defaults to True (flair default tokenizer).
+
+    Yields:
+        Iterator[List[Sentence]]: Chunks of sentences in file order.
+    """
+    chunks = read_line_chunks(file_path, chunk_size, skip_blank, skip_duplicates)
+    if workers <= 1:
+        for lines in chunks:
+            yield tokenize_lines(lines, use_tokenizer)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = deque()
+        for lines in chunks:
+            futures.append(executor.submit(tokenize_lines, lines, use_tokenizer))
+            if len(futures) >= 2 * workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def load_plain_text(file_path: str, **kwargs) -> List[Sentence]:
+    """Load plain dataset
+
+    Args:
+        file_path (str): Path of the text file, each line is a sentence.
+        **kwargs: Parameters of iter_plain_text, e.g. workers, skip_blank, skip_duplicates.
+
+    Returns:
+        List[Sentence]: All sentences.
+    """
+    return [
+        sentence
+        for sentences in iter_plain_text(file_path, **kwargs)
+        for sentence in sentences
+    ]
 
 
 def count_tokens(sentences: List[Sentence]) -> int:
@@ -158,16 +431,7 @@ def bilou2bioes(tags: List[str]) -> List[str]:
     Returns:
         List[str]: List of tags with BIOES format.
     """
-    new_tags = []
-    for tag in tags:
-        tag_list = list(tag)
-        if tag[0] == "L":
-            tag_list[0] = "E"
-        elif tag[0] == "U":
-            tag_list[0] = "S"
-        tag = "".join(tag_list)
-        new_tags.append(tag)
-    return new_tags
+    return convert_tags(tags, "BILOU", "BIOES")
 
 
 def bilou2bio(tags: List[str]) -> List[str]:
@@ -179,16 +443,7 @@ def bilou2bio(tags: List[str]) -> List[str]:
     Returns:
         List[str]: List of tags with BIO format.
     """
-    new_tags = []
-    for tag in tags:
-        tag_list = list(tag)
-        if tag[0] == "L":
-            tag_list[0] = "I"
-        elif tag[0] == "U":
-            tag_list[0] = "B"
-        tag = "".join(tag_list)
-        new_tags.append(tag)
-    return new_tags
+    return convert_tags(tags, "BILOU", "BIO")
 
 
 def bioes2bio(tags: List[str]) -> List[str]:
@@ -200,37 +455,57 @@ def bioes2bio(tags: List[str]) -> List[str]:
     Returns:
         List[str]: List of tags with BIO format.
     """
-    new_tags = []
-    for tag in tags:
-        tag_list = list(tag)
-        if tag[0] == "E":
-            tag_list[0] = "I"
-        elif tag[0] == "S":
-            tag_list[0] = "B"
-        tag = "".join(tag_list)
-        new_tags.append(tag)
-    return new_tags
+    return convert_tags(tags, "BIOES", "BIO")
 
 
 def bio2bioes(tags: List[str]) -> List[str]:
-    """Convert BIOES format to BIO format
+    """Convert BIO format to BIOES format
 
     Args:
-        tags (List[str]): List of tags with BIOES format.
+        tags (List[str]): List of tags with BIO format.
 
     Returns:
-        List[str]: List of tags with BIO format.
+        List[str]: List of tags with BIOES format.
+    """
+    return convert_tags(tags, "BIO", "BIOES")
+
+
+def atomic_write(
+    file_path: Union[str, Path], write: Callable[[IO], None], mode: str = "w"
+) -> None:
+    """Write a file atomically
+
+    The content is written to a temporary file in the same directory,
+    which replaces file_path after it is flushed to disk.
+    So a crash leaves either the old file or the new file, never a partial one.
+
+    Args:
+        file_path (Union[str, Path]): Path of the file to write.
+        write (Callable[[IO], None]): Function that writes content to the opened file.
+        mode (str, optional): Mode to open the temporary file. Defaults to "w".
+                              Text is written in UTF-8.
+    """
+    file_path = Path(file_path)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    encoding = None if "b" in mode else "utf-8"
+    with open(tmp_path, mode, encoding=encoding) as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, file_path)
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """Pause the cyclic garbage collector while creating many objects
+
+    Sentences and tokens reference each other, so each collection scans all parsed sentences.
+    Without pausing, the collections take more time than parsing.
     """
-    new_tags = []
-    for i, tag in enumerate(tags):
-        tag_list = list(tag)
-        if tag[0] == "B":
-            if (i == len(tags) - 1) or ("I-" not in tags[i + 1]):
-                tag_list[0] = "S"
-        elif tag[0] == "I":
-            if (i == len(tags) - 1) or ("I-" not in tags[i + 1]):
-                tag_list[0] = "E"
-
-        tag = "".join(tag_list)
-        new_tags.append(tag)
-    return new_tags
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
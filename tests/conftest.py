@@ -3,8 +3,9 @@ from pathlib import Path
 from typing import List
 
 import pytest
+import torch
 from flair.data import Sentence
-from flair.embeddings import BytePairEmbeddings, StackedEmbeddings
+from flair.embeddings import BytePairEmbeddings, StackedEmbeddings, TokenEmbeddings
 
 from seqal.active_learner import ActiveLearner
 from seqal.datasets import ColumnCorpus, Corpus
@@ -12,6 +13,27 @@ from seqal.samplers import RandomSampler
 from seqal.tagger import SequenceTagger
 
 
+class LengthEmbeddings(TokenEmbeddings):
+    """Static embeddings of token length that count embedded sentences"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.name = "length"
+        self.static_embeddings = True
+        self.embedded_count = 0
+
+    @property
+    def embedding_length(self) -> int:
+        return 2
+
+    def _add_embeddings_internal(self, sentences: List[Sentence]) -> List[Sentence]:
+        for sentence in sentences:
+            self.embedded_count += 1
+            for token in sentence:
+                token.set_embedding(self.name, torch.tensor([len(token.text), 1.0]))
+        return sentences
+
+
 @pytest.fixture
 def fixture_path() -> Path:
     """Path to save file"""
@@ -183,3 +205,9 @@ def trained_learner(
     trained_learner.initialize(dir_path)
 
     return trained_learner
+
+
+@pytest.fixture
+def length_embeddings() -> LengthEmbeddings:
+    """Static embeddings that do not need embedding files"""
+    return LengthEmbeddings()
@@ -1,20 +1,32 @@
+import json
 import shutil
+from collections import defaultdict
 from pathlib import Path
 from typing import List
+from unittest.mock import MagicMock, patch
 
+import numpy as np
+import pytest
 from flair.data import Sentence
 
-from seqal.active_learner import ActiveLearner, remove_queried_samples
+from seqal.active_learner import (
+    ActiveLearner,
+    get_main_label,
+    is_converged,
+    remove_queried_samples,
+    stratified_sample_ids,
+)
 from seqal.datasets import Corpus
+from seqal.pool import Pool
 
 
 def test_remove_queried_samples(unlabeled_sentences: List[Sentence]) -> None:
     """Test remove_queried_samples function"""
     # Arrange
     sents = unlabeled_sentences[:5]
-    queried_idx = [1, 2, 4]
+    queried_idx = [4, 1, 2]
     expected_new_sents = [sents[0], sents[3]]
-    expected_queried_sents = [sents[1], sents[2], sents[4]]
+    expected_queried_sents = [sents[4], sents[1], sents[2]]
 
     # Act
     new_sents, queried_sents = remove_queried_samples(sents, queried_idx)
@@ -24,9 +36,121 @@ def test_remove_queried_samples(unlabeled_sentences: List[Sentence]) -> None:
     assert queried_sents == expected_queried_sents
 
 
+@pytest.mark.parametrize(
+    "train_loss_history,max_epochs,expected",
+    [
+        ([], 5, False),
+        ([1.0, 0.5], 5, True),
+        ([1.0, 0.5, 0.3], 3, False),
+        ([1.0, 0.5, 0.499], 3, True),
+    ],
+)
+def test_is_converged(
+    train_loss_history: List[float], max_epochs: int, expected: bool
+) -> None:
+    """Test is_converged function"""
+    assert is_converged(train_loss_history, max_epochs) is expected
+
+
+def test_get_main_label() -> None:
+    """Test get_main_label return the most frequent entity label"""
+    # Arrange
+    sentence = Sentence("Peter and Mary in Tokyo")
+    sentence[0].add_tag("ner", "S-PER")
+    sentence[2].add_tag("ner", "S-PER")
+    sentence[4].add_tag("ner", "S-LOC")
+
+    # Assert
+    assert get_main_label(sentence, "ner") == "PER"
+    assert get_main_label(Sentence("I am fine"), "ner") == "O"
+
+
+def test_stratified_sample_ids() -> None:
+    """Test stratified_sample_ids sample ids in proportion to stratum size"""
+    # Arrange
+    strata = {"O": list(range(6)), "PER": [6, 7, 8], "LOC": [9]}
+    rng = np.random.default_rng(0)
+
+    # Act
+    sampled_ids = stratified_sample_ids(strata, 4, rng)
+
+    # Assert
+    assert len(set(sampled_ids)) == 4
+    assert len(set(sampled_ids) & set(strata["O"])) == 2
+    assert len(set(sampled_ids) & set(strata["PER"])) == 1
+    assert 9 in sampled_ids
+
+
 class TestActiveLearner:
     """Test ActiveLearner class"""
 
+    def test_query_remove_queried_samples_from_pool_by_stable_ids(
+        self, corpus: Corpus, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test query remove queried samples from Pool in place"""
+        # Arrange
+        pool = Pool(unlabeled_sentences)
+        query_strategy = MagicMock(side_effect=[[3, 1], [7, 2]])
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, query_strategy, tagger_params, {})
+
+        # Act
+        first_queried_samples, pool_after_first_query = learner.query(pool, 2)
+        second_queried_samples, _ = learner.query(pool, 2)
+
+        # Assert
+        assert pool_after_first_query is pool
+        assert first_queried_samples == [unlabeled_sentences[3], unlabeled_sentences[1]]
+        assert second_queried_samples == [
+            unlabeled_sentences[7],
+            unlabeled_sentences[2],
+        ]
+        assert pool.ids.tolist() == [0, 4, 5, 6, 8, 9]
+
+    def test_query_return_list_if_sents_is_list(
+        self, corpus: Corpus, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test query return data pool as list if input is list"""
+        # Arrange
+        query_strategy = MagicMock(return_value=[3, 1])
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, query_strategy, tagger_params, {})
+
+        # Act
+        queried_samples, sents = learner.query(unlabeled_sentences, 2)
+
+        # Assert
+        assert queried_samples == [unlabeled_sentences[3], unlabeled_sentences[1]]
+        assert sents == [
+            sent for i, sent in enumerate(unlabeled_sentences) if i not in (1, 3)
+        ]
+
+    def test_query_reuse_pool_of_returned_list(
+        self, corpus: Corpus, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test the list returned by query is backed by the same Pool in the next query"""
+        # Arrange
+        query_strategy = MagicMock(side_effect=[[3, 1], [7, 2], [0]])
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, query_strategy, tagger_params, {})
+
+        # Act
+        _, sents = learner.query(unlabeled_sentences, 2)
+        first_pool = query_strategy.call_args[0][0]
+        second_queried_samples, sents = learner.query(sents, 2)
+        second_pool = query_strategy.call_args[0][0]
+        learner.query(list(sents), 1)
+        third_pool = query_strategy.call_args[0][0]
+
+        # Assert
+        assert second_pool is first_pool
+        assert second_queried_samples == [
+            unlabeled_sentences[7],
+            unlabeled_sentences[2],
+        ]
+        assert learner.queried_history[:2] == [[3, 1], [7, 2]]
+        assert third_pool is not first_pool
+
     def test_initialize_without_error(
         self, fixture_path: Path, learner: ActiveLearner
     ) -> None:
@@ -77,3 +201,171 @@ class TestActiveLearner:
 
         # Assert
         assert model_id == id(trained_learner.trained_tagger)
+
+    def test_query_keep_gold_tags_in_research_mode(
+        self, corpus: Corpus, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test query write predicted tags to a separate label type in research mode"""
+        # Arrange
+        sents = unlabeled_sentences[:3]
+        for sent in sents:
+            for token in sent:
+                token.add_tag("ner", "O")
+
+        def query_strategy(pool, tag_type, query_number, token_based, **kwargs):
+            for sent in pool:
+                for token in sent:
+                    token.add_tag(tag_type, "S-PER")
+            return [0]
+
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, query_strategy, tagger_params, {})
+
+        # Act
+        queried_samples, sents_after_remove = learner.query(
+            sents, 1, research_mode=True
+        )
+
+        # Assert
+        for sent in sents:
+            assert all(token.get_tag("ner").value == "O" for token in sent)
+        assert queried_samples[0][0].get_labels("predicted_ner") == []
+        assert sents_after_remove[0][0].get_tag("predicted_ner").value == "S-PER"
+
+    def test_warm_start_train_previous_model_on_all_labeled_data(
+        self, corpus: Corpus
+    ) -> None:
+        """Test warm_start reuse trained tagger with reduced epochs"""
+        # Arrange
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        trainer_params = {"max_epochs": 10}
+        learner = ActiveLearner(corpus, MagicMock(), tagger_params, trainer_params)
+        trained_tagger = MagicMock()
+        trained_tagger.tag_dictionary = corpus.make_tag_dictionary(tag_type="ner")
+        learner.trained_tagger = trained_tagger
+        queried_samples = corpus.dev.sentences[:1]
+
+        # Act
+        with patch("seqal.active_learner.ModelTrainer") as model_trainer:
+            model_trainer.return_value.train.return_value = {
+                "train_loss_history": [0.5, 0.4]
+            }
+            report = learner.teach(queried_samples, warm_start=True)
+
+        # Assert
+        model_trainer.assert_called_once_with(trained_tagger, corpus)
+        assert model_trainer.return_value.train.call_args[1]["max_epochs"] == 2
+        assert learner.trained_tagger is trained_tagger
+        assert len(corpus.train.sentences) == 11
+        assert report["warm_started"] is True
+        assert report["converged"] is False
+
+    def test_warm_start_train_new_model_if_tag_dictionary_changed(
+        self, corpus: Corpus
+    ) -> None:
+        """Test warm_start train a new model if queried samples contain new tags"""
+        # Arrange
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, MagicMock(), tagger_params, {})
+        learner.trained_tagger = MagicMock()
+        learner.trained_tagger.tag_dictionary.get_items.return_value = ["O"]
+        learner.initialize = MagicMock()
+
+        # Act
+        report = learner.warm_start(corpus.dev.sentences[:1])
+
+        # Assert
+        learner.initialize.assert_called_once()
+        assert report["warm_started"] is False
+
+    def test_train_tagger_in_memory_write_metrics_record(
+        self, tmp_path: Path, corpus: Corpus
+    ) -> None:
+        """Test in_memory mode appends a metrics record and saves model every save_every trainings"""
+        # Arrange
+        metrics_path = tmp_path / "metrics.jsonl"
+        learner = ActiveLearner(
+            corpus,
+            MagicMock(),
+            {"tag_type": "ner"},
+            {"max_epochs": 2},
+            in_memory=True,
+            metrics_path=metrics_path,
+            save_every=2,
+        )
+        tagger = MagicMock()
+
+        # Act
+        with patch("seqal.active_learner.InMemoryModelTrainer") as model_trainer:
+            model_trainer.return_value.train.return_value = {
+                "test_score": 0.5,
+                "train_loss_history": [0.5, 0.4],
+                "dev_score_history": [0.3, 0.4],
+            }
+            for i in range(2):
+                learner.train_tagger(tagger, corpus, tmp_path / f"retrain_{i}")
+
+        # Assert
+        records = [json.loads(line) for line in metrics_path.read_text().splitlines()]
+        assert [record["round"] for record in records] == [1, 2]
+        assert records[0]["labeled_size"] == len(corpus.train)
+        assert records[0]["dev_score_history"] == [0.3, 0.4]
+        tagger.save.assert_called_once_with(tmp_path / "retrain_1/final-model.pt")
+
+    def test_teach_raise_value_error_if_resume_and_warm_start(
+        self, corpus: Corpus
+    ) -> None:
+        """Test teach raise value error if both resume and warm_start are True"""
+        # Arrange
+        learner = ActiveLearner(corpus, MagicMock(), {}, {})
+
+        # Assert
+        with pytest.raises(ValueError):
+            # Act
+            learner.teach([], resume=True, warm_start=True)
+
+    def test_replay_train_on_new_and_replayed_samples(self, corpus: Corpus) -> None:
+        """Test replay train on new samples and bounded replayed samples"""
+        # Arrange
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, MagicMock(), tagger_params, {})
+        trained_tagger = MagicMock()
+        trained_tagger.tag_dictionary = corpus.make_tag_dictionary(tag_type="ner")
+        learner.trained_tagger = trained_tagger
+        labeled_sents = list(corpus.train.sentences)
+        queried_samples = corpus.dev.sentences[:2]
+
+        # Act
+        with patch("seqal.active_learner.ModelTrainer") as model_trainer:
+            learner.teach(queried_samples, replay=True, replay_ratio=2, buffer_size=3)
+
+        # Assert
+        replay_corpus = model_trainer.call_args[0][1]
+        train_sents = replay_corpus.train.sentences
+        assert model_trainer.call_args[0][0] is trained_tagger
+        assert len(train_sents) == 5
+        assert train_sents[:2] == queried_samples
+        assert all(sent in labeled_sents for sent in train_sents[2:])
+        assert len(corpus.train.sentences) == 12
+        assert learner.replay_strata_size == 10
+
+    def test_update_replay_strata_index_again_if_train_is_replaced(
+        self, corpus: Corpus
+    ) -> None:
+        """Test replay strata are rebuilt if train sentences are replaced by a list of the same size"""
+        # Arrange
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, MagicMock(), tagger_params, {})
+        learner.update_replay_strata()
+        replaced_sents = list(reversed(corpus.train.sentences))
+
+        # Act
+        corpus.train.sentences = replaced_sents
+        learner.update_replay_strata()
+
+        # Assert
+        expected = defaultdict(list)
+        for sent_id, sent in enumerate(replaced_sents):
+            expected[get_main_label(sent, "ner")].append(sent_id)
+        assert learner.replay_strata == expected
+        assert learner.replay_strata_sentences is replaced_sents
@@ -2,8 +2,9 @@ from typing import List
 from unittest.mock import MagicMock
 
 import pytest
+import spacy
 
-from seqal.aligner import Aligner
+from seqal.aligner import Aligner, build_sentences
 
 
 class TestAligner:
@@ -204,3 +205,142 @@ class TestAligner:
         # Assert
         assert result_sentence == expected_sentence
         assert result_tags == expected_tags
+
+    def test_add_tags_on_char_spaced_language_convert_schema(self) -> None:
+        """Test tags of all samples are converted from input schema to output schema"""
+        # Arrage
+        aligner = Aligner()
+        labeled_data = [
+            {
+                "text": ["T", "o", "k", "y", "o", " ", "i", "s"],
+                "labels": ["B-LOC", "I-LOC", "I-LOC", "I-LOC", "L-LOC", "O", "O", "O"],
+            },
+            {
+                "text": ["I", " ", "a", "m"],
+                "labels": ["U-PER", "O", "O", "O"],
+            },
+        ]
+
+        # Act
+        sentences = aligner.add_tags_on_char_spaced_language(
+            labeled_data, input_schema="BILOU", output_schema="BIOES"
+        )
+
+        # Assert
+        assert [[token.get_tag("ner").value for token in s] for s in sentences] == [
+            ["S-LOC", "O"],
+            ["S-PER", "O"],
+        ]
+
+    def test_add_tags_on_char_non_spaced_language_in_batches(self) -> None:
+        """Test batched tokenization returns the same result as each sample"""
+        # Arrage
+        aligner = Aligner()
+        nlp = spacy.blank("en")
+        labeled_data = [
+            {
+                "text": list("Tokyo,city"),
+                "labels": ["B-LOC"] + ["I-LOC"] * 4 + ["O"] * 5,
+            },
+            {"text": list("Hi!"), "labels": ["O", "O", "O"]},
+            {"text": list("NewYork"), "labels": ["B-LOC"] + ["I-LOC"] * 6},
+        ]
+
+        # Act
+        sentences = aligner.add_tags_on_char_non_spaced_language(
+            labeled_data, output_schema="BIOES", spacy_model=nlp, batch_size=2
+        )
+
+        # Assert
+        expected = [
+            aligner.to_subword_non_spaced_language(
+                sample["text"], sample["labels"], nlp, output_schema="BIOES"
+            )
+            for sample in labeled_data
+        ]
+        assert [
+            ([t.text for t in s], [t.get_tag("ner").value for t in s])
+            for s in sentences
+        ] == [(list(tokens), list(tags)) for tokens, tags in expected]
+        assert [t.text for t in sentences[0]] == ["Tokyo", ",", "city"]
+
+    @pytest.mark.parametrize(
+        "text",
+        ["Tokyo,LA a city.", "Los angeles is a city ", "a\tb-c", " ", "", "LA."],
+    )
+    def test_align_spaced_language_same_as_by_char(self, text: str) -> None:
+        """Test regex alignment returns the same result as character by character"""
+        # Arrage
+        aligner = Aligner()
+        sentence = list(text)
+        tags = [f"B-{i}" for i in range(len(sentence))]
+
+        # Act
+        result = aligner.align_spaced_language(sentence, tags)
+
+        # Assert
+        assert result == aligner.align_spaced_language_by_char(sentence, tags)
+
+    def test_align_spaced_language_raise_error_like_by_char(self) -> None:
+        """Test punctuation after space raises the same error as character by character"""
+        # Arrage
+        aligner = Aligner()
+        sentence = list("Tokyo, city")
+        tags = ["O"] * len(sentence)
+
+        # Assert
+        with pytest.raises(IndexError):
+            aligner.align_spaced_language_by_char(sentence, tags)
+        with pytest.raises(IndexError):
+            aligner.align_spaced_language(sentence, tags)
+
+    def test_align_spaced_language_many(self) -> None:
+        """Test align_spaced_language_many aligns each sentence"""
+        # Arrage
+        aligner = Aligner()
+        sentences = [list("LA is."), list("Tokyo")]
+        tags = [["B-LOC", "I-LOC", "O", "O", "O", "O"], ["B-LOC"] * 5]
+
+        # Act
+        result = aligner.align_spaced_language_many(sentences, tags)
+
+        # Assert
+        assert result == [
+            (["LA", "is", "."], ["B-LOC", "O", "O"]),
+            (["Tokyo"], ["B-LOC"]),
+        ]
+
+
+class TestBuildSentences:
+    """Test build_sentences function"""
+
+    def test_build_sentences_same_as_add_tag(self) -> None:
+        """Test sentences are the same as Sentence and add_tag, tokens share labels"""
+        # Arrange
+        token_lists = [["Tokyo", "is", "a", "city"], ["LA", "5\u0080"], ["LA"]]
+        tag_lists = [["B-LOC", "O", "O", "O"], ["B-LOC", "O"], ["B-LOC"]]
+
+        # Act
+        sentences = build_sentences(token_lists, tag_lists)
+
+        # Assert
+        assert [s.to_tagged_string() for s in sentences] == [
+            "Tokyo <B-LOC> is a city",
+            "LA <B-LOC> 5€",
+            "LA <B-LOC>",
+        ]
+        assert [token.idx for token in sentences[0]] == [1, 2, 3, 4]
+        assert sentences[0][0].sentence is sentences[0]
+        assert sentences[0][1].get_tag("ner") is sentences[0][2].get_tag("ner")
+
+    def test_build_sentences_with_process_pool(self) -> None:
+        """Test sentences from processes are in input order"""
+        # Arrange
+        token_lists = [[f"w{i}"] for i in range(5)]
+        tag_lists = [["O"]] * 5
+
+        # Act
+        sentences = build_sentences(token_lists, tag_lists, workers=2, chunk_size=2)
+
+        # Assert
+        assert [s[0].text for s in sentences] == ["w0", "w1", "w2", "w3", "w4"]
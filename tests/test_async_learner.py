@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import List
+from unittest.mock import MagicMock
+
+import pytest
+from flair.data import Sentence
+
+from seqal.async_learner import AsyncActiveLearner
+from seqal.pool import Pool
+
+
+def make_learner(train_seconds: float = 0) -> MagicMock:
+    """Mock learner that queries the first sentences in pool and counts trained models"""
+    learner = MagicMock()
+    learner.trained_tagger = {"generation": 0}
+    learner.queried_history = []
+
+    def query(pool, query_number, token_based, tagger):
+        sent_ids = pool.ids[:query_number].tolist()
+        learner.queried_history.append(sent_ids)
+        return pool.remove(sent_ids), pool
+
+    def teach(samples, dir_path, **kwargs):
+        time.sleep(train_seconds)
+        learner.trained_tagger = {"generation": learner.teach.call_count}
+
+    learner.query.side_effect = query
+    learner.teach.side_effect = teach
+    return learner
+
+
+def make_annotate(annotate_seconds: float):
+    """Mock annotators that return queried samples after annotate_seconds"""
+
+    async def annotate(sentences: List[Sentence]) -> List[Sentence]:
+        await asyncio.sleep(annotate_seconds)
+        return sentences
+
+    return annotate
+
+
+class TestAsyncActiveLearner:
+    """Test AsyncActiveLearner class"""
+
+    def test_run_prefetch_with_previous_model(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test batches record generations of models that scored them"""
+        # Arrange
+        learner = make_learner(train_seconds=0)
+        driver = AsyncActiveLearner(learner, Pool(unlabeled_sentences), 2)
+
+        # Act
+        batches = asyncio.run(driver.run(make_annotate(0.1), iterations=4))
+
+        # Assert
+        assert [batch.batch_id for batch in batches] == [0, 1, 2, 3]
+        assert [batch.generation for batch in batches] == [0, 0, 0, 1]
+        assert [batch.sent_ids for batch in batches] == [[0, 1], [2, 3], [4, 5], [6, 7]]
+        assert driver.generation == 4
+        assert driver.tagger == {"generation": 4}
+        assert learner.teach.call_count == 4
+
+    def test_run_queue_samples_submitted_during_training(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test samples submitted during training are trained together in the next training"""
+        # Arrange
+        learner = make_learner(train_seconds=0.3)
+        driver = AsyncActiveLearner(learner, Pool(unlabeled_sentences), 2)
+
+        # Act
+        batches = asyncio.run(driver.run(make_annotate(0.01), iterations=3))
+
+        # Assert
+        assert [batch.generation for batch in batches] == [0, 0, 0]
+        assert learner.teach.call_count == 2
+        second_samples = learner.teach.call_args_list[1][0][0]
+        assert second_samples == batches[1].sentences + batches[2].sentences
+        assert driver.generation == 2
+
+    @pytest.mark.parametrize("mode", ["resume", "warm_start", "replay"])
+    def test_teach_keep_snapshot_in_place_modes(
+        self, unlabeled_sentences: List[Sentence], mode: str
+    ) -> None:
+        """Test modes that train the tagger in place train a copy, not the snapshot used for scoring"""
+        # Arrange
+        learner = make_learner()
+        driver = AsyncActiveLearner(
+            learner, Pool(unlabeled_sentences), 2, **{mode: True}
+        )
+        snapshot = driver.tagger
+        learner.teach.side_effect = None
+
+        # Act
+        driver.teach(unlabeled_sentences[:2], generation=1)
+
+        # Assert
+        assert learner.trained_tagger == snapshot
+        assert learner.trained_tagger is not snapshot
+        learner.teach.assert_called_once_with(
+            unlabeled_sentences[:2], dir_path="output/retrain_1", **{mode: True}
+        )
+
+    def test_run_resume_score_with_untouched_snapshot(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test training in resume mode does not change the snapshot that scores the prefetched batch"""
+        # Arrange
+        learner = make_learner()
+        scored_generations = []
+
+        def query(pool, query_number, token_based, tagger):
+            time.sleep(0.05)
+            scored_generations.append(tagger["generation"])
+            sent_ids = pool.ids[:query_number].tolist()
+            learner.queried_history.append(sent_ids)
+            return pool.remove(sent_ids), pool
+
+        def teach(samples, dir_path, **kwargs):
+            # Train the tagger in place like ActiveLearner.resume
+            learner.trained_tagger["generation"] = -1
+            time.sleep(0.1)
+            learner.trained_tagger["generation"] = learner.teach.call_count
+
+        learner.query.side_effect = query
+        learner.teach.side_effect = teach
+        driver = AsyncActiveLearner(learner, Pool(unlabeled_sentences), 2, resume=True)
+
+        # Act
+        batches = asyncio.run(driver.run(make_annotate(0.01), iterations=3))
+
+        # Assert
+        assert -1 not in scored_generations
+        assert scored_generations == [batch.generation for batch in batches]
+        assert learner.teach.call_args[1] == {
+            "dir_path": f"output/retrain_{driver.generation}",
+            "resume": True,
+        }
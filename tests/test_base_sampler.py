@@ -9,6 +9,7 @@ from flair.data import Sentence
 from torch.nn.functional import cosine_similarity
 
 from seqal.datasets import Corpus
+from seqal.pool import Pool
 from seqal.samplers import BaseSampler
 
 
@@ -147,6 +148,82 @@ class TestBaseSampler:
                 token_based=True,
             )
 
+    def test_sample_subpool_return_whole_pool_if_subpool_size_is_none(
+        self, base_sampler: BaseSampler, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test sample_subpool return whole data pool if subpool_size is not set"""
+        # Act
+        subpool, subpool_ids = base_sampler.sample_subpool(unlabeled_sentences)
+
+        # Assert
+        assert subpool == unlabeled_sentences
+        assert subpool_ids == list(range(10))
+        assert base_sampler.subpool_history == []
+
+    def test_sample_subpool_return_reproducible_subpool(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test sample_subpool return same subpool with same random_state"""
+        # Arrange
+        sampler1 = BaseSampler(subpool_size=4, random_state=0)
+        sampler2 = BaseSampler(subpool_size=4, random_state=0)
+
+        # Act
+        subpool, subpool_ids = sampler1.sample_subpool(unlabeled_sentences)
+        _, expected_subpool_ids = sampler2.sample_subpool(unlabeled_sentences)
+
+        # Assert
+        assert subpool_ids == expected_subpool_ids
+        assert subpool_ids == sorted(set(subpool_ids))
+        assert subpool == [unlabeled_sentences[i] for i in subpool_ids]
+        assert sampler1.subpool_history == [subpool_ids]
+
+    def test_sample_subpool_stratified_by_length(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test sample_subpool sample one sentence from each length stratum"""
+        # Arrange
+        sampler = BaseSampler(
+            subpool_size=5, random_state=0, stratify_by_length=True, n_strata=5
+        )
+        lengths = np.array([len(sent) for sent in unlabeled_sentences])
+        strata = np.array_split(np.argsort(lengths, kind="stable"), 5)
+
+        # Act
+        _, subpool_ids = sampler.sample_subpool(unlabeled_sentences)
+
+        # Assert
+        assert len(subpool_ids) == 5
+        for stratum in strata:
+            assert len(set(stratum.tolist()) & set(subpool_ids)) == 1
+
+    def test_sample_subpool_return_stable_ids_if_sentences_is_pool(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test sample_subpool return stable sentence ids of Pool"""
+        # Arrange
+        pool = Pool(unlabeled_sentences)
+        pool.remove([0, 2, 4, 6, 8])
+        sampler = BaseSampler(subpool_size=3, random_state=0)
+
+        # Act
+        all_sents, all_ids = BaseSampler().sample_subpool(pool)
+        subpool, subpool_ids = sampler.sample_subpool(pool)
+
+        # Assert
+        assert all_ids == [1, 3, 5, 7, 9]
+        assert all_sents == pool.to_list()
+        assert len(subpool_ids) == 3
+        assert set(subpool_ids) <= set(all_ids)
+        assert subpool == pool.get(subpool_ids)
+
+    def test_init_raise_value_error_if_subpool_size_smaller_than_one(self) -> None:
+        """Test BaseSampler raise value error if subpool_size is not positive"""
+        # Assert
+        with pytest.raises(ValueError):
+            # Act
+            BaseSampler(subpool_size=0)
+
     def test_sort_with_ascend_order(self, base_sampler: BaseSampler) -> None:
         """Test sort data on ascend order"""
         # Arrange
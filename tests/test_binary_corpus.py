@@ -0,0 +1,100 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flair.data import Sentence
+
+from seqal.binary_corpus import (
+    BinaryColumnDataset,
+    BinaryCorpus,
+    convert_column_corpus,
+    convert_column_file,
+)
+from seqal.datasets import Corpus
+from seqal.pool import Pool
+
+
+@pytest.fixture
+def binary_corpus(tmp_path: Path, fixture_path: Path) -> BinaryCorpus:
+    """The test corpus converted to the binary format"""
+    data_folder = tmp_path / "conll"
+    shutil.copytree(fixture_path / "conll", data_folder)
+    return convert_column_corpus(
+        data_folder,
+        {0: "text", 1: "pos", 3: "ner"},
+        tmp_path / "binary",
+        train_file="eng.train",
+        test_file="eng.testb",
+        dev_file="eng.testa",
+    )
+
+
+class TestBinaryColumnDataset:
+    """Test BinaryColumnDataset class"""
+
+    def test_convert_keep_sentences(
+        self, binary_corpus: BinaryCorpus, corpus: Corpus
+    ) -> None:
+        """Test sentences of binary corpus are the same as ColumnCorpus"""
+        for split in ["train", "dev", "test"]:
+            # Arrange
+            dataset = getattr(binary_corpus, split)
+            expected = getattr(corpus, split)
+
+            # Assert
+            assert isinstance(dataset.token_ids, np.memmap)
+            assert len(dataset) == len(expected)
+            assert dataset.lengths.tolist() == [len(s) for s in expected]
+            assert [s.to_tagged_string() for s in dataset] == [
+                s.to_tagged_string() for s in expected
+            ]
+            assert [s.to_tagged_string("pos") for s in next(dataset.batches(3))] == [
+                expected[i].to_tagged_string("pos") for i in range(3)
+            ]
+
+    def test_append_after_mapped_sentences(self, binary_corpus: BinaryCorpus) -> None:
+        """Test added sentences are labeled data after mapped sentences"""
+        # Arrange
+        sentence = Sentence("I love Berlin")
+
+        # Act
+        binary_corpus.add_queried_samples([sentence])
+
+        # Assert
+        assert len(binary_corpus.train) == 11
+        assert binary_corpus.train[10] is sentence
+        assert binary_corpus.train.lengths[-1] == 3
+        assert len(binary_corpus.get_all_sentences()) == 21
+
+    def test_pool_create_sentences_on_demand(self, binary_corpus: BinaryCorpus) -> None:
+        """Test Pool keeps binary dataset and creates sentences by stable ids"""
+        # Arrange
+        dataset = binary_corpus.test
+        pool = Pool(dataset)
+
+        # Act
+        removed_sents = pool.remove([3])
+
+        # Assert
+        assert pool.sentences is dataset
+        assert removed_sents[0].to_plain_string() == dataset[3].to_plain_string()
+        assert [s.to_plain_string() for s in pool] == [
+            dataset[i].to_plain_string() for i in pool.ids
+        ]
+
+    def test_load_raise_error_if_conversion_is_not_finished(
+        self, tmp_path: Path, fixture_path: Path
+    ) -> None:
+        """Test directory without meta file can not be loaded"""
+        # Arrange
+        output_dir = tmp_path / "binary"
+        shutil.copy(fixture_path / "conll/eng.train", tmp_path / "eng.train")
+        convert_column_file(tmp_path / "eng.train", output_dir, {0: "text", 3: "ner"})
+
+        # Act
+        (output_dir / "meta.json").unlink()
+
+        # Assert
+        with pytest.raises(FileNotFoundError):
+            BinaryColumnDataset(output_dir)
@@ -0,0 +1,163 @@
+from pathlib import Path
+from typing import List
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import torch
+from flair.data import Sentence
+from flair.embeddings import OneHotEmbeddings
+
+from seqal.active_learner import ActiveLearner
+from seqal.checkpoint import Checkpoint, dict_to_sentence, sentence_to_dict
+from seqal.datasets import ColumnCorpus
+from seqal.performance_recorder import IterationPerformance, PerformanceRecorder
+from seqal.pool import Pool
+from seqal.samplers import LeastConfidenceSampler
+
+
+def make_learner(fixture_path: Path) -> ActiveLearner:
+    """Create a small learner that can be trained and predict without embedding files"""
+    columns = {0: "text", 1: "pos", 3: "ner"}
+    corpus = ColumnCorpus(
+        fixture_path / "conll",
+        columns,
+        train_file="eng.train",
+        test_file="eng.testb",
+        dev_file="eng.testa",
+    )
+    tagger_params = {}
+    tagger_params["tag_type"] = "ner"
+    tagger_params["hidden_size"] = 8
+    tagger_params["embeddings"] = OneHotEmbeddings.from_corpus(
+        corpus, embedding_length=8
+    )
+    trainer_params = {"max_epochs": 1}
+    sampler = LeastConfidenceSampler(subpool_size=6, random_state=0)
+    return ActiveLearner(corpus, sampler, tagger_params, trainer_params)
+
+
+def test_sentence_to_dict_and_back() -> None:
+    """Test labeled sentence is restored from its dict"""
+    # Arrange
+    sent = Sentence("Peter lives in Berlin")
+    sent[0].add_tag("ner", "S-PER")
+    sent[3].add_tag("ner", "S-LOC")
+
+    # Act
+    restored_sent = dict_to_sentence(sentence_to_dict(sent, "ner"), "ner")
+
+    # Assert
+    assert restored_sent.to_tagged_string() == sent.to_tagged_string()
+
+
+class TestCheckpoint:
+    """Test Checkpoint class"""
+
+    def test_load_raise_error_if_no_checkpoint(
+        self, tmp_path: Path, fixture_path: Path
+    ) -> None:
+        """Test load raise error if there is no checkpoint in path"""
+        # Arrange
+        learner = make_learner(fixture_path)
+
+        # Assert
+        with pytest.raises(FileNotFoundError):
+            # Act
+            Checkpoint(tmp_path).load(learner)
+
+    def test_save_and_load_reproduce_next_query(
+        self,
+        tmp_path: Path,
+        fixture_path: Path,
+        unlabeled_sentences: List[Sentence],
+    ) -> None:
+        """Test learner restored from checkpoint queries the same data"""
+        # Arrange
+        learner = make_learner(fixture_path)
+        pool = Pool(unlabeled_sentences)
+        recorder = PerformanceRecorder()
+        recorder.performance_list.append(
+            IterationPerformance(2, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, {"PER": {}})
+        )
+        with patch("seqal.active_learner.ModelTrainer"):
+            learner.initialize(tmp_path / "init_train")
+            queried_samples, pool = learner.query(pool, 2)
+            for sent in queried_samples:
+                sent[0].add_tag("ner", "S-PER")
+            learner.teach(queried_samples, dir_path=tmp_path / "retrain")
+        # ModelTrainer leaves the trained tagger in eval mode
+        learner.trained_tagger.eval()
+        # Trainings counted in in_memory mode
+        learner.train_count = 3
+        learner.save_checkpoint(tmp_path / "checkpoint", pool, recorder)
+        train_size = len(learner.corpus.train)
+
+        new_learner = make_learner(fixture_path)
+        new_pool = Pool(unlabeled_sentences)
+        new_recorder = PerformanceRecorder()
+
+        # Act
+        new_learner.resume_from(tmp_path / "checkpoint", new_pool, new_recorder)
+
+        # Assert
+        assert new_learner.queried_history == learner.queried_history
+        assert new_learner.train_count == 3
+        assert len(new_learner.corpus.train) == train_size
+        assert np.array_equal(new_pool.ids, pool.ids)
+        assert new_recorder.performance_list == recorder.performance_list
+        for key, value in learner.trained_tagger.state_dict().items():
+            assert torch.equal(new_learner.trained_tagger.state_dict()[key], value)
+
+        learner.query(pool, 2)
+        new_learner.query(new_pool, 2)
+        assert new_learner.queried_history[-1] == learner.queried_history[-1]
+
+    def test_save_append_labeled_data_and_remove_old_files(
+        self,
+        tmp_path: Path,
+        fixture_path: Path,
+        unlabeled_sentences: List[Sentence],
+    ) -> None:
+        """Test each save only appends new labeled data and keeps files of the last round"""
+        # Arrange
+        learner = make_learner(fixture_path)
+        pool = Pool(unlabeled_sentences)
+        checkpoint = Checkpoint(tmp_path / "checkpoint")
+
+        # Act
+        with patch("seqal.active_learner.ModelTrainer"):
+            learner.initialize(tmp_path / "init_train")
+            for _ in range(2):
+                queried_samples, pool = learner.query(pool, 2)
+                learner.teach(queried_samples, dir_path=tmp_path / "retrain")
+                checkpoint.save(learner, pool)
+
+        # Assert
+        state = checkpoint.load_state()
+        labeled_lines = (tmp_path / "checkpoint/labeled.jsonl").read_text().splitlines()
+        assert state["round"] == 2
+        assert len(labeled_lines) == 4
+        assert sorted(p.name for p in checkpoint.path.glob("*-*")) == [
+            "model-2.pt",
+            "pool-2.npy",
+        ]
+
+    def test_save_drop_bytes_of_interrupted_save(
+        self, tmp_path: Path, fixture_path: Path
+    ) -> None:
+        """Test labeled data written after the last committed offset is dropped"""
+        # Arrange
+        learner = make_learner(fixture_path)
+        learner.taught_samples = learner.corpus.train.sentences[:1]
+        checkpoint = Checkpoint(tmp_path)
+        checkpoint.save(learner)
+        with open(tmp_path / "labeled.jsonl", "a", encoding="utf-8") as file:
+            file.write('{"tokens": ["broken"')
+
+        # Act
+        learner.taught_samples = learner.corpus.train.sentences[:2]
+        checkpoint.save(learner)
+
+        # Assert
+        assert len(checkpoint.load_labeled("ner", 2)) == 2
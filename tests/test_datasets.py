@@ -1,4 +1,15 @@
-from seqal.datasets import Corpus
+import json
+import shutil
+from pathlib import Path
+from typing import Tuple
+from unittest.mock import patch
+
+import numpy as np
+from flair.data import Corpus as ParentCorpus
+from flair.data import Sentence
+
+from seqal.datasets import ColumnDataset, Corpus, LazyColumnDataset, count_tags
+from seqal.pool import Pool
 
 
 class TestCorpus:
@@ -19,8 +30,201 @@ class TestCorpus:
         # Assert
         assert len(corpus.train.sentences) == 15
 
+    def test_make_tag_dictionary_same_as_flair(self, corpus: Corpus) -> None:
+        """Test tag dictionary from tag counts is the same as scanning corpus"""
+        # Arrange
+        corpus.make_tag_dictionary("ner")
+        new_samples = [Sentence("Tokyo"), Sentence("Alice")]
+        new_samples[0][0].add_label("ner", "B-CITY")
+        new_samples[1][0].add_label("ner", "B-PER")
+
+        # Act
+        corpus.add_queried_samples(new_samples)
+        tag_dictionary = corpus.make_tag_dictionary("ner")
+
+        # Assert
+        assert (
+            tag_dictionary.get_items()
+            == ParentCorpus.make_tag_dictionary(corpus, "ner").get_items()
+        )
+        assert "B-CITY" in tag_dictionary.get_items()
+
+    def test_get_label_names_count_new_sentences_only(self, corpus: Corpus) -> None:
+        """Test label names are updated by counting added sentences only"""
+        # Arrange
+        expected_label_names = set()
+        statistics = json.loads(corpus.obtain_statistics(label_type="ner"))
+        for value in statistics.values():
+            expected_label_names.update(value["number_of_tokens_per_tag"])
+        assert set(corpus.get_label_names("ner")) == expected_label_names
+        new_sample = Sentence("Tokyo")
+        new_sample[0].add_label("ner", "B-CITY")
+
+        # Act
+        with patch("seqal.datasets.count_tags", wraps=count_tags) as counter:
+            corpus.add_queried_samples([new_sample])
+            label_names = corpus.get_label_names("ner")
+
+        # Assert
+        assert set(label_names) == expected_label_names | {"B-CITY"}
+        assert [list(args[0]) for args, _ in counter.call_args_list] == [[new_sample]]
+        assert corpus.get_tag_counts("ner")["B-CITY"] == 1
+
+    def test_get_tag_counts_recount_replaced_train_data(self, corpus: Corpus) -> None:
+        """Test tag counts are computed again after train sentences are replaced"""
+        # Arrange
+        counts = corpus.get_tag_counts("ner")
+
+        # Act
+        corpus.train.sentences = corpus.train.sentences[:1]
+        new_counts = corpus.get_tag_counts("ner")
+
+        # Assert
+        train_token_count = sum(len(s) for s in corpus.train.sentences)
+        other_token_count = sum(len(s) for s in corpus.dev) + sum(
+            len(s) for s in corpus.test
+        )
+        assert sum(counts.values()) > sum(new_counts.values())
+        assert sum(new_counts.values()) == train_token_count + other_token_count
+
 
 class TestColumnCorpus:
     def test__len__(self, corpus: Corpus) -> None:
         del corpus.train.sentences[0]
         assert len(corpus.train.sentences) == 9
+
+    def test__len__not_in_memory(self, fixture_path: Path) -> None:
+        """Test length of dataset that is not kept in memory"""
+        dataset = ColumnDataset(
+            fixture_path / "conll/eng.train", {0: "text", 3: "ner"}, in_memory=False
+        )
+        assert len(dataset) == 10
+
+
+def make_lazy_dataset(
+    tmp_path: Path, fixture_path: Path, **kwargs
+) -> Tuple[LazyColumnDataset, ColumnDataset]:
+    """Copy a column file to tmp_path and load it lazily and in memory"""
+    file_path = tmp_path / "pool.txt"
+    shutil.copy(fixture_path / "conll/eng.train", file_path)
+    columns = {0: "text", 3: "ner"}
+    return (
+        LazyColumnDataset(file_path, columns, **kwargs),
+        ColumnDataset(file_path, columns),
+    )
+
+
+class TestLazyColumnDataset:
+    """Test LazyColumnDataset class"""
+
+    def test_get_same_sentences_as_in_memory(
+        self, tmp_path: Path, fixture_path: Path
+    ) -> None:
+        """Test sentences read by offsets are the same as parsed in memory"""
+        # Act
+        dataset, expected = make_lazy_dataset(tmp_path, fixture_path)
+
+        # Assert
+        assert len(dataset) == len(expected)
+        assert dataset.lengths.tolist() == [len(s) for s in expected.sentences]
+        assert [s.to_tagged_string() for s in dataset] == [
+            s.to_tagged_string() for s in expected.sentences
+        ]
+        assert [s.to_tagged_string() for s in dataset.get([7, 2, 5])] == [
+            expected[i].to_tagged_string() for i in [7, 2, 5]
+        ]
+        assert dataset[3].to_tagged_string() == expected[3].to_tagged_string()
+        assert [len(batch) for batch in dataset.batches(4)] == [4, 4, 2]
+
+    def test_reuse_saved_index(self, tmp_path: Path, fixture_path: Path) -> None:
+        """Test saved index is reused and rebuilt after the file is modified"""
+        # Arrange
+        dataset, _ = make_lazy_dataset(tmp_path, fixture_path)
+        file_path = dataset.path_to_column_file
+
+        # Act
+        with patch.object(LazyColumnDataset, "build_index") as build_index:
+            reused_dataset = LazyColumnDataset(file_path, {0: "text", 3: "ner"})
+        with open(file_path, "a", encoding="utf-8") as file:
+            file.write("\n# comment\nTokyo I-LOC\n")
+        rebuilt_dataset = LazyColumnDataset(
+            file_path, {0: "text", 1: "ner"}, comment_symbol="#"
+        )
+
+        # Assert
+        assert dataset.index_path.exists()
+        build_index.assert_not_called()
+        assert np.array_equal(reused_dataset.offsets, dataset.offsets)
+        assert len(rebuilt_dataset) == 11
+        assert rebuilt_dataset[10].to_tagged_string() == "Tokyo <I-LOC>"
+
+    def test_pool_read_sentences_on_demand(
+        self, tmp_path: Path, fixture_path: Path
+    ) -> None:
+        """Test Pool keeps lazy dataset and reads sentences by stable ids"""
+        # Arrange
+        dataset, expected = make_lazy_dataset(tmp_path, fixture_path)
+        pool = Pool(dataset, batch_size=3)
+
+        # Act
+        removed_sents = pool.remove([4, 1])
+
+        # Assert
+        assert pool.sentences is dataset
+        assert len(pool) == 8
+        assert removed_sents[0].to_plain_string() == expected[4].to_plain_string()
+        assert [s.to_plain_string() for s in pool] == [
+            expected[i].to_plain_string() for i in pool.ids
+        ]
+
+
+class TestParallelColumnDataset:
+    """Test ColumnDataset parsing in parallel"""
+
+    def test_parse_same_sentences_as_serial(
+        self, tmp_path: Path, fixture_path: Path
+    ) -> None:
+        """Test parallel parsing gets the same sentences as serial parsing"""
+        # Arrange
+        file_path = tmp_path / "pool.txt"
+        content = (fixture_path / "conll/eng.train").read_text(encoding="utf-8")
+        file_path.write_text(
+            "header\n\n\n" + content.replace("\n\n", "\n\n# comment\n", 3),
+            encoding="utf-8",
+        )
+        params = {
+            "column_name_map": {0: "text", 1: "pos", 3: "ner"},
+            "comment_symbol": "#",
+            "skip_first_line": True,
+            "banned_sentences": ["Peter Blackburn"],
+        }
+
+        # Act
+        serial = ColumnDataset(file_path, **params)
+        parallel = ColumnDataset(file_path, workers=2, **params)
+
+        # Assert
+        assert len(parallel) == len(serial) == 9
+        assert [s.to_tagged_string() for s in parallel] == [
+            s.to_tagged_string() for s in serial
+        ]
+        assert parallel[1]._previous_sentence is parallel[0]
+        assert parallel[1]._next_sentence is parallel[2]
+
+    def test_split_ranges_at_blank_lines(self, fixture_path: Path) -> None:
+        """Test byte ranges cover the file and start after blank lines"""
+        # Arrange
+        file_path = fixture_path / "conll/eng.train"
+        dataset = ColumnDataset(file_path, {0: "text", 3: "ner"}, in_memory=False)
+        content = file_path.read_bytes()
+
+        # Act
+        byte_ranges = dataset.split_ranges(4)
+
+        # Assert
+        assert byte_ranges[0][0] == 0
+        assert byte_ranges[-1][1] == len(content)
+        for (_, end), (start, _) in zip(byte_ranges[:-1], byte_ranges[1:]):
+            assert end == start
+            blank_line_start = start - 2
+            assert content[blank_line_start:start] == b"\n\n"
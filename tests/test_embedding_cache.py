@@ -0,0 +1,147 @@
+import pickle
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import torch
+from flair.data import Sentence
+from flair.embeddings import OneHotEmbeddings, TokenEmbeddings
+
+from seqal.datasets import Corpus
+from seqal.embedding_cache import CachedEmbeddings, EmbeddingCache, sentence_key
+
+
+def test_sentence_key() -> None:
+    """Test sentence key depends on tokens only"""
+    assert sentence_key(Sentence("I love Berlin")) == sentence_key(
+        Sentence("I love Berlin")
+    )
+    assert sentence_key(Sentence("I love Berlin")) != sentence_key(
+        Sentence("I love Tokyo")
+    )
+
+
+class TestEmbeddingCache:
+    """Test EmbeddingCache class"""
+
+    def test_add_and_get_grow_matrix(self) -> None:
+        """Test cached embeddings are returned after the matrix grows"""
+        # Arrange
+        cache = EmbeddingCache(embedding_length=2, capacity=2)
+        sentences = [Sentence("I love Berlin"), Sentence("Tokyo is a city")]
+        embeddings = [torch.rand(3, 2), torch.rand(4, 2)]
+
+        # Act
+        for sentence, embedding in zip(sentences, embeddings):
+            cache.add(sentence, embedding)
+
+        # Assert
+        assert len(cache) == 2
+        assert cache.size == 7
+        assert torch.equal(cache.get(sentences[0]), embeddings[0])
+        assert torch.equal(cache.get(sentences[1]), embeddings[1])
+        assert cache.get(Sentence("unknown sentence")) is None
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_save_and_load_memory_mapped_cache(self, tmp_path: Path) -> None:
+        """Test memory-mapped cache is loaded with the saved index"""
+        # Arrange
+        path = tmp_path / "embeddings.bin"
+        sentence = Sentence("I love Berlin")
+        embedding = torch.rand(3, 2)
+        cache = EmbeddingCache(embedding_length=2, path=path, capacity=1)
+        cache.add(sentence, embedding)
+
+        # Act
+        cache.save()
+        loaded_cache = EmbeddingCache(embedding_length=2, path=path)
+
+        # Assert
+        assert torch.equal(loaded_cache.get(sentence), embedding)
+        with pytest.raises(ValueError):
+            EmbeddingCache(embedding_length=3, path=path)
+
+    def test_add_from_threads_keep_all_rows(self) -> None:
+        """Test concurrent adds do not overwrite rows of each other while the matrix grows"""
+        # Arrange
+        cache = EmbeddingCache(embedding_length=64, capacity=1)
+        thread_number, sentence_number = 4, 200
+        sentences = [
+            [Sentence(f"thread {t} sentence {i}") for i in range(sentence_number)]
+            for t in range(thread_number)
+        ]
+        embeddings = [
+            [
+                torch.full((4, 64), float(t * sentence_number + i))
+                for i in range(sentence_number)
+            ]
+            for t in range(thread_number)
+        ]
+
+        def add_all(t: int) -> None:
+            for sentence, embedding in zip(sentences[t], embeddings[t]):
+                cache.add(sentence, embedding)
+
+        # Act
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [
+                threading.Thread(target=add_all, args=(t,))
+                for t in range(thread_number)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        # Assert
+        assert len(cache) == thread_number * sentence_number
+        assert cache.size == 4 * thread_number * sentence_number
+        for t in range(thread_number):
+            for sentence, embedding in zip(sentences[t], embeddings[t]):
+                assert torch.equal(cache.get(sentence), embedding)
+
+
+class TestCachedEmbeddings:
+    """Test CachedEmbeddings class"""
+
+    def test_embed_each_sentence_once(self, length_embeddings: TokenEmbeddings) -> None:
+        """Test sentences are embedded by wrapped embeddings only once"""
+        # Arrange
+        embeddings = CachedEmbeddings(length_embeddings)
+        sentences = [Sentence("I love Berlin"), Sentence("Tokyo is a city")]
+
+        # Act
+        for _ in range(3):
+            for sentence in sentences:
+                sentence.clear_embeddings()
+            embeddings.embed(sentences)
+
+        # Assert
+        assert length_embeddings.embedded_count == 2
+        assert torch.equal(sentences[0][2].get_embedding(), torch.tensor([6.0, 1.0]))
+        assert list(sentences[0][2]._embeddings.keys()) == ["cached-length"]
+
+    def test_init_raise_error_if_embeddings_are_not_static(
+        self, corpus: Corpus
+    ) -> None:
+        """Test fine-tuned embeddings can not be cached"""
+        with pytest.raises(ValueError):
+            CachedEmbeddings(OneHotEmbeddings.from_corpus(corpus))
+
+    def test_pickle_without_cache(self, length_embeddings: TokenEmbeddings) -> None:
+        """Test cache is not pickled with the embeddings"""
+        # Arrange
+        embeddings = CachedEmbeddings(length_embeddings)
+        embeddings.embed([Sentence("I love Berlin")])
+
+        # Act
+        loaded_embeddings = pickle.loads(pickle.dumps(embeddings))
+
+        # Assert
+        assert len(embeddings.cache) == 1
+        assert len(loaded_embeddings.cache) == 0
@@ -0,0 +1,124 @@
+from typing import List
+from unittest.mock import MagicMock
+
+from flair.data import Sentence
+
+from seqal.active_learner import ActiveLearner
+from seqal.data import Entities
+from seqal.datasets import Corpus
+from seqal.instrumentation import (
+    Instrumentation,
+    PhaseEvent,
+    PhaseRecorder,
+    count_items,
+    timed,
+)
+from seqal.pool import Pool
+from seqal.samplers import RandomSampler
+
+
+def test_count_items(unlabeled_sentences: List[Sentence]) -> None:
+    """Test sentences and tokens are counted for lists and pools"""
+    # Arrange
+    expected = {
+        "sentences": len(unlabeled_sentences),
+        "tokens": sum(len(s) for s in unlabeled_sentences),
+    }
+
+    # Assert
+    assert count_items(unlabeled_sentences) == expected
+    assert count_items(Pool(unlabeled_sentences)) == expected
+    assert count_items(Entities()) == {"entities": 0}
+    assert count_items("output/init_train") == {}
+
+
+class TestInstrumentation:
+    """Test Instrumentation class"""
+
+    def test_phase_without_sinks_emit_nothing(self) -> None:
+        """Test phase only yields counts when it is disabled"""
+        # Arrange
+        target = Instrumentation()
+        sink = MagicMock()
+
+        # Act
+        with target.phase("predict", sentences=3) as counts:
+            counts["tokens"] = 9
+        target.add_sink(sink)
+        with target.phase("predict", sentences=3) as counts:
+            counts["tokens"] = 9
+        target.remove_sink(sink)
+
+        # Assert
+        assert not target.enabled
+        sink.assert_called_once()
+        event = sink.call_args[0][0]
+        assert (event.phase, event.counts) == ("predict", {"sentences": 3, "tokens": 9})
+
+    def test_event_throughput(self) -> None:
+        """Test throughput is items per second"""
+        # Arrange
+        event = PhaseEvent("predict", "Sampler", 2.0, {"sentences": 10})
+
+        # Assert
+        assert event.throughput == {"sentences": 5.0}
+
+
+class TestPhaseRecorder:
+    """Test PhaseRecorder class"""
+
+    def test_record_sampler_phases(self, unlabeled_sentences: List[Sentence]) -> None:
+        """Test phases of sampler are recorded with counts"""
+        # Arrange
+        sampler = RandomSampler()
+        pool = Pool(unlabeled_sentences)
+
+        # Act
+        with PhaseRecorder() as recorder:
+            sampler(pool, "ner", 2)
+        sampler(pool, "ner", 2)
+
+        # Assert
+        summary = recorder.summary()
+        assert list(summary) == ["RandomSampler.sample_subpool", "RandomSampler.query"]
+        assert summary["RandomSampler.sample_subpool"]["calls"] == 1
+        assert summary["RandomSampler.sample_subpool"]["counts"] == count_items(pool)
+
+    def test_record_learner_query(
+        self, corpus: Corpus, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test ActiveLearner.query emits a phase with data pool counts"""
+        # Arrange
+        query_strategy = MagicMock(return_value=[3, 1])
+        tagger_params = {"tag_type": "ner", "embeddings": MagicMock()}
+        learner = ActiveLearner(corpus, query_strategy, tagger_params, {})
+
+        # Act
+        with PhaseRecorder() as recorder:
+            learner.query(unlabeled_sentences, 2)
+
+        # Assert
+        assert [(e.source, e.phase) for e in recorder.events] == [
+            ("ActiveLearner", "query")
+        ]
+        assert recorder.events[0].counts["sentences"] == len(unlabeled_sentences)
+
+    def test_timed_count_entities_result(self) -> None:
+        """Test entities of an Entities result are counted"""
+
+        # Arrange
+        class Extractor:
+            @timed("get_entities")
+            def get_entities(self, sentences: List[Sentence]) -> Entities:
+                return Entities()
+
+        # Act
+        with PhaseRecorder() as recorder:
+            Extractor().get_entities([Sentence("I love Berlin")])
+
+        # Assert
+        assert recorder.events[0].counts == {
+            "sentences": 1,
+            "tokens": 3,
+            "entities": 0,
+        }
@@ -0,0 +1,68 @@
+from typing import List
+
+import numpy as np
+import pytest
+from flair.data import Sentence
+
+from seqal.pool import Pool
+
+
+class TestPool:
+    """Test Pool class"""
+
+    def test_init(self, unlabeled_sentences: List[Sentence]) -> None:
+        """Test Pool precompute lengths and membership bitmap"""
+        # Act
+        pool = Pool(unlabeled_sentences)
+
+        # Assert
+        assert len(pool) == 10
+        assert pool.active.all()
+        assert pool.lengths.tolist() == [len(sent) for sent in unlabeled_sentences]
+
+    def test_remove_keep_stable_sentence_ids(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test sentence ids do not change after removing sentences"""
+        # Arrange
+        pool = Pool(unlabeled_sentences)
+
+        # Act
+        removed_sents = pool.remove([4, 1])
+
+        # Assert
+        assert removed_sents == [unlabeled_sentences[4], unlabeled_sentences[1]]
+        assert len(pool) == 8
+        assert 1 not in pool
+        assert 2 in pool
+        assert pool[5] is unlabeled_sentences[5]
+        assert np.array_equal(pool.ids, [0, 2, 3, 5, 6, 7, 8, 9])
+        assert pool.to_list() == [unlabeled_sentences[i] for i in pool.ids]
+        assert list(pool) == pool.to_list()
+
+    def test_remove_raise_key_error_if_sentence_has_been_removed(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test remove raise key error and keep pool unchanged if sentence is not in pool"""
+        # Arrange
+        pool = Pool(unlabeled_sentences)
+        pool.remove([1])
+
+        # Assert
+        with pytest.raises(KeyError):
+            # Act
+            pool.remove([2, 1])
+        assert 2 in pool
+        assert len(pool) == 9
+
+    def test_remove_raise_key_error_if_ids_are_duplicated(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test remove raise key error if sentence ids are duplicated"""
+        # Arrange
+        pool = Pool(unlabeled_sentences)
+
+        # Assert
+        with pytest.raises(KeyError):
+            # Act
+            pool.remove([3, 3])
@@ -309,6 +309,35 @@ class TestLeastConfidenceSampler:
         # Assert
         assert queried_sent_ids == [0, 1, 2, 3]
 
+    def test_call_return_ids_in_data_pool_if_subpool_size_is_set(
+        self,
+        unlabeled_sentences: List[Sentence],
+        sampler_params: dict,
+    ):
+        """Test call function map queried ids in subpool back to ids in data pool"""
+        # Arrange
+        lc_sampler = LeastConfidenceSampler(subpool_size=5, random_state=0)
+        lc_sampler.predict = MagicMock(return_value=None)
+        lc_sampler.score = MagicMock(return_value=np.array([0.1, 0.9, 0.5, 0.7, 0.3]))
+        _, subpool_ids = BaseSampler(subpool_size=5, random_state=0).sample_subpool(
+            unlabeled_sentences
+        )
+
+        # Act
+        queried_sent_ids = lc_sampler(
+            unlabeled_sentences,
+            sampler_params["tag_type"],
+            2,
+            sampler_params["token_based"],
+            tagger=sampler_params["tagger"],
+            embeddings=sampler_params["embeddings"],
+            label_names=sampler_params["label_names"],
+        )
+
+        # Assert
+        assert len(lc_sampler.score.call_args[0][0]) == 5
+        assert queried_sent_ids == [subpool_ids[1], subpool_ids[3]]
+
 
 class TestMaxNormLogProbSampler:
     """Test MaxNormLogProbSampler class"""
@@ -0,0 +1,171 @@
+import asyncio
+import json
+from typing import List, Optional, Tuple
+from unittest.mock import MagicMock
+
+import pytest
+from flair.data import Sentence
+
+from seqal.pool import Pool
+from seqal.service import QueryService
+
+
+def make_learner() -> MagicMock:
+    """Mock learner that queries the first sentences in pool and counts trained models"""
+    learner = MagicMock()
+    learner.trained_tagger = {"generation": 0}
+    learner.queried_history = []
+    learner.corpus.train = []
+
+    def query(pool, query_number, token_based, tagger):
+        sent_ids = pool.ids[:query_number].tolist()
+        learner.queried_history.append(sent_ids)
+        return pool.remove(sent_ids), pool
+
+    def teach(samples, dir_path, **kwargs):
+        learner.corpus.train.extend(samples)
+        learner.trained_tagger = {"generation": learner.teach.call_count}
+
+    learner.query.side_effect = query
+    learner.teach.side_effect = teach
+    return learner
+
+
+async def request(
+    port: int, method: str, path: str, body: Optional[dict] = None
+) -> Tuple[int, dict]:
+    """Send a HTTP request to local service and return status code and JSON body"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    content = b"" if body is None else json.dumps(body).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {len(content)}\r\n\r\n".encode("latin-1") + content
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    header, _, content = response.partition(b"\r\n\r\n")
+    return int(header.split()[1]), json.loads(content)
+
+
+class TestQueryService:
+    """Test QueryService class"""
+
+    def test_query_coalesce_concurrent_requests(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test concurrent query requests are scored in one pass"""
+        # Arrange
+        learner = make_learner()
+        service = QueryService(learner, Pool(unlabeled_sentences))
+
+        async def run():
+            await service.start()
+            responses = await asyncio.gather(
+                request(service.port, "POST", "/query", {"query_number": 2}),
+                request(service.port, "POST", "/query", {"query_number": 1}),
+                request(service.port, "POST", "/query", {"query_number": 3}),
+            )
+            await service.stop()
+            return responses
+
+        # Act
+        responses = asyncio.run(run())
+
+        # Assert
+        assert [status for status, _ in responses] == [200, 200, 200]
+        assert learner.query.call_count == 1
+        sent_ids = [body["sent_ids"] for _, body in responses]
+        assert sorted(sum(sent_ids, [])) == [0, 1, 2, 3, 4, 5]
+        assert [len(ids) for ids in sent_ids] == [2, 1, 3]
+        assert (
+            responses[0][1]["texts"][0]
+            == unlabeled_sentences[sent_ids[0][0]].to_plain_string()
+        )
+
+    def test_submit_swap_model_after_training(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test queries after training are scored by the new model"""
+        # Arrange
+        learner = make_learner()
+        service = QueryService(learner, Pool(unlabeled_sentences), batch_window=0)
+        annotations = [{"text": "I love Berlin .", "labels": []}]
+
+        async def run():
+            await service.start()
+            _, first_batch = await request(
+                service.port, "POST", "/query", {"query_number": 1}
+            )
+            _, submitted = await request(
+                service.port, "POST", "/submit", {"annotations": annotations}
+            )
+            await service.driver.wait_training()
+            _, status = await request(service.port, "GET", "/status")
+            _, second_batch = await request(
+                service.port, "POST", "/query", {"query_number": 1}
+            )
+            await service.stop()
+            return first_batch, submitted, status, second_batch
+
+        # Act
+        first_batch, submitted, status, second_batch = asyncio.run(run())
+
+        # Assert
+        assert first_batch["generation"] == 0
+        assert submitted == {"accepted": 1, "generation": 0}
+        assert status["generation"] == 1
+        assert status["labeled_size"] == 1
+        assert status["pool_size"] == 9
+        assert status["training"] is False
+        assert second_batch["generation"] == 1
+
+    def test_handle_return_error_status(
+        self, unlabeled_sentences: List[Sentence]
+    ) -> None:
+        """Test unknown endpoint and invalid body return error status"""
+        # Arrange
+        service = QueryService(make_learner(), Pool(unlabeled_sentences))
+
+        async def run():
+            await service.start()
+            responses = [
+                await request(service.port, "GET", "/unknown"),
+                await request(service.port, "POST", "/query", {"query_number": 0}),
+                await request(service.port, "POST", "/query", {"query_number": True}),
+                await request(service.port, "POST", "/query", [1]),
+                await request(service.port, "POST", "/submit", {}),
+                await request(service.port, "POST", "/submit", {"annotations": [{}]}),
+            ]
+            await service.stop()
+            return responses
+
+        # Act
+        responses = asyncio.run(run())
+
+        # Assert
+        assert [status for status, _ in responses] == [404, 400, 400, 400, 400, 400]
+
+    def test_handle_return_server_error_if_query_fails(
+        self, unlabeled_sentences: List[Sentence], caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Test errors inside the learner are logged server errors, not client errors"""
+        # Arrange
+        learner = make_learner()
+        learner.query.side_effect = KeyError("bug in sampler")
+        service = QueryService(learner, Pool(unlabeled_sentences))
+
+        async def run():
+            await service.start()
+            response = await request(
+                service.port, "POST", "/query", {"query_number": 1}
+            )
+            await service.stop()
+            return response
+
+        # Act
+        status, _ = asyncio.run(run())
+
+        # Assert
+        assert status == 500
+        assert "Query service failed to handle request" in caplog.text
@@ -0,0 +1,99 @@
+from typing import List
+
+import numpy as np
+import pytest
+from flair.data import Sentence
+
+from seqal.tag_scheme import TagSchemeConverter, convert_sentences, convert_tags
+
+
+@pytest.mark.parametrize(
+    "source,target,tags,expected",
+    [
+        ("BIO", "BIOES", ["B-X", "I-X", "B-X", "O"], ["B-X", "E-X", "S-X", "O"]),
+        ("BIO", "BILOU", ["B-X", "I-X", "B-X", "O"], ["B-X", "L-X", "U-X", "O"]),
+        ("BIOES", "BILOU", ["B-X", "E-X", "S-X", "O"], ["B-X", "L-X", "U-X", "O"]),
+        ("BILOU", "BIO", ["B-X", "L-X", "U-X", "O"], ["B-X", "I-X", "B-X", "O"]),
+        ("BIO", "BIO", ["B-X", "I-X", "O"], ["B-X", "I-X", "O"]),
+    ],
+)
+def test_convert_tags(
+    source: str, target: str, tags: List[str], expected: List[str]
+) -> None:
+    """Test convert_tags between schemes"""
+    assert convert_tags(tags, source, target) == expected
+
+
+def test_convert_tags_same_as_converter() -> None:
+    """Test convert_tags of one sentence is the same as TagSchemeConverter"""
+    # Arrange
+    tags = ["B-X", "I-X", "I-Y", "O", "I-X", "B-Y", "S-X", "L-X"]
+
+    # Act & Assert
+    for source in ("BIO", "BIOES", "BILOU"):
+        for target in ("BIO", "BIOES", "BILOU"):
+            expected = TagSchemeConverter(source, target).convert([tags])[0]
+            assert convert_tags(tags, source, target) == expected
+    with pytest.raises(ValueError):
+        convert_tags(tags, "BIO", "IOB2")
+
+
+class TestTagSchemeConverter:
+    """Test TagSchemeConverter class"""
+
+    def test_convert_keep_sentence_boundaries(self) -> None:
+        """Test the last tag of a sentence is not followed by the next sentence"""
+        # Arrange
+        converter = TagSchemeConverter("BIO", "BIOES")
+        tag_lists = [["B-X", "I-X"], [], ["I-X", "I-X"], ["B-Y"]]
+
+        # Act
+        result = converter.convert(tag_lists)
+
+        # Assert
+        assert result == [["B-X", "E-X"], [], ["I-X", "E-X"], ["S-Y"]]
+
+    def test_convert_codes_with_existing_tags(self) -> None:
+        """Test codes of existing tags are converted without strings"""
+        # Arrange
+        converter = TagSchemeConverter("BIO", "BIOES", tags=["O", "B-X", "I-X"])
+        codes = np.array([1, 2, 0, 1, 1, 1, -1], dtype=np.int32)
+        offsets = np.array([0, 3, 5, 7])
+
+        # Act
+        result = converter.convert_codes(codes, offsets)
+
+        # Assert
+        assert result[-1] == -1
+        assert [converter.tags[code] for code in result[:-1]] == [
+            "B-X",
+            "E-X",
+            "O",
+            "S-X",
+            "S-X",
+            "S-X",
+        ]
+
+    def test_init_raise_error_if_scheme_is_not_supported(self) -> None:
+        """Test unknown scheme raises error"""
+        with pytest.raises(ValueError):
+            TagSchemeConverter("BIO", "IOB2")
+
+
+def test_convert_sentences() -> None:
+    """Test tags of sentences are converted in place"""
+    # Arrange
+    sentence = Sentence("I love New York")
+    for token, tag in zip(sentence, ["O", "O", "B-LOC", "I-LOC"]):
+        token.add_tag("ner", tag)
+
+    # Act
+    convert_sentences([sentence], "BIO", "BIOES")
+
+    # Assert
+    assert [token.get_tag("ner").value for token in sentence] == [
+        "O",
+        "O",
+        "B-LOC",
+        "E-LOC",
+    ]
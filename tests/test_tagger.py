@@ -1,10 +1,14 @@
+import copy
 from typing import List
 
 import numpy as np
 import pytest
+import torch
 from flair.data import Sentence
+from flair.embeddings import OneHotEmbeddings, TokenEmbeddings
 
 from seqal.datasets import Corpus
+from seqal.embedding_cache import EmbeddingCache
 from seqal.tagger import SequenceTagger
 
 
@@ -51,3 +55,75 @@ class TestSequenceTagger:
             )
             is False
         )
+
+    def test_forward_use_feature_cache(
+        self,
+        corpus: Corpus,
+        unlabeled_sentences: List[Sentence],
+        length_embeddings: TokenEmbeddings,
+    ) -> None:
+        """Test tagger embeds each sentence once with feature cache and gets the same result"""
+        # Arrange
+        tagger = SequenceTagger(
+            hidden_size=8,
+            embeddings=length_embeddings,
+            tag_dictionary=corpus.make_tag_dictionary("ner"),
+            tag_type="ner",
+        )
+        tagger.eval()
+        tagger.predict(unlabeled_sentences)
+        expected_scores = tagger.log_probability(unlabeled_sentences)
+        length_embeddings.embedded_count = 0
+
+        # Act
+        tagger.set_feature_cache(EmbeddingCache(length_embeddings.embedding_length))
+        for _ in range(2):
+            for sentence in unlabeled_sentences:
+                sentence.clear_embeddings()
+            tagger.predict(unlabeled_sentences)
+            scores = tagger.log_probability(unlabeled_sentences)
+
+        # Assert
+        assert length_embeddings.embedded_count == len(unlabeled_sentences)
+        assert np.allclose(scores, expected_scores)
+
+    def test_set_feature_cache_raise_error_if_embeddings_are_fine_tuned(
+        self, corpus: Corpus
+    ) -> None:
+        """Test feature cache can not be used with fine-tuned embeddings"""
+        # Arrange
+        embeddings = OneHotEmbeddings.from_corpus(corpus, embedding_length=8)
+        tagger = SequenceTagger(
+            hidden_size=8,
+            embeddings=embeddings,
+            tag_dictionary=corpus.make_tag_dictionary("ner"),
+            tag_type="ner",
+        )
+
+        # Assert
+        with pytest.raises(ValueError):
+            # Act
+            tagger.set_feature_cache(EmbeddingCache(8))
+
+    def test_deepcopy_share_feature_cache(
+        self, corpus: Corpus, length_embeddings: TokenEmbeddings
+    ) -> None:
+        """Test a copied tagger shares the feature cache and copies the weights"""
+        # Arrange
+        tagger = SequenceTagger(
+            hidden_size=8,
+            embeddings=length_embeddings,
+            tag_dictionary=corpus.make_tag_dictionary("ner"),
+            tag_type="ner",
+        )
+        cache = EmbeddingCache(length_embeddings.embedding_length)
+        tagger.set_feature_cache(cache)
+
+        # Act
+        copied_tagger = copy.deepcopy(tagger)
+
+        # Assert
+        assert copied_tagger.feature_cache is cache
+        assert copied_tagger.embeddings is not tagger.embeddings
+        assert copied_tagger.linear.weight is not tagger.linear.weight
+        assert torch.equal(copied_tagger.linear.weight, tagger.linear.weight)
@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+import torch
+from flair.embeddings import OneHotEmbeddings
+
+from seqal.datasets import Corpus
+from seqal.tagger import SequenceTagger
+from seqal.trainer import InMemoryModelTrainer
+
+
+def make_tagger(corpus: Corpus) -> SequenceTagger:
+    """A small tagger that does not need embedding files"""
+    return SequenceTagger(
+        hidden_size=8,
+        embeddings=OneHotEmbeddings.from_corpus(corpus, embedding_length=8),
+        tag_dictionary=corpus.make_tag_dictionary("ner"),
+        tag_type="ner",
+    )
+
+
+class TestInMemoryModelTrainer:
+    """Test InMemoryModelTrainer class"""
+
+    def test_train_write_no_model_file(self, tmp_path: Path, corpus: Corpus) -> None:
+        """Test training writes no model file and restores model methods"""
+        # Arrange
+        tagger = make_tagger(corpus)
+        trainer = InMemoryModelTrainer(tagger, corpus)
+
+        # Act
+        result = trainer.train(tmp_path, max_epochs=2, mini_batch_size=4)
+
+        # Assert
+        assert len(result["train_loss_history"]) == 2
+        # flair always creates an empty weights.txt
+        assert [p.name for p in tmp_path.iterdir()] == ["weights.txt"]
+        assert "save" not in tagger.__dict__
+        assert "evaluate" not in tagger.__dict__
+
+    def test_save_in_memory_keep_best_model(
+        self, tmp_path: Path, corpus: Corpus
+    ) -> None:
+        """Test best model is kept in memory and other model files are skipped"""
+        # Arrange
+        tagger = make_tagger(corpus)
+        trainer = InMemoryModelTrainer(tagger, corpus)
+        trainer.best_state_dict = None
+
+        # Act
+        trainer.save_in_memory(tmp_path / "final-model.pt")
+        trainer.save_in_memory(tmp_path / "best-model.pt")
+
+        # Assert
+        assert list(tmp_path.iterdir()) == []
+        for key, value in tagger.state_dict().items():
+            assert torch.equal(trainer.best_state_dict[key], value)
+            assert trainer.best_state_dict[key] is not value
+
+    def test_final_test_ignore_stale_best_model_file(
+        self, tmp_path: Path, corpus: Corpus
+    ) -> None:
+        """Test best-model.pt of an earlier training does not replace the best model in memory"""
+        # Arrange
+        make_tagger(corpus).save(tmp_path / "best-model.pt")
+        tagger = make_tagger(corpus)
+        trainer = InMemoryModelTrainer(tagger, corpus)
+        trainer.best_state_dict = None
+        trainer.save_in_memory(tmp_path / "best-model.pt")
+
+        # Act
+        trainer.final_test(
+            tmp_path,
+            eval_mini_batch_size=4,
+            main_evaluation_metric=("micro avg", "f1-score"),
+        )
+
+        # Assert
+        for key, value in tagger.state_dict().items():
+            assert torch.equal(trainer.best_state_dict[key], value)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["best-model.pt"]
+
+    def test_train_raise_error_if_anneal_with_restarts(
+        self, tmp_path: Path, corpus: Corpus
+    ) -> None:
+        """Test annealing with restarts is rejected because it reads best-model.pt"""
+        # Arrange
+        trainer = InMemoryModelTrainer(make_tagger(corpus), corpus)
+
+        # Assert
+        with pytest.raises(ValueError):
+            # Act
+            trainer.train(tmp_path, anneal_with_restarts=True)
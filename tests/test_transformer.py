@@ -1,8 +1,12 @@
+from pathlib import Path
 from unittest.mock import MagicMock
 
+import spacy
 from flair.data import Sentence
 
-from seqal.transformer import Transformer
+from seqal.aligner import Aligner
+from seqal.transformer import TokenizationCache, Transformer, pipe_texts
+from seqal.utils import read_annotations
 
 
 class TestTransformer:
@@ -27,3 +31,116 @@ class TestTransformer:
 
         # Assert
         assert expected == token_tag
+
+    def test_to_subword_many_same_as_to_subword(self) -> None:
+        """Test batched tokenization returns the same tokens as each sentence without pipeline components"""
+        # Arrange
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        sentences = ["Tokyo is a city.", "", "I love New York!"]
+
+        # Act
+        result = Transformer(nlp).to_subword_many(sentences, batch_size=2)
+
+        # Assert
+        assert [s.to_tokenized_string() for s in result] == [
+            Transformer(nlp).to_subword(s).to_tokenized_string() for s in sentences
+        ]
+        assert not next(pipe_texts(nlp, ["A b. C d."])).has_annotation("SENT_START")
+
+    def test_to_char_tags(self) -> None:
+        """Test characters and tags are the same as to_char without creating tokens"""
+        # Arrange
+        transformer = Transformer(MagicMock())
+        sentence = Sentence(["ロンドン", "は", "大都市", "です"])
+        for token, tag in zip(sentence, ["B-LOC", "O", "S-LOC", "O"]):
+            token.set_label("ner", tag)
+
+        # Act
+        chars, tags = transformer.to_char_tags(sentence)
+
+        # Assert
+        assert chars == list("ロンドンは大都市です")
+        assert tags == [
+            token.get_tag("ner").value for token in transformer.to_char(sentence)
+        ]
+        assert tags[5:8] == ["S-LOC", "I-LOC", "E-LOC"]
+
+    def test_write_char_jsonl(self, tmp_path: Path) -> None:
+        """Test sentences are written as character-based annotated data"""
+        # Arrange
+        transformer = Transformer(MagicMock())
+        sentences = [Sentence(["東京", "は"]), Sentence(["都市"])]
+        sentences[0][0].set_label("ner", "B-LOC")
+        file_path = tmp_path / "chars.jsonl.gz"
+
+        # Act
+        count = transformer.write_char_jsonl(sentences, file_path)
+
+        # Assert
+        assert count == 2
+        assert list(read_annotations(file_path)) == [
+            {"text": ["東", "京", "は"], "labels": ["B-LOC", "E-LOC", "O"]},
+            {"text": ["都", "市"], "labels": ["O", "O"]},
+        ]
+        assert transformer.to_char_tags_many(sentences)[1] == (["都", "市"], ["O", "O"])
+
+
+class TestTokenizationCache:
+    """Test TokenizationCache class"""
+
+    def test_tokenize_many_share_results(self) -> None:
+        """Test repeated texts are tokenized once and shared by Transformer and Aligner"""
+        # Arrange
+        nlp = spacy.blank("en")
+        cache = TokenizationCache()
+        transformer = Transformer(nlp, cache=cache)
+        aligner = Aligner(cache=cache)
+
+        # Act
+        sentences = transformer.to_subword_many(["Tokyo,city", "Hi!", "Tokyo,city"])
+        result_sentence, result_tags = aligner.align_non_spaced_language(
+            list("Tokyo,city"), ["B-LOC"] * 5 + ["O"] * 5, nlp
+        )
+
+        # Assert
+        assert [t.text for t in sentences[2]] == ["Tokyo", ",", "city"]
+        assert result_sentence == ["Tokyo", ",", "city"]
+        assert result_tags == ["B-LOC", "O", "O"]
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (2, 2)
+        assert cache.hit_rate == 0.5
+
+    def test_remove_least_recently_used(self) -> None:
+        """Test the least recently used text is removed beyond maxsize"""
+        # Arrange
+        nlp = spacy.blank("en")
+        cache = TokenizationCache(maxsize=2)
+
+        # Act
+        cache.tokenize(nlp, "a b")
+        cache.tokenize(nlp, "c d")
+        cache.tokenize(nlp, "a b")
+        cache.tokenize(nlp, "e f")
+
+        # Assert
+        assert [text for _, text in cache.entries] == ["a b", "e f"]
+
+    def test_save_and_load(self, tmp_path: Path) -> None:
+        """Test saved cache is loaded in the next run"""
+        # Arrange
+        nlp = spacy.blank("en")
+        path = tmp_path / "tokens.json"
+        cache = TokenizationCache(path=path)
+        cache.tokenize(nlp, "東京 is a city")
+
+        # Act
+        cache.save()
+        loaded_cache = TokenizationCache(path=path)
+
+        # Assert
+        assert loaded_cache.tokenize(nlp, "東京 is a city") == (
+            ("東京", "is", "a", "city"),
+            (0, 3, 6, 8),
+        )
+        assert loaded_cache.hits == 1
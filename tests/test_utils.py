@@ -1,6 +1,9 @@
+import gzip
+import json
+import lzma
 from pathlib import Path
 from typing import List
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 from flair.data import Sentence
@@ -36,6 +39,57 @@ def test_add_tags() -> None:
     assert len(annotated_sents[1].get_spans("ner")) == 0
 
 
+def test_add_tags_use_first_label_matching_position_and_text() -> None:
+    """Test tokens get the first label with the same start position and text"""
+    # Arrange
+    query_labels = [
+        {
+            "text": "I love Berlin .",
+            "labels": [
+                {"start_pos": 2, "text": "lov", "label": "B-MISC"},
+                {"start_pos": 7, "text": "Berlin", "label": "S-LOC"},
+                {"start_pos": 7, "text": "Berlin", "label": "S-ORG"},
+            ],
+        }
+    ]
+
+    # Act
+    annotated_sents = utils.add_tags(query_labels, tag_type="pos")
+
+    # Assert
+    assert [token.get_tag("pos").value for token in annotated_sents[0]] == [
+        "O",
+        "O",
+        "S-LOC",
+        "O",
+    ]
+
+
+def test_read_annotations_stream_jsonl(tmp_path: Path) -> None:
+    """Test annotations are read from compressed JSONL line by line"""
+    # Arrange
+    file_path = tmp_path / "annotations.jsonl.gz"
+    annotations = [
+        {
+            "text": "I love Berlin .",
+            "labels": [{"start_pos": 7, "text": "Berlin", "label": "S-LOC"}],
+        },
+        {"text": "This book is great.", "labels": []},
+    ]
+    with gzip.open(file_path, "wt", encoding="utf-8") as file:
+        file.write("\n".join(json.dumps(annotation) for annotation in annotations))
+        file.write("\n\n")
+
+    # Act
+    stream = utils.read_annotations(file_path)
+    annotated_sents = utils.add_tags(stream)
+
+    # Assert
+    assert not isinstance(stream, list)
+    assert len(annotated_sents) == 2
+    assert annotated_sents[0].get_spans("ner")[0].text == "Berlin"
+
+
 def test_entity_ratio_return_0(unlabeled_sentences: List[Sentence]) -> None:
     """Test entity_ratio if no entities"""
     # Act
@@ -79,6 +133,28 @@ def test_load_plain_text(fixture_path: Path) -> None:
     assert sentences[1].to_plain_string() == sentence1
 
 
+@pytest.mark.parametrize("workers", [1, 2])
+def test_iter_plain_text_skip_blank_and_duplicates(
+    tmp_path: Path, workers: int
+) -> None:
+    """Test sentences are loaded in chunks in file order"""
+    # Arrange
+    file_path = tmp_path / "pool.txt"
+    lines = [f"Sentence number {i % 7} ." for i in range(20)]
+    file_path.write_text("\n".join(lines[:10] + ["", "  "] + lines[10:]))
+
+    # Act
+    chunks = utils.iter_plain_text(
+        file_path, chunk_size=3, workers=workers, skip_blank=True, skip_duplicates=True
+    )
+    first_chunk = next(chunks)
+    chunks = [first_chunk] + list(chunks)
+
+    # Assert
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [s.to_plain_string() for chunk in chunks for s in chunk] == lines[:7]
+
+
 def test_count_tokens(unlabeled_sentences: List[Sentence]) -> None:
     """Test entity_ratio if no entities"""
     # Act
@@ -141,3 +217,82 @@ def test_bio2bioes(tags: List[str], expected: List[str]) -> None:
 
     # Assert
     assert result == expected
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz", ".xz"])
+@pytest.mark.parametrize("file_format", ["conll", "jsonl", "json"])
+def test_output_labeled_data_append_rounds(
+    tmp_path: Path, corpus: Corpus, file_format: str, suffix: str
+) -> None:
+    """Test labeled data written round by round is the same as written at once"""
+    # Arrange
+    sentences = corpus.train.sentences
+    expected_path = tmp_path / f"expected.{file_format}{suffix}"
+    file_path = tmp_path / f"labeled.{file_format}{suffix}"
+    utils.output_labeled_data(sentences, expected_path, file_format)
+
+    # Act
+    with utils.LabeledDataWriter(file_path, file_format) as writer:
+        writer.write(sentences[:3])
+    assert writer.count == 3
+    if file_format == "json" and suffix:
+        with pytest.raises(ValueError):
+            utils.output_labeled_data(
+                sentences[3:], file_path, file_format, append=True
+            )
+        return
+    utils.output_labeled_data(sentences[3:], file_path, file_format, append=True)
+
+    # Assert
+    open_file = {"": open, ".gz": gzip.open, ".xz": lzma.open}[suffix]
+    with open_file(file_path, "rt", encoding="utf-8") as file:
+        content = file.read()
+    with open_file(expected_path, "rt", encoding="utf-8") as file:
+        assert content == file.read()
+
+
+def test_output_labeled_data_json_same_as_json_dumps(
+    tmp_path: Path, corpus: Corpus
+) -> None:
+    """Test streamed JSON array is the same as dumping the whole dataset"""
+    # Arrange
+    sentences = corpus.train.sentences
+    data = [
+        {
+            "text": [token.text for token in sent],
+            "labels": [token.get_tag("ner").value for token in sent],
+        }
+        for sent in sentences
+    ]
+    file_path = tmp_path / "labeled.json"
+
+    # Act
+    utils.output_labeled_data([], file_path, "json")
+    empty_content = file_path.read_text(encoding="utf-8")
+    utils.output_labeled_data(sentences, file_path, "json", append=True)
+
+    # Assert
+    assert empty_content == json.dumps([], indent=4)
+    assert file_path.read_text(encoding="utf-8") == json.dumps(data, indent=4)
+
+
+def test_atomic_write_text_in_utf8(tmp_path: Path) -> None:
+    """Test text is written in UTF-8 regardless of the locale encoding"""
+    # Arrange
+    file_path = tmp_path / "state.json"
+    data = {"labels": ["東京", "Zürich"]}
+
+    # Act
+    with patch("seqal.utils.open", wraps=open) as open_file:
+        utils.atomic_write(
+            file_path, lambda file: json.dump(data, file, ensure_ascii=False)
+        )
+        utils.atomic_write(tmp_path / "data.bin", lambda file: file.write(b"0"), "wb")
+
+    # Assert
+    assert open_file.call_args_list[0].kwargs["encoding"] == "utf-8"
+    assert open_file.call_args_list[1].kwargs["encoding"] is None
+    assert file_path.read_bytes() == json.dumps(data, ensure_ascii=False).encode(
+        "utf-8"
+    )
+    assert not (tmp_path / "state.json.tmp").exists()